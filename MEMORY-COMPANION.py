@@ -1,292 +1,205 @@
 import mysql.connector
 from mysql.connector import Error
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 from tkinter import font as tkfont
+import os
+import sys
 import threading
-import time
+import webbrowser
+
+import attachments
+import changefeed
+import config
+import consent
+import heatmap
+import notifications
+import reports
+import shards
+import stallwatch
+import statcache
+from records import AuditEvent, Entry, Patient, Reminder
+from services import Services
 
 class MemoryCompanionApp:
-    def __init__(self, root):
+    def __init__(self, root, seed_sample_data=False, profile=False, services=None):
+        """One user session in root (a Tk or, in kiosk mode, a Toplevel).
+
+        Without services the window owns its own; kiosk sessions share one
+        Services (connections, caches, reminder scheduler) created by KioskApp.
+        """
         self.root = root
         self.root.title(" Memory Companion - Alzheimer's Care")
         self.root.geometry("1200x800")
         self.root.configure(bg="#f0f4f8")
 
-        self.connection = None
+        self.owns_services = services is None
+        if services is None:
+            services = Services(seed_sample_data)
+        self.services = services
+        self.home_db = services.home_db
+        # Home database; after login self.db points at the shard holding the session's patient
+        self.db = self.home_db
+        self.shards = services.shards
+        self.queries = services.queries
+        self.reports = services.reports
+        self.attachments = services.attachments
+        self.changes = changefeed.ChangeFeed(self.queries, lambda: self.db.primary)
+        self.directory = services.directory
+        self.stats = services.stats
+        self.consent = services.consent
+        self.quick_entries = services.quick_entries
+        self.db_ready = services.db_ready
         self.current_user = None
         self.current_role = None
-        self.reminder_thread = None
-        self.running = True
-
-        # Custom fonts
-        self.title_font = tkfont.Font(family="Arial", size=24, weight="bold")
-        self.header_font = tkfont.Font(family="Arial", size=16, weight="bold")
-        self.normal_font = tkfont.Font(family="Arial", size=11)
-
-        # Connect to database
-        self.connect_db()
-        self.create_tables()
-
-        # Start with login screen
+        self.watchdog = None
+        if self.owns_services and (config.WATCHDOG_ENABLED or profile):
+            self.watchdog = stallwatch.StallWatchdog(
+                root, config.WATCHDOG_STALL_MS, config.WATCHDOG_HEARTBEAT_MS, config.WATCHDOG_LOG,
+                profile=profile, sample_ms=config.PROFILE_SAMPLE_MS, profile_dir=config.PROFILE_DIR,
+                context=lambda: self.current_screen)
+            self.watchdog.start()
+        self.status_label = None
+        self.reminder_cards = {}
+        self.entry_cards = {}
+        self.entries_patient_id = None
+        self.entries_filter = 'all'
+        self.entry_list_frame = None
+        self.reminder_list_frame = None
+        # Date window of the reminder screen: 'today', 'week' or a custom (first, last) pair
+        self.reminder_window = 'week'
+        self.summary_frame = None
+        self.summary_period = 'daily'
+        self.current_screen = None
+        self.session_patient_id = None
+        self.poll_job = None
+        self.degraded_banner = None
+        self.tray = notifications.NotificationTray(self.root, self.complete_reminders,
+                                                   snooze_minutes=config.NOTIFY_SNOOZE_MINUTES)
+
+        # Custom fonts, shared by every session window of the process
+        self.title_font = shared_font("mc-title", size=24, weight="bold")
+        self.header_font = shared_font("mc-header", size=16, weight="bold")
+        self.normal_font = shared_font("mc-normal", size=11)
+
+        # Start with login screen so the window paints before any database work
         self.show_login()
 
-        # Start reminder checker
-        self.start_reminder_thread()
-
         # Handle window close
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-    def connect_db(self):
-        """Connect to MySQL database (kept credentials as you confirmed)"""
-        try:
-            self.connection = mysql.connector.connect(
-                host='localhost',
-                user='root',
-                password='070522',
-                database='memory_companion'
-            )
-            print("✓ Connected to database")
-        except Error as e:
-            messagebox.showerror("Database Error", f"Failed to connect: {e}")
-
-    def create_tables(self):
-        """Create all necessary tables (password stored as plain `password`)"""
-        try:
-            cursor = self.connection.cursor()
-
-            # Patients table (store plain password)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS patients (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(100) UNIQUE NOT NULL,
-                    password VARCHAR(100) NOT NULL,
-                    full_name VARCHAR(255) NOT NULL,
-                    age INT,
-                    diagnosis VARCHAR(100),
-                    stage VARCHAR(50),
-                    emergency_contact VARCHAR(255),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Caregivers table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS caregivers (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(100) UNIQUE NOT NULL,
-                    password VARCHAR(100) NOT NULL,
-                    full_name VARCHAR(255) NOT NULL,
-                    phone VARCHAR(50),
-                    relationship VARCHAR(100),
-                    patient_id INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (patient_id) REFERENCES patients(id)
-                )
-            """)
-
-            # Doctors table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS doctors (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(100) UNIQUE NOT NULL,
-                    password VARCHAR(100) NOT NULL,
-                    full_name VARCHAR(255) NOT NULL,
-                    specialization VARCHAR(100),
-                    license_number VARCHAR(100),
-                    hospital VARCHAR(255),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Entries table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS entries (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_type ENUM('patient', 'caregiver', 'doctor') NOT NULL,
-                    user_id INT NOT NULL,
-                    patient_id INT,
-                    entry_type ENUM('meal', 'medication', 'appointment', 'social', 'note', 'activity', 'observation') NOT NULL,
-                    title VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    entry_date DATE NOT NULL,
-                    entry_time TIME NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (patient_id) REFERENCES patients(id)
-                )
-            """)
-
-            # Reminders table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS reminders (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_type ENUM('patient', 'caregiver', 'doctor') NOT NULL,
-                    user_id INT NOT NULL,
-                    patient_id INT,
-                    title VARCHAR(255) NOT NULL,
-                    description TEXT,
-                    reminder_date DATE NOT NULL,
-                    reminder_time TIME NOT NULL,
-                    reminder_type ENUM('medication', 'appointment', 'event', 'other') NOT NULL,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    is_completed BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (patient_id) REFERENCES patients(id)
-                )
-            """)
-
-            # Consent logs
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS consent_logs (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    patient_id INT NOT NULL,
-                    consent_type VARCHAR(100) NOT NULL,
-                    consent_given BOOLEAN NOT NULL,
-                    consent_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (patient_id) REFERENCES patients(id)
-                )
-            """)
-
-            # Audit logs
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS audit_logs (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_type ENUM('patient', 'caregiver', 'doctor') NOT NULL,
-                    user_id INT NOT NULL,
-                    action VARCHAR(255) NOT NULL,
-                    details TEXT,
-                    action_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            self.connection.commit()
-
-            # Create sample data only if tables are empty
-            cursor.execute("SELECT COUNT(*) FROM patients")
-            if cursor.fetchone()[0] == 0:
-                self.create_sample_data()
-
-            cursor.close()
-        except Error as e:
-            messagebox.showerror("Database Error", f"Failed to create tables: {e}")
-
-    def create_sample_data(self):
-        """Create sample patients, caregivers, doctors — only 2 entries each — and shared appointment/reminder"""
-        cursor = self.connection.cursor()
+        # Connect, check the schema version and start the reminder scheduler in the background
+        services.add_session(self)
+        if self.owns_services:
+            services.start()
+
+    @property
+    def connection(self):
+        """Primary (read-write) connection"""
+        return self.db.primary
+
+    @property
+    def escalation(self):
+        return self.services.escalation
+
+    def show_error(self, title, message):
+        messagebox.showerror(title, message, parent=self.root)
+
+    def show_degraded_banner(self, degraded):
+        """Show or hide the 'database unavailable' strip across the top of the window"""
+        banner = self.degraded_banner
+        if not degraded:
+            if banner is not None and banner.winfo_exists():
+                banner.destroy()
+            self.degraded_banner = None
+            return
+        # Screens rebuild the window by destroying root's children, so recreate on demand
+        if banner is None or not banner.winfo_exists():
+            banner = tk.Label(self.root, text="⚠ Database connection lost. Reconnecting… Changes cannot be saved until it is back.",
+                              font=("Arial", 11, "bold"), bg="#dc2626", fg="white", pady=6)
+            self.degraded_banner = banner
+        banner.place(relx=0, rely=0, relwidth=1)
+        banner.lift()
+
+    def reader_connections(self):
+        """Read connections for views spanning all patients: every shard, or just this database"""
+        return self.services.reader_connections()
+
+    def read_across(self, name, params=(), key=None, limit=None):
+        """Run a newest-first read on every shard in parallel and merge the rows by key"""
+        if self.shards:
+            return self.shards.fan_out(self.queries, name, params, key=key, reverse=True, limit=limit)
+        return self.queries.fetchall(self.db.reader(), name, params)
+
+    def create_user(self, role, username, values, patient_id=None):
+        """Insert a user on the shard it belongs to and record it in the shard directory"""
+        shards.create_user(self.queries, self.shards, self.db, role, username, values, patient_id)
+
+    def consent_allows(self, patient_id):
+        """May the logged-in user see this patient's data? (cached consent state, no query when cached)"""
+        return self.consent.allows(self.services.router_for_patient(patient_id).primary, patient_id, self.current_role)
+
+    def visible_entries(self, rows):
+        """Entry records of the rows whose patient has not withheld consent from this role"""
+        entries = [Entry(*row) for row in rows]
+        patient_ids = {entry.patient_id for entry in entries}
+        if self.current_role == 'doctor':
+            allowed = self.consent.allowed_patients(self.reader_connections(), 'doctor', patient_ids)
+        else:
+            allowed = {patient_id for patient_id in patient_ids if self.consent_allows(patient_id)}
+        return [entry for entry in entries if entry.patient_id in allowed]
 
-        # --- Patients (2 entries) ---
-        patients = [
-            ('ram_kumar', 'patient123', 'Ram Kumar', 72, "Alzheimer's Disease", 'Early Stage', '+91-9876543210'),
-            ('meena_rao', 'patient456', 'Meena Rao', 68, "Vascular Dementia", 'Moderate Stage', '+91-9123456789')
-        ]
-        for username, password, full_name, age, diagnosis, stage, emergency in patients:
-            cursor.execute(
-                """INSERT INTO patients (username, password, full_name, age, diagnosis, stage, emergency_contact)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                (username, password, full_name, age, diagnosis, stage, emergency)
-            )
-
-        # fetch patient ids
-        cursor.execute("SELECT id FROM patients WHERE username = %s", ('ram_kumar',))
-        ram_id = cursor.fetchone()[0]
-        cursor.execute("SELECT id FROM patients WHERE username = %s", ('meena_rao',))
-        meena_id = cursor.fetchone()[0]
-
-        # --- Caregivers (2 entries) ---
-        caregivers = [
-            ('sita_k', 'care123', 'Sita Kumar', '+91-9876501234', 'Wife', ram_id),
-            ('raj_r', 'care456', 'Raj Rao', '+91-9123409876', 'Son', meena_id)
-        ]
-        for username, password, full_name, phone, relationship, patient_id in caregivers:
-            cursor.execute(
-                """INSERT INTO caregivers (username, password, full_name, phone, relationship, patient_id)
-                   VALUES (%s, %s, %s, %s, %s, %s)""",
-                (username, password, full_name, phone, relationship, patient_id)
-            )
-
-        # fetch caregiver id for ram's caregiver
-        cursor.execute("SELECT id FROM caregivers WHERE username = %s", ('sita_k',))
-        sita_row = cursor.fetchone()
-        sita_id = sita_row[0] if sita_row else None
-
-        # --- Doctors (2 entries) ---
-        doctors = [
-            ('dr_sharma', 'doc123', 'Dr. A.K. Sharma', 'Neurology', 'MD-IN-12345', 'AIIMS Delhi'),
-            ('dr_reddy', 'doc456', 'Dr. Priya Reddy', 'Psychiatry', 'MD-IN-67890', 'Apollo Chennai')
-        ]
-        for username, password, full_name, spec, license_no, hospital in doctors:
-            cursor.execute(
-                """INSERT INTO doctors (username, password, full_name, specialization, license_number, hospital)
-                   VALUES (%s, %s, %s, %s, %s, %s)""",
-                (username, password, full_name, spec, license_no, hospital)
-            )
-
-        # fetch doctor id for dr_sharma to link appointment/reminder
-        cursor.execute("SELECT id FROM doctors WHERE username = %s", ('dr_sharma',))
-        dr_sharma_id = cursor.fetchone()[0]
-
-        # --- Create a shared appointment entry and a shared reminder so it appears for patient, caregiver, doctor ---
-        today = (datetime.now()).strftime('%Y-%m-%d')
-
-        # Insert appointment entry (as doctor) only if not existing
-        cursor.execute("""
-            SELECT COUNT(*) FROM entries
-            WHERE user_type='doctor' AND user_id=%s AND patient_id=%s AND entry_type='appointment' AND title=%s AND entry_date=%s
-        """, (dr_sharma_id, ram_id, 'Follow-up with Dr. Sharma', today))
-        if cursor.fetchone()[0] == 0:
-            cursor.execute(
-                """INSERT INTO entries (user_type, user_id, patient_id, entry_type, title, description, entry_date, entry_time)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                ('doctor', dr_sharma_id, ram_id, 'appointment', 'Follow-up with Dr. Sharma',
-                 'Routine Alzheimer review and medication check', today, '10:00:00')
-            )
-
-        # Add corresponding reminders for patient, caregiver, and doctor — only if not present
-        shared_title = 'Doctor Appointment'
-        shared_desc = 'Follow-up with Dr. Sharma at 10:00 AM'
-        shared_time = '10:00:00'
-
-        roles_and_uids = [
-            ('patient', ram_id),
-            ('caregiver', sita_id if sita_id else 1),
-            ('doctor', dr_sharma_id)
-        ]
+    def show_no_consent(self, parent, what):
+        tk.Label(parent, text=f"The patient has not consented to {self.current_role} access to {what}",
+                 font=self.normal_font, bg="white", fg="#64748b").pack(pady=50)
 
-        for role, uid in roles_and_uids:
-            # uid might be None — skip if no uid
-            if uid is None:
-                continue
-            cursor.execute("""
-                SELECT COUNT(*) FROM reminders
-                WHERE user_type=%s AND user_id=%s AND patient_id=%s AND title=%s AND reminder_date=%s AND reminder_time=%s
-            """, (role, uid, ram_id, shared_title, today, shared_time))
-            if cursor.fetchone()[0] == 0:
-                cursor.execute("""INSERT INTO reminders (user_type, user_id, patient_id, title, description, reminder_date, reminder_time, reminder_type)
-                                  VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                               (role, uid, ram_id, shared_title, shared_desc, today, shared_time, 'appointment'))
-
-        self.connection.commit()
-        cursor.close()
-        print("✓ Sample data (2 each) created with shared appointment & reminders")
+    def set_connection_status(self, text, color):
+        """Update the connection status line on the login screen, if it is showing"""
+        try:
+            if self.status_label is not None and self.status_label.winfo_exists():
+                self.status_label.config(text=text, fg=color)
+        except tk.TclError:
+            pass
 
     def log_action(self, action, details=""):
         """Log user actions to audit log"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "INSERT INTO audit_logs (user_type, user_id, action, details) VALUES (%s, %s, %s, %s)",
-                (self.current_role, self.current_user, action, details)
-            )
-            self.connection.commit()
-            cursor.close()
+            # Inside a larger unit of work this joins its transaction instead of committing
+            with self.db.unit_of_work() as connection:
+                self.queries.execute(connection, "log_action",
+                                     (self.current_role, self.current_user, action, details))
         except Error as e:
             print(f"Error logging action: {e}")
 
+    def run_bulk_action(self, statement, ids, action, verb, noun, table, operation):
+        """Run a set-based statement plus one audit record for all ids in a single transaction"""
+        ids = list(ids)
+        if len(ids) == 1:
+            details = f"{verb} {noun} ID: {ids[0]}"
+        else:
+            details = f"{verb} {noun} IDs: {', '.join(str(i) for i in ids)}"
+        with self.db.unit_of_work() as connection:
+            # Log to the change feed first: a DELETE would leave nothing to log
+            versions = changefeed.record_changes(self.queries, connection, table, operation, ids)
+            self.queries.execute_in(connection, statement, ids)
+            self.queries.execute(connection, "log_action",
+                                 (self.current_role, self.current_user, action, details))
+        self.stats.invalidate_table(table, versions)
+
+    def show_empty_label(self, parent, cards, text):
+        """Show the empty-list message once the last card has been removed"""
+        if not cards and parent.winfo_exists():
+            tk.Label(parent, text=text, font=self.normal_font,
+                     bg="white", fg="#64748b").pack(pady=50)
+
     def clear_window(self):
-        """Clear all widgets from window"""
+        """Clear all widgets from window, except the notification tray"""
         for widget in self.root.winfo_children():
-            widget.destroy()
+            if widget is not self.tray.frame:
+                widget.destroy()
+        # Unacknowledged notices stay; raise them above the screen built next
+        self.root.after_idle(self.tray.lift)
 
     def show_login(self):
         """Display login screen without demo credentials"""
@@ -338,6 +251,12 @@ class MemoryCompanionApp:
         tk.Label(info_frame, text="Passwords start with: patient/care/doc",
                  font=("Arial", 9), bg="#eff6ff", fg="#64748b").pack(pady=5)
 
+        # Connection status (database setup runs in the background)
+        status_text, status_color = self.services.status
+        self.status_label = tk.Label(login_frame, text=status_text, font=("Arial", 9),
+                                     bg="white", fg=status_color)
+        self.status_label.grid(row=6, column=0, columnspan=2, pady=(5, 0))
+
         # Bind Enter key
         password_entry.bind('<Return>', lambda e: self.login(username_entry.get(), password_entry.get()))
         username_entry.focus()
@@ -348,57 +267,31 @@ class MemoryCompanionApp:
             messagebox.showerror("Error", "Please enter username and password")
             return
 
-        try:
-            cursor = self.connection.cursor()
-
-            # Try patients table
-            cursor.execute(
-                "SELECT id, full_name FROM patients WHERE username = %s AND password = %s",
-                (username, password)
-            )
-            result = cursor.fetchone()
-            if result:
-                self.current_user = result[0]
-                self.current_role = 'patient'
-                self.log_action("LOGIN", f"Patient {username} logged in")
-                messagebox.showinfo("Success", f"Welcome, {result[1]}!")
-                cursor.close()
-                self.show_dashboard()
-                return
-
-            # Try caregivers table
-            cursor.execute(
-                "SELECT id, full_name FROM caregivers WHERE username = %s AND password = %s",
-                (username, password)
-            )
-            result = cursor.fetchone()
-            if result:
-                self.current_user = result[0]
-                self.current_role = 'caregiver'
-                self.log_action("LOGIN", f"Caregiver {username} logged in")
-                messagebox.showinfo("Success", f"Welcome, {result[1]}!")
-                cursor.close()
-                self.show_dashboard()
-                return
-
-            # Try doctors table
-            cursor.execute(
-                "SELECT id, full_name FROM doctors WHERE username = %s AND password = %s",
-                (username, password)
-            )
-            result = cursor.fetchone()
-            if result:
-                self.current_user = result[0]
-                self.current_role = 'doctor'
-                self.log_action("LOGIN", f"Doctor {username} logged in")
-                messagebox.showinfo("Success", f"Welcome, {result[1]}!")
-                cursor.close()
-                self.show_dashboard()
-                return
+        if not self.db_ready.is_set():
+            messagebox.showinfo("Please wait", "Still connecting to the database, please try again in a moment")
+            return
 
-            cursor.close()
+        try:
+            # With sharding the directory says which shard holds the user
+            routers = self.shards.login_routers(self.queries, username) if self.shards else [self.home_db]
+            for router in routers:
+                self.db = router
+                # Try patients, caregivers, then doctors table
+                for role in ('patient', 'caregiver', 'doctor'):
+                    result = self.queries.fetchone(self.connection, f"login_{role}", (username, password))
+                    if result:
+                        self.current_user = result[0]
+                        self.current_role = role
+                        self.log_action("LOGIN", f"{role.capitalize()} {username} logged in")
+                        self.root.title(f" Memory Companion - {result[1]}")
+                        messagebox.showinfo("Success", f"Welcome, {result[1]}!")
+                        self.show_dashboard()
+                        return
+
+            self.db = self.home_db
             messagebox.showerror("Error", "Invalid username or password")
         except Error as e:
+            self.db = self.home_db
             messagebox.showerror("Error", f"Login failed: {e}")
 
     def show_dashboard(self):
@@ -442,6 +335,8 @@ class MemoryCompanionApp:
 
         if self.current_role in ['caregiver', 'doctor']:
             menu_items.append(("👤 Patient Info", self.show_patient_info))
+        else:
+            menu_items.append(("🔒 Privacy & Consent", self.show_consent))
 
         # Add "Add New User" for doctors (simple form in same window)
         if self.current_role == 'doctor':
@@ -458,13 +353,172 @@ class MemoryCompanionApp:
         self.content_frame = tk.Frame(container, bg="white")
         self.content_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
 
+        # Patient whose change feed this session follows (doctors follow all patients)
+        self.session_patient_id = None
+        try:
+            if self.current_role == 'patient':
+                self.session_patient_id = self.current_user
+            elif self.current_role == 'caregiver':
+                self.session_patient_id = self.queries.fetchvalue(self.connection, "caregiver_patient", (self.current_user,))
+        except Error as e:
+            print(f"Error loading session patient: {e}")
+        self.changes.reset()
+        self.start_change_polling()
+
         # Show welcome message
         self.show_welcome()
 
+    def start_change_polling(self):
+        """Poll the change feed every CHANGE_POLL_MS while someone is logged in"""
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+        self.poll_job = self.root.after(config.CHANGE_POLL_MS, self.poll_changes)
+
+    def stop_change_polling(self):
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+
+    def mark_screen_fresh(self, screen):
+        """Record which screen is open and the change-feed position its data reflects"""
+        self.current_screen = screen
+        try:
+            if self.session_patient_id:
+                self.forget_stale(self.changes.mark_seen(self.session_patient_id))
+            else:
+                self.forget_stale(self.changes.mark_all_seen())
+        except Error as e:
+            print(f"Error reading change feed: {e}")
+
+    def forget_stale(self, changes):
+        """Drop the cached consent state and stat cards that other sessions' changes made stale;
+        returns True when consent changed"""
+        tables = {change[1] for change in changes}
+        if self.session_patient_id:
+            for table in tables & statcache.TABLE_METRICS.keys():
+                self.stats.invalidate_table(table, [self.session_patient_id])
+        if 'consent_logs' in tables:
+            # Without a session patient (doctors) the change rows do not say whose consent changed
+            self.consent.invalidate(self.session_patient_id)
+            return True
+        return False
+
+    def poll_changes(self):
+        """Apply rows changed by other sessions to the open screen without reloading it"""
+        self.poll_job = None
+        if self.current_role is None:
+            return
+        try:
+            if self.current_screen in ('entries', 'reminders', 'welcome', 'summaries') and self.db_ready.is_set():
+                # End the read snapshot so other sessions' commits are visible
+                self.db.primary.commit()
+                if self.session_patient_id:
+                    changes = self.changes.poll(self.session_patient_id)
+                else:
+                    changes = self.changes.poll_all()
+                if self.forget_stale(changes):
+                    # Consent changed: what this user may see changed, so reload the screen
+                    self.reload_screen()
+                elif changes:
+                    self.apply_changes(changefeed.latest_operations(changes))
+        except Error as e:
+            print(f"Change feed poll failed: {e}")
+        self.start_change_polling()
+
+    def reload_screen(self):
+        """Rebuild the open screen from scratch"""
+        if self.current_screen == 'welcome':
+            self.show_welcome()
+        elif self.current_screen == 'summaries' and self.summary_frame is not None and self.summary_frame.winfo_exists():
+            self.generate_summary(self.summary_frame, self.summary_period)
+        elif self.current_screen == 'entries' and self.entry_list_frame is not None and self.entry_list_frame.winfo_exists():
+            self.load_entries(self.entry_list_frame, self.entries_filter)
+        elif self.current_screen == 'reminders':
+            self.show_reminders()
+
+    def apply_changes(self, latest):
+        """Update the open screen for {(table, row_id): operation}"""
+        if self.current_screen == 'welcome':
+            if self.session_patient_id:
+                self.show_welcome()
+        elif self.current_screen == 'summaries':
+            if any(table == 'entries' for table, _ in latest) and self.summary_frame is not None:
+                self.generate_summary(self.summary_frame, self.summary_period)
+        elif self.current_screen == 'entries':
+            self.apply_entry_changes({row_id: op for (table, row_id), op in latest.items() if table == 'entries'})
+        elif self.current_screen == 'reminders':
+            self.apply_reminder_changes({row_id: op for (table, row_id), op in latest.items() if table == 'reminders'})
+
+    def apply_entry_changes(self, operations):
+        parent = self.entry_list_frame
+        if not operations or parent is None or not parent.winfo_exists():
+            return
+        changed = [row_id for row_id, op in operations.items() if op != 'delete']
+        rows = self.visible_entries(self.queries.fetchall_in(self.connection, "entries_by_ids", changed)) if changed else []
+        for row_id, op in operations.items():
+            if op == 'delete':
+                widgets = self.entry_cards.pop(row_id, None)
+                if widgets and widgets['card'].winfo_exists():
+                    widgets['card'].destroy()
+        for entry in rows:
+            old = self.entry_cards.pop(entry.id, None)
+            if old and old['card'].winfo_exists():
+                old['card'].destroy()
+            if self.entries_filter != 'all' and entry.entry_type != self.entries_filter:
+                continue
+            self.clear_empty_label(parent)
+            self.create_entry_card(parent, entry)
+            self.place_card(self.entry_cards, entry.id, descending=True)
+        self.load_entry_attachments([entry.id for entry in rows if entry.id in self.entry_cards])
+        self.show_empty_label(parent, self.entry_cards, "No entries found")
+
+    def apply_reminder_changes(self, operations):
+        parent = self.reminder_list_frame
+        if not operations or parent is None or not parent.winfo_exists():
+            return
+        changed = [row_id for row_id, op in operations.items() if op != 'delete']
+        rows = self.queries.fetchall_in(self.connection, "reminders_by_ids", changed) if changed else []
+        for row_id, op in operations.items():
+            if op == 'delete':
+                self.remove_reminder_card(row_id)
+        for reminder in (Reminder(*row) for row in rows):
+            widgets = self.reminder_cards.pop(reminder.id, None)
+            if widgets and widgets['card'].winfo_exists():
+                widgets['card'].destroy()
+            if not reminder.is_active or not self.reminder_in_window(reminder):
+                continue
+            # Without a (consenting) session patient the list only holds the user's own reminders
+            own_only = not self.session_patient_id or not self.consent_allows(self.session_patient_id)
+            if own_only and (reminder.user_type, reminder.user_id) != (self.current_role, self.current_user):
+                continue
+            self.clear_empty_label(parent)
+            self.create_reminder_card(parent, reminder)
+            self.place_card(self.reminder_cards, reminder.id, descending=False)
+        self.show_empty_label(parent, self.reminder_cards, "No reminders in this period")
+
+    def clear_empty_label(self, parent):
+        """Remove the 'No ... found' message before adding a card to an empty list"""
+        for widget in parent.winfo_children():
+            if isinstance(widget, tk.Label):
+                widget.destroy()
+
+    def place_card(self, cards, item_id, descending):
+        """Re-pack a newly created card at its date/time position in the list"""
+        new = cards[item_id]
+        by_widget = {str(widgets['card']): widgets for widgets in cards.values()}
+        for widget in new['parent'].pack_slaves():
+            other = by_widget.get(str(widget))
+            if other is None or other is new:
+                continue
+            if (other['sort_key'] < new['sort_key']) if descending else (other['sort_key'] > new['sort_key']):
+                new['card'].pack_configure(before=other['card'])
+                return
+
     def show_welcome(self):
         """Show welcome screen in content area"""
         for widget in self.content_frame.winfo_children():
             widget.destroy()
+        self.mark_screen_fresh('welcome')
 
         welcome_frame = tk.Frame(self.content_frame, bg="white")
         welcome_frame.pack(expand=True)
@@ -480,38 +534,26 @@ class MemoryCompanionApp:
         stats_frame.pack(pady=30)
 
         try:
-            cursor = self.connection.cursor()
-
-            # Get appropriate patient_id for queries
-            if self.current_role == 'patient':
-                patient_id = self.current_user
-            elif self.current_role == 'caregiver':
-                cursor.execute("SELECT patient_id FROM caregivers WHERE id = %s", (self.current_user,))
-                result = cursor.fetchone()
-                patient_id = result[0] if result else None
-            else:
-                patient_id = None
+            # Patient resolved at login (doctors have none)
+            patient_id = self.session_patient_id
 
             if patient_id:
+                # Served from the stat cache unless a write invalidated it or the TTL ran out
+                today = datetime.now().strftime('%Y-%m-%d')
+
                 # Today's entries
-                cursor.execute(
-                    "SELECT COUNT(*) FROM entries WHERE patient_id = %s AND entry_date = CURDATE()",
-                    (patient_id,)
-                )
-                today_count = cursor.fetchone()[0]
+                today_count = self.stats.get_or_load(
+                    patient_id, "today_entries", today,
+                    lambda: self.queries.fetchvalue(self.connection, "count_today_entries", (patient_id,), 0))
 
                 # Active reminders
-                cursor.execute(
-                    "SELECT COUNT(*) FROM reminders WHERE patient_id = %s AND is_active = TRUE AND is_completed = FALSE",
-                    (patient_id,)
-                )
-                reminder_count = cursor.fetchone()[0]
+                reminder_count = self.stats.get_or_load(
+                    patient_id, "open_reminders", today,
+                    lambda: self.queries.fetchvalue(self.connection, "count_open_reminders", (patient_id,), 0))
 
                 # Display stats
                 self.create_stat_card(stats_frame, "Today's Entries", today_count, "#10b981", 0)
                 self.create_stat_card(stats_frame, "Active Reminders", reminder_count, "#f59e0b", 1)
-
-            cursor.close()
         except Error as e:
             print(f"Error loading stats: {e}")
 
@@ -525,10 +567,11 @@ class MemoryCompanionApp:
         tk.Label(card, text=title, font=self.normal_font,
                  bg=color, fg="white").pack()
 
-    def show_entries(self):
-        """Show add entry form - supports free text entry"""
+    def show_entries(self, notice=None):
+        """Show add entry form - supports free text entry, plus the patient's frequent entries for one-tap logging"""
         for widget in self.content_frame.winfo_children():
             widget.destroy()
+        self.current_screen = None
 
         form_frame = tk.Frame(self.content_frame, bg="white", padx=30, pady=20)
         form_frame.pack(fill=tk.BOTH, expand=True)
@@ -572,9 +615,33 @@ class MemoryCompanionApp:
         time_entry.insert(0, datetime.now().strftime('%H:%M'))
         time_entry.grid(row=5, column=1, pady=10, sticky="w")
 
+        # Photos and voice notes
+        tk.Label(form_frame, text="Attachments:", font=self.normal_font, bg="white").grid(row=6, column=0, sticky="nw", pady=10)
+        attach_frame = tk.Frame(form_frame, bg="white")
+        attach_frame.grid(row=6, column=1, pady=10, sticky="w")
+        attached = []
+        attached_label = tk.Label(attach_frame, text="None", font=("Arial", 9), bg="white", fg="#64748b",
+                                  wraplength=350, justify=tk.LEFT)
+
+        def choose_files():
+            paths = filedialog.askopenfilenames(
+                title="Attach photos or voice notes",
+                filetypes=[("Photos and voice notes", "*.jpg *.jpeg *.png *.gif *.heic *.mp3 *.m4a *.wav *.ogg *.opus"),
+                           ("All files", "*.*")])
+            rejected = [path for path in paths if attachments.kind_of(path) is None]
+            if rejected:
+                messagebox.showerror("Error", "Only photos and voice notes can be attached:\n" +
+                                     "\n".join(os.path.basename(path) for path in rejected))
+            attached.extend(path for path in paths if attachments.kind_of(path) and path not in attached)
+            attached_label.config(text=", ".join(os.path.basename(path) for path in attached) or "None")
+
+        tk.Button(attach_frame, text="📎 Add photo / voice note", font=("Arial", 9),
+                  command=choose_files).pack(side=tk.LEFT)
+        attached_label.pack(side=tk.LEFT, padx=10)
+
         # Helper text
         helper_frame = tk.Frame(form_frame, bg="#eff6ff", padx=15, pady=10)
-        helper_frame.grid(row=6, column=0, columnspan=2, pady=10, sticky="ew")
+        helper_frame.grid(row=7, column=0, columnspan=2, pady=10, sticky="ew")
 
         tk.Label(helper_frame, text="💡 Tip: Write freely in the description - include as much detail as you'd like!",
                  font=("Arial", 9), bg="#eff6ff", fg="#1e40af", wraplength=500, justify=tk.LEFT).pack()
@@ -585,49 +652,197 @@ class MemoryCompanionApp:
                              command=lambda: self.save_entry(
                                  entry_type.get(), title_entry.get(),
                                  desc_text.get("1.0", tk.END).strip(),
-                                 date_entry.get(), time_entry.get()
+                                 date_entry.get(), time_entry.get(), attached
                              ))
-        save_btn.grid(row=7, column=0, columnspan=2, pady=20)
+        save_btn.grid(row=8, column=0, columnspan=2, pady=20)
+
+        self.show_quick_entries(form_frame, entry_type, title_entry, notice)
 
-    def save_entry(self, entry_type, title, description, date, time):
-        """Save a new entry"""
+    def show_quick_entries(self, form_frame, entry_type, title_entry, notice=None):
+        """Frequent-entry buttons beside the form and title autocomplete, both served from memory"""
+        patient_id = self.session_patient_id
+        if not patient_id or not self.consent_allows(patient_id):
+            return
+        allowed_types = set(entry_type['values'])
+        try:
+            templates = self.quick_entries.suggest(self.connection, patient_id, config.QUICK_ENTRY_TOP_K,
+                                                   entry_types=allowed_types)
+        except Error as e:
+            print(f"Error loading quick entries: {e}")
+            return
+
+        quick_frame = tk.Frame(form_frame, bg="#f8fafc", padx=15, pady=10)
+        quick_frame.grid(row=1, column=2, rowspan=7, padx=(30, 0), pady=10, sticky="n")
+        tk.Label(quick_frame, text="⚡ Quick Entry", font=("Arial", 12, "bold"),
+                 bg="#f8fafc", fg="#1e293b").pack(anchor="w")
+        if notice:
+            tk.Label(quick_frame, text=notice, font=("Arial", 9), bg="#f8fafc", fg="#10b981",
+                     wraplength=220, justify=tk.LEFT).pack(anchor="w", pady=(5, 0))
+        if not templates:
+            tk.Label(quick_frame, text="Entries saved often will appear here", font=("Arial", 9),
+                     bg="#f8fafc", fg="#64748b", wraplength=220, justify=tk.LEFT).pack(anchor="w", pady=10)
+        for template in templates:
+            tk.Button(quick_frame, text=f"{template.title}\n{template.entry_type} · usually {template.typical_time()}",
+                      font=("Arial", 9), bg="white", fg="#1e293b", width=28, anchor="w", justify=tk.LEFT,
+                      command=lambda t=template: self.quick_log(t)).pack(fill=tk.X, pady=3)
+        tk.Label(quick_frame, text="One tap logs it now; type a title for more", font=("Arial", 8),
+                 bg="#f8fafc", fg="#64748b").pack(anchor="w", pady=(5, 0))
+
+        # Title autocomplete: a list under the title box, matched against the in-memory trie
+        suggestions = tk.Listbox(form_frame, font=self.normal_font, height=6, activestyle="dotbox")
+        shown = []
+
+        def hide(event=None):
+            suggestions.place_forget()
+
+        def pick(event=None):
+            selection = suggestions.curselection()
+            if not shown or not suggestions.winfo_ismapped():
+                return None
+            template = shown[selection[0] if selection else 0]
+            title_entry.delete(0, tk.END)
+            title_entry.insert(0, template.title)
+            entry_type.set(template.entry_type)
+            hide()
+            return "break"
+
+        def update(event):
+            if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+                return
+            prefix = title_entry.get().strip()
+            try:
+                matches = self.quick_entries.suggest(self.connection, patient_id, 6, prefix, allowed_types) if prefix else []
+            except Error:
+                matches = []
+            shown[:] = matches
+            suggestions.delete(0, tk.END)
+            for template in matches:
+                suggestions.insert(tk.END, f"{template.title}  ({template.entry_type}, {template.typical_time()})")
+            if matches:
+                suggestions.config(height=len(matches))
+                suggestions.place(in_=title_entry, x=0, rely=1, relwidth=1.4)
+                suggestions.lift()
+            else:
+                hide()
+
+        def move(step):
+            if not shown or not suggestions.winfo_ismapped():
+                return None
+            current = suggestions.curselection()
+            index = min(max((current[0] + step) if current else 0, 0), len(shown) - 1)
+            suggestions.selection_clear(0, tk.END)
+            suggestions.selection_set(index)
+            suggestions.see(index)
+            return "break"
+
+        title_entry.bind('<KeyRelease>', update)
+        title_entry.bind('<Down>', lambda e: move(1))
+        title_entry.bind('<Up>', lambda e: move(-1))
+        title_entry.bind('<Return>', pick)
+        title_entry.bind('<Escape>', hide)
+        title_entry.bind('<FocusOut>', lambda e: title_entry.after(200, hide))
+        suggestions.bind('<ButtonRelease-1>', pick)
+
+    def quick_log(self, template):
+        """Log a frequent entry for now without filling in the form"""
+        now = datetime.now()
+        self.save_entry(template.entry_type, template.title, "", now.strftime('%Y-%m-%d'), now.strftime('%H:%M'),
+                        confirm=False)
+
+    def save_entry(self, entry_type, title, description, date, time, files=(), confirm=True):
+        """Save a new entry with its attached photos and voice notes (confirm=False: a note on the form, no dialog)"""
         if not title or not date or not time:
             messagebox.showerror("Error", "Please fill in title, date, and time")
             return
 
+        staged = []
         try:
-            cursor = self.connection.cursor()
-
             # Determine patient_id based on user role
             if self.current_role == 'patient':
                 patient_id = self.current_user
             elif self.current_role == 'caregiver':
-                cursor.execute("SELECT patient_id FROM caregivers WHERE id = %s", (self.current_user,))
-                patient_id = cursor.fetchone()[0]
+                patient_id = self.queries.fetchvalue(self.connection, "caregiver_patient", (self.current_user,))
             else:  # doctor
                 # For doctors, let them select patient or use first patient for now
-                cursor.execute("SELECT id FROM patients LIMIT 1")
-                p = cursor.fetchone()
-                patient_id = p[0] if p else None
-
-            cursor.execute(
-                """INSERT INTO entries (user_type, user_id, patient_id, entry_type, title, description, entry_date, entry_time)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                (self.current_role, self.current_user, patient_id, entry_type, title, description, date, time)
-            )
-            self.connection.commit()
-            cursor.close()
-
-            self.log_action("ADD_ENTRY", f"Added {entry_type} entry: {title}")
-            messagebox.showinfo("Success", "Entry saved successfully!")
-            self.show_entries()  # Refresh form
+                patient_id = self.queries.fetchvalue(self.connection, "first_patient")
+
+            # Files are copied next to the content-addressed store first and only published
+            # once the rows referring to them are committed; MySQL only keeps their hash
+            for path in files:
+                staged.append((path,) + self.attachments.stage(path))
+
+            # Entry, attachments, change feed and audit record: one transaction, one commit
+            with self.db.unit_of_work() as connection:
+                entry_id = self.queries.insert(
+                    connection, "insert_entry",
+                    (self.current_role, self.current_user, patient_id, entry_type, title, description, date, time)
+                )
+                for path, sha256, size, mime, _ in staged:
+                    self.queries.execute(connection, "insert_attachment", (sha256, size, mime, attachments.kind_of(path)))
+                    self.queries.execute(connection, "link_attachment", (entry_id, sha256, os.path.basename(path)))
+                if patient_id:
+                    changefeed.record_changes(self.queries, connection, 'entries', 'insert', [entry_id], patient_id)
+                self.log_action("ADD_ENTRY", f"Added {entry_type} entry: {title}")
+            for path, sha256, _, _, staged_path in staged:
+                self.attachments.publish(sha256, staged_path)
+                if attachments.kind_of(path) == 'voice':
+                    # Transcoded in the background; photo thumbnails are made when a card first shows them
+                    self.attachments.derive(sha256, 'voice')
+            staged = []
+            if patient_id:
+                self.reports.invalidate(patient_id, date)
+                self.stats.invalidate_table('entries', [patient_id])
+                self.quick_entries.record(patient_id, entry_type, title, time)
+
+            if confirm:
+                messagebox.showinfo("Success", "Entry saved successfully!")
+                self.show_entries()  # Refresh form
+            else:
+                self.show_entries(notice=f"✓ Logged {title} at {time}")
         except Error as e:
             messagebox.showerror("Error", f"Failed to save entry: {e}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save entry: {e}")
+        finally:
+            # Rolled back (or failed before the commit): drop the copies nothing refers to
+            for staged_file in staged:
+                self.attachments.discard(staged_file[-1])
+
+    def reminder_range(self):
+        """First and last day of the reminder screen's window"""
+        today = date.today()
+        if self.reminder_window == 'today':
+            return today, today
+        if self.reminder_window == 'week':
+            monday = today - timedelta(days=today.weekday())
+            return monday, monday + timedelta(days=6)
+        return self.reminder_window
+
+    def reminder_in_window(self, reminder):
+        """Is the reminder listed: dated inside the window, or still open from before it?"""
+        first, last = self.reminder_range()
+        return first <= reminder.reminder_date <= last or (reminder.reminder_date < first and not reminder.is_completed)
+
+    def show_reminder_range(self, first_text, last_text):
+        """Switch the reminder screen to a custom range typed as YYYY-MM-DD"""
+        try:
+            first = datetime.strptime(first_text.strip(), '%Y-%m-%d').date()
+            last = datetime.strptime(last_text.strip(), '%Y-%m-%d').date()
+        except ValueError:
+            messagebox.showerror("Error", "Please enter dates as YYYY-MM-DD")
+            return
+        if last < first:
+            messagebox.showerror("Error", "The end date is before the start date")
+            return
+        self.show_reminders((first, last))
 
-    def show_reminders(self):
-        """Show reminders interface"""
+    def show_reminders(self, window=None):
+        """Show the reminders of one date window (today, this week or a custom range) plus overdue ones"""
         for widget in self.content_frame.winfo_children():
             widget.destroy()
+        if window is not None:
+            self.reminder_window = window
+        first, last = self.reminder_range()
 
         main_frame = tk.Frame(self.content_frame, bg="white", padx=20, pady=20)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -644,6 +859,37 @@ class MemoryCompanionApp:
                             command=self.show_add_reminder)
         add_btn.pack(side=tk.RIGHT)
 
+        # Bulk actions on the ticked reminders
+        tk.Button(header_frame, text="✗ Delete Selected", font=self.normal_font,
+                  bg="#ef4444", fg="white", padx=15, pady=5,
+                  command=lambda: self.delete_reminders(self.selected_ids(self.reminder_cards))).pack(side=tk.RIGHT, padx=5)
+        tk.Button(header_frame, text="✓ Complete Selected", font=self.normal_font,
+                  bg="#10b981", fg="white", padx=15, pady=5,
+                  command=lambda: self.complete_reminders(self.selected_ids(self.reminder_cards))).pack(side=tk.RIGHT, padx=5)
+
+        # Date window: only these days are loaded (plus reminders still open from earlier days)
+        window_frame = tk.Frame(main_frame, bg="white")
+        window_frame.pack(fill=tk.X, pady=(0, 15))
+        for text, choice in (("Today", 'today'), ("This Week", 'week')):
+            chosen = self.reminder_window == choice
+            tk.Button(window_frame, text=text, font=("Arial", 9), padx=10,
+                      bg="#2563eb" if chosen else "#f1f5f9", fg="white" if chosen else "#1e293b",
+                      command=lambda c=choice: self.show_reminders(c)).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Label(window_frame, text="From", font=("Arial", 9), bg="white").pack(side=tk.LEFT, padx=(15, 5))
+        first_entry = tk.Entry(window_frame, font=("Arial", 9), width=11)
+        first_entry.insert(0, first.isoformat())
+        first_entry.pack(side=tk.LEFT)
+        tk.Label(window_frame, text="to", font=("Arial", 9), bg="white").pack(side=tk.LEFT, padx=5)
+        last_entry = tk.Entry(window_frame, font=("Arial", 9), width=11)
+        last_entry.insert(0, last.isoformat())
+        last_entry.pack(side=tk.LEFT)
+        tk.Button(window_frame, text="Show", font=("Arial", 9), padx=10,
+                  bg="#2563eb" if isinstance(self.reminder_window, tuple) else "#f1f5f9",
+                  fg="white" if isinstance(self.reminder_window, tuple) else "#1e293b",
+                  command=lambda: self.show_reminder_range(first_entry.get(), last_entry.get())).pack(side=tk.LEFT, padx=5)
+        tk.Label(window_frame, text=f"{first:%a %d %b} – {last:%a %d %b %Y}" if first != last else f"{first:%A %d %b %Y}",
+                 font=("Arial", 9, "bold"), bg="white", fg="#64748b").pack(side=tk.RIGHT)
+
         # Reminders list
         list_frame = tk.Frame(main_frame, bg="white")
         list_frame.pack(fill=tk.BOTH, expand=True)
@@ -665,53 +911,53 @@ class MemoryCompanionApp:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Load reminders
+        self.reminder_cards = {}
+        self.reminder_list_frame = scrollable_frame
+        self.mark_screen_fresh('reminders')
         try:
-            cursor = self.connection.cursor()
-
             # Get patient_id based on role
             if self.current_role == 'patient':
                 patient_id = self.current_user
             elif self.current_role == 'caregiver':
-                cursor.execute("SELECT patient_id FROM caregivers WHERE id = %s", (self.current_user,))
-                result = cursor.fetchone()
-                patient_id = result[0] if result else None
+                patient_id = self.queries.fetchvalue(self.connection, "caregiver_patient", (self.current_user,))
             else:
                 patient_id = None
 
+            if patient_id and not self.consent_allows(patient_id):
+                # Caregiver without consent: only the reminders they created themselves
+                tk.Label(scrollable_frame, text="The patient's reminders are hidden (no consent); showing your own",
+                         font=("Arial", 9), bg="white", fg="#64748b").pack(anchor="w", pady=(0, 10))
+                patient_id = None
+
+            # Open reminders from before the window first, then the window; both are index range scans
+            # Cards are built as rows arrive instead of after the whole list has been fetched
             if patient_id:
-                cursor.execute(
-                    """SELECT id, title, description, reminder_date, reminder_time, reminder_type, is_completed
-                       FROM reminders WHERE patient_id = %s AND is_active = TRUE
-                       ORDER BY reminder_date, reminder_time""",
-                    (patient_id,)
-                )
+                owner = (patient_id,)
+                overdue, listed = "overdue_reminders_for_patient", "reminders_for_patient_between"
             else:
-                cursor.execute(
-                    """SELECT id, title, description, reminder_date, reminder_time, reminder_type, is_completed
-                       FROM reminders WHERE user_type = %s AND user_id = %s AND is_active = TRUE
-                       ORDER BY reminder_date, reminder_time""",
-                    (self.current_role, self.current_user)
-                )
-
-            reminders = cursor.fetchall()
-            cursor.close()
-
-            if not reminders:
-                tk.Label(scrollable_frame, text="No active reminders", font=self.normal_font,
+                owner = (self.current_role, self.current_user)
+                overdue, listed = "overdue_reminders_for_user", "reminders_for_user_between"
+            for reminder in self.queries.stream(self.connection, overdue, owner + (first,), Reminder):
+                self.create_reminder_card(scrollable_frame, reminder)
+            for reminder in self.queries.stream(self.connection, listed, owner + (first, last), Reminder):
+                self.create_reminder_card(scrollable_frame, reminder)
+
+            if not self.reminder_cards:
+                tk.Label(scrollable_frame, text="No reminders in this period", font=self.normal_font,
                          bg="white", fg="#64748b").pack(pady=50)
-            else:
-                for reminder in reminders:
-                    self.create_reminder_card(scrollable_frame, reminder)
         except Error as e:
             messagebox.showerror("Error", f"Failed to load reminders: {e}")
 
     def create_reminder_card(self, parent, reminder):
-        """Create a reminder display card"""
-        reminder_id, title, description, date, time, r_type, is_completed = reminder
+        """Create a reminder display card (reminder is a records.Reminder)"""
 
         card = tk.Frame(parent, bg="#f8fafc", relief=tk.RAISED, borderwidth=1)
         card.pack(fill=tk.X, pady=5, padx=5)
 
+        # Selection box for bulk actions
+        selected = tk.BooleanVar(value=False)
+        tk.Checkbutton(card, variable=selected, bg="#f8fafc").pack(side=tk.LEFT, padx=(10, 0))
+
         # Left side - content
         content_frame = tk.Frame(card, bg="#f8fafc")
         content_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=15, pady=10)
@@ -720,7 +966,7 @@ class MemoryCompanionApp:
         title_frame = tk.Frame(content_frame, bg="#f8fafc")
         title_frame.pack(fill=tk.X)
 
-        tk.Label(title_frame, text=title, font=("Arial", 12, "bold"),
+        tk.Label(title_frame, text=reminder.title, font=("Arial", 12, "bold"),
                  bg="#f8fafc", fg="#1e293b").pack(side=tk.LEFT)
 
         type_colors = {
@@ -730,28 +976,33 @@ class MemoryCompanionApp:
             'other': '#64748b'
         }
 
-        type_label = tk.Label(title_frame, text=r_type.upper(), font=("Arial", 8),
-                              bg=type_colors.get(r_type, '#64748b'), fg="white", padx=8, pady=2)
+        type_label = tk.Label(title_frame, text=reminder.reminder_type.upper(), font=("Arial", 8),
+                              bg=type_colors.get(reminder.reminder_type, '#64748b'), fg="white", padx=8, pady=2)
         type_label.pack(side=tk.LEFT, padx=10)
 
         # Description
-        if description:
-            tk.Label(content_frame, text=description, font=("Arial", 10),
-                     bg="#f8fafc", fg="#64748b", wraplength=400, justify=tk.LEFT).pack(anchor="w", pady=5)
+        if reminder.description:
+            desc_label = tk.Label(content_frame, text=reminder.description, font=("Arial", 10),
+                                  bg="#f8fafc", fg="#64748b", wraplength=400, justify=tk.LEFT)
+            desc_label.pack(anchor="w", pady=5)
+            self.add_show_more(content_frame, desc_label, "reminder_description", reminder.id,
+                               reminder.description, reminder.description_length)
 
         # Date and time
-        datetime_text = f"📅 {date} ⏰ {time}"
-        tk.Label(content_frame, text=datetime_text, font=("Arial", 10),
-                 bg="#f8fafc", fg="#64748b").pack(anchor="w")
+        datetime_text = f"📅 {reminder.reminder_date} ⏰ {reminder.reminder_time}"
+        overdue = not reminder.is_completed and reminder.reminder_date < date.today()
+        tk.Label(content_frame, text=f"⚠ Overdue · {datetime_text}" if overdue else datetime_text, font=("Arial", 10),
+                 bg="#f8fafc", fg="#dc2626" if overdue else "#64748b").pack(anchor="w")
 
         # Right side - actions
         action_frame = tk.Frame(card, bg="#f8fafc")
         action_frame.pack(side=tk.RIGHT, padx=15, pady=10)
 
-        if not is_completed:
+        complete_btn = None
+        if not reminder.is_completed:
             complete_btn = tk.Button(action_frame, text="✓ Complete", font=("Arial", 9),
                                      bg="#10b981", fg="white", padx=10, pady=5,
-                                     command=lambda: self.complete_reminder(reminder_id))
+                                     command=lambda: self.complete_reminder(reminder.id))
             complete_btn.pack(pady=2)
         else:
             tk.Label(action_frame, text="✓ Completed", font=("Arial", 9),
@@ -759,9 +1010,40 @@ class MemoryCompanionApp:
 
         delete_btn = tk.Button(action_frame, text="✗ Delete", font=("Arial", 9),
                                bg="#ef4444", fg="white", padx=10, pady=5,
-                               command=lambda: self.delete_reminder(reminder_id))
+                               command=lambda: self.delete_reminder(reminder.id))
         delete_btn.pack(pady=2)
 
+        self.reminder_cards[reminder.id] = {
+            'card': card, 'parent': parent, 'selected': selected,
+            'complete_btn': complete_btn, 'delete_btn': delete_btn,
+            'sort_key': (str(reminder.reminder_date), str(reminder.reminder_time)),
+        }
+
+    def selected_ids(self, cards):
+        """Ids of the cards whose selection box is ticked"""
+        return [item_id for item_id, widgets in cards.items() if widgets['selected'].get()]
+
+    def mark_reminder_card_completed(self, reminder_id):
+        """Swap the Complete button for the Completed badge without reloading the list"""
+        widgets = self.reminder_cards.get(reminder_id)
+        if not widgets or not widgets['card'].winfo_exists():
+            return
+        if widgets['complete_btn'] is not None:
+            action_frame = widgets['complete_btn'].master
+            widgets['complete_btn'].destroy()
+            widgets['complete_btn'] = None
+            tk.Label(action_frame, text="✓ Completed", font=("Arial", 9),
+                     bg="#10b981", fg="white", padx=10, pady=5).pack(pady=2, before=widgets['delete_btn'])
+        widgets['selected'].set(False)
+
+    def remove_reminder_card(self, reminder_id):
+        """Drop a reminder card from the list without reloading it"""
+        widgets = self.reminder_cards.pop(reminder_id, None)
+        if not widgets or not widgets['card'].winfo_exists():
+            return
+        widgets['card'].destroy()
+        self.show_empty_label(widgets['parent'], self.reminder_cards, "No reminders in this period")
+
     def show_add_reminder(self):
         """Show add reminder dialog with free text"""
         dialog = tk.Toplevel(self.root)
@@ -831,28 +1113,27 @@ class MemoryCompanionApp:
             return
 
         try:
-            cursor = self.connection.cursor()
-
             # Determine patient_id based on role
             if self.current_role == 'patient':
                 patient_id = self.current_user
             elif self.current_role == 'caregiver':
-                cursor.execute("SELECT patient_id FROM caregivers WHERE id = %s", (self.current_user,))
-                patient_id = cursor.fetchone()[0]
+                patient_id = self.queries.fetchvalue(self.connection, "caregiver_patient", (self.current_user,))
             else:  # doctor
-                cursor.execute("SELECT id FROM patients LIMIT 1")
-                p = cursor.fetchone()
-                patient_id = p[0] if p else None
-
-            cursor.execute(
-                """INSERT INTO reminders (user_type, user_id, patient_id, title, description, reminder_date, reminder_time, reminder_type)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                (self.current_role, self.current_user, patient_id, title, description, date, time, r_type)
-            )
-            self.connection.commit()
-            cursor.close()
-
-            self.log_action("ADD_REMINDER", f"Added {r_type} reminder: {title}")
+                patient_id = self.queries.fetchvalue(self.connection, "first_patient")
+
+            with self.db.unit_of_work() as connection:
+                reminder_id = self.queries.insert(
+                    connection, "insert_reminder",
+                    (self.current_role, self.current_user, patient_id, title, description, date, time, r_type)
+                )
+                if patient_id:
+                    changefeed.record_changes(self.queries, connection, 'reminders', 'insert', [reminder_id], patient_id)
+                self.log_action("ADD_REMINDER", f"Added {r_type} reminder: {title}")
+            if patient_id:
+                self.stats.invalidate_table('reminders', [patient_id])
+            if self.escalation and r_type == 'medication':
+                self.escalation.arm(reminder_id, patient_id, title, date, time)
+
             messagebox.showinfo("Success", "Reminder saved successfully!")
             dialog.destroy()
             self.show_reminders()
@@ -861,36 +1142,49 @@ class MemoryCompanionApp:
 
     def complete_reminder(self, reminder_id):
         """Mark reminder as completed"""
+        self.complete_reminders([reminder_id])
+
+    def complete_reminders(self, reminder_ids):
+        """Mark reminders as completed with one UPDATE and one audit record"""
+        if not reminder_ids:
+            messagebox.showinfo("Reminders", "Select at least one reminder first")
+            return
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(
-                "UPDATE reminders SET is_completed = TRUE WHERE id = %s",
-                (reminder_id,)
-            )
-            self.connection.commit()
-            cursor.close()
-
-            self.log_action("COMPLETE_REMINDER", f"Completed reminder ID: {reminder_id}")
-            self.show_reminders()
+            self.run_bulk_action("complete_reminders", reminder_ids, "COMPLETE_REMINDER", "Completed", "reminder",
+                                 'reminders', 'update')
         except Error as e:
             messagebox.showerror("Error", f"Failed to complete reminder: {e}")
+            return False
+        for reminder_id in reminder_ids:
+            if self.escalation:
+                self.escalation.disarm(reminder_id)
+            self.mark_reminder_card_completed(reminder_id)
+        return True
 
     def delete_reminder(self, reminder_id):
         """Delete a reminder"""
-        if messagebox.askyesno("Confirm", "Are you sure you want to delete this reminder?"):
-            try:
-                cursor = self.connection.cursor()
-                cursor.execute(
-                    "UPDATE reminders SET is_active = FALSE WHERE id = %s",
-                    (reminder_id,)
-                )
-                self.connection.commit()
-                cursor.close()
+        self.delete_reminders([reminder_id])
 
-                self.log_action("DELETE_REMINDER", f"Deleted reminder ID: {reminder_id}")
-                self.show_reminders()
+    def delete_reminders(self, reminder_ids):
+        """Delete reminders with one UPDATE and one audit record"""
+        if not reminder_ids:
+            messagebox.showinfo("Reminders", "Select at least one reminder first")
+            return
+        if len(reminder_ids) == 1:
+            question = "Are you sure you want to delete this reminder?"
+        else:
+            question = f"Are you sure you want to delete these {len(reminder_ids)} reminders?"
+        if messagebox.askyesno("Confirm", question):
+            try:
+                self.run_bulk_action("deactivate_reminders", reminder_ids, "DELETE_REMINDER", "Deleted", "reminder",
+                                     'reminders', 'delete')
             except Error as e:
                 messagebox.showerror("Error", f"Failed to delete reminder: {e}")
+                return
+            for reminder_id in reminder_ids:
+                if self.escalation:
+                    self.escalation.disarm(reminder_id)
+                self.remove_reminder_card(reminder_id)
 
     def show_summaries(self):
         """Show summaries interface"""
@@ -918,64 +1212,74 @@ class MemoryCompanionApp:
                                 command=lambda: self.generate_summary(summary_frame, period_var.get()))
             rb.pack(side=tk.LEFT, padx=5)
 
+        # Static reports (cached on disk, opened in the browser)
+        report_frame = tk.Frame(main_frame, bg="white")
+        report_frame.pack(pady=5)
+
+        tk.Button(report_frame, text="📄 Open Report", font=self.normal_font,
+                  bg="#2563eb", fg="white", padx=15, pady=5,
+                  command=lambda: self.open_report(period_var.get())).pack(side=tk.LEFT, padx=5)
+
+        tk.Button(report_frame, text="🗓 Year at a Glance", font=self.normal_font,
+                  bg="#10b981", fg="white", padx=15, pady=5,
+                  command=self.show_heatmap).pack(side=tk.LEFT, padx=5)
+
+        if self.current_role == 'doctor':
+            tk.Button(report_frame, text="🗂 Prepare Clinic Reports", font=self.normal_font,
+                      bg="#8b5cf6", fg="white", padx=15, pady=5,
+                      command=self.prepare_clinic_reports).pack(side=tk.LEFT, padx=5)
+
         # Summary display area
         summary_frame = tk.Frame(main_frame, bg="white")
         summary_frame.pack(fill=tk.BOTH, expand=True, pady=20)
 
         # Generate initial summary
+        self.summary_frame = summary_frame
+        self.mark_screen_fresh('summaries')
         self.generate_summary(summary_frame, "daily")
 
     def generate_summary(self, parent, period):
         """Generate and display summary"""
         for widget in parent.winfo_children():
             widget.destroy()
+        self.summary_period = period
 
         try:
-            cursor = self.connection.cursor()
+            # Read-only screen: served by the replica when one is configured
+            reader = self.db.reader()
 
             # Get patient_id based on role
             if self.current_role == 'patient':
                 patient_id = self.current_user
             elif self.current_role == 'caregiver':
-                cursor.execute("SELECT patient_id FROM caregivers WHERE id = %s", (self.current_user,))
-                result = cursor.fetchone()
-                patient_id = result[0] if result else None
+                patient_id = self.queries.fetchvalue(reader, "caregiver_patient", (self.current_user,))
             else:
-                cursor.execute("SELECT id FROM patients LIMIT 1")
-                result = cursor.fetchone()
-                patient_id = result[0] if result else None
+                patient_id = self.queries.fetchvalue(reader, "first_patient")
 
             if not patient_id:
                 tk.Label(parent, text="No patient data available", font=self.normal_font,
                          bg="white", fg="#64748b").pack(pady=50)
-                cursor.close()
+                return
+            # The patient's data lives on their shard, which need not be the session's
+            reader = self.services.patient_reader(patient_id)
+            if not self.consent.allows(reader, patient_id, self.current_role):
+                self.show_no_consent(parent, "summaries")
                 return
 
             # Determine date range
             if period == 'daily':
                 date_filter = datetime.now().date()
-                query = """SELECT entry_type, COUNT(*) FROM entries
-                           WHERE patient_id = %s AND entry_date = %s
-                           GROUP BY entry_type"""
-                cursor.execute(query, (patient_id, date_filter))
+                results = self.queries.fetchall(reader, "summary_counts_on_date", (patient_id, date_filter))
                 time_label = f"Today ({date_filter})"
             elif period == 'weekly':
                 date_filter = (datetime.now() - timedelta(days=7)).date()
-                query = """SELECT entry_type, COUNT(*) FROM entries
-                           WHERE patient_id = %s AND entry_date >= %s
-                           GROUP BY entry_type"""
-                cursor.execute(query, (patient_id, date_filter))
+                results = self.queries.fetchall(reader, "summary_counts_since", (patient_id, date_filter))
                 time_label = "Last 7 Days"
             else:  # monthly
                 date_filter = (datetime.now() - timedelta(days=30)).date()
-                query = """SELECT entry_type, COUNT(*) FROM entries
-                           WHERE patient_id = %s AND entry_date >= %s
-                           GROUP BY entry_type"""
-                cursor.execute(query, (patient_id, date_filter))
+                results = self.queries.fetchall(reader, "summary_counts_since", (patient_id, date_filter))
                 time_label = "Last 30 Days"
 
-            results = cursor.fetchall()
-
             # Display header
             tk.Label(parent, text=f"Summary for: {time_label}", font=("Arial", 14, "bold"),
                      bg="white", fg="#2563eb").pack(pady=20)
@@ -1027,21 +1331,9 @@ class MemoryCompanionApp:
                          bg="white", fg="#1e293b").pack(pady=(30, 10))
 
                 if period == 'daily':
-                    cursor.execute(
-                        """SELECT title, entry_type, entry_time, description FROM entries
-                           WHERE patient_id = %s AND entry_date = %s
-                           ORDER BY entry_time DESC LIMIT 5""",
-                        (patient_id, date_filter)
-                    )
+                    recent = self.queries.fetchall(reader, "summary_recent_on_date", (patient_id, date_filter))
                 else:
-                    cursor.execute(
-                        """SELECT title, entry_type, entry_date, entry_time, description FROM entries
-                           WHERE patient_id = %s AND entry_date >= %s
-                           ORDER BY entry_date DESC, entry_time DESC LIMIT 5""",
-                        (patient_id, date_filter)
-                    )
-
-                recent = cursor.fetchall()
+                    recent = self.queries.fetchall(reader, "summary_recent_since", (patient_id, date_filter))
 
                 if recent:
                     recent_frame = tk.Frame(parent, bg="#f8fafc", relief=tk.RAISED, borderwidth=1)
@@ -1051,18 +1343,18 @@ class MemoryCompanionApp:
                         item_frame = tk.Frame(recent_frame, bg="white", pady=8)
                         item_frame.pack(fill=tk.X, padx=10, pady=3)
 
-                        if len(item) == 4:  # daily
-                            title, entry_type, entry_time, description = item
+                        if len(item) == 5:  # daily
+                            title, entry_type, entry_time, description, description_length = item
                             text = f"• {title} ({entry_type}) - {entry_time}"
                         else:  # weekly/monthly
-                            title, entry_type, entry_date, entry_time, description = item
+                            title, entry_type, entry_date, entry_time, description, description_length = item
                             text = f"• {title} ({entry_type}) - {entry_date} {entry_time}"
 
                         tk.Label(item_frame, text=text, font=("Arial", 10, "bold"),
                                  bg="white", fg="#1e293b", anchor="w").pack(fill=tk.X, padx=10)
 
                         if description and len(description) > 0:
-                            desc_preview = description[:100] + "..." if len(description) > 100 else description
+                            desc_preview = description + "..." if description_length > len(description) else description
                             tk.Label(item_frame, text=desc_preview, font=("Arial", 9),
                                      bg="white", fg="#64748b", anchor="w", wraplength=500, justify=tk.LEFT).pack(fill=tk.X, padx=25)
 
@@ -1076,37 +1368,208 @@ class MemoryCompanionApp:
                 summary_text = self.generate_ai_summary(results, total, period)
                 tk.Label(ai_frame, text=summary_text, font=("Arial", 10),
                          bg="#eff6ff", fg="#1e40af", wraplength=600, justify=tk.LEFT).pack(padx=20, pady=20)
-
-            cursor.close()
         except Error as e:
             messagebox.showerror("Error", f"Failed to generate summary: {e}")
 
-    def generate_ai_summary(self, results, total, period):
-        """Generate AI-like summary text"""
-        period_text = {"daily": "today", "weekly": "this week", "monthly": "this month"}[period]
+    def show_heatmap(self):
+        """Twelve months of a patient's activity per day on one Canvas; clicking a day shows its breakdown"""
+        for widget in self.content_frame.winfo_children():
+            widget.destroy()
+        self.current_screen = None
 
-        summary = f"You had {total} activities logged {period_text}. "
+        main_frame = tk.Frame(self.content_frame, bg="white", padx=20, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
 
-        if results:
-            type_dict = {entry_type: count for entry_type, count in results}
+        header = tk.Frame(main_frame, bg="white")
+        header.pack(fill=tk.X, pady=(0, 20))
+        tk.Button(header, text="← Summaries", font=("Arial", 9), command=self.show_summaries).pack(side=tk.LEFT)
+        tk.Label(header, text="Activity over the last 12 months", font=self.header_font,
+                 bg="white", fg="#1e293b").pack(side=tk.LEFT, padx=15)
 
-            if 'medication' in type_dict:
-                summary += f"Great job tracking {type_dict['medication']} medication entries! "
+        try:
+            # Read-only screen: served by the replica when one is configured
+            reader = self.db.reader()
+            if self.current_role == 'patient':
+                patient_id = self.current_user
+            elif self.current_role == 'caregiver':
+                patient_id = self.queries.fetchvalue(reader, "caregiver_patient", (self.current_user,))
+            else:
+                patient_id = self.queries.fetchvalue(reader, "first_patient")
 
-            if 'social' in type_dict:
-                summary += f"You engaged in {type_dict['social']} social activities, which is excellent for cognitive health. "
+            if not patient_id:
+                tk.Label(main_frame, text="No patient data available", font=self.normal_font,
+                         bg="white", fg="#64748b").pack(pady=50)
+                return
+            reader = self.services.patient_reader(patient_id)
+            if not self.consent.allows(reader, patient_id, self.current_role):
+                self.show_no_consent(main_frame, "activity history")
+                return
 
-            if 'activity' in type_dict or 'meal' in type_dict:
-                summary += "Maintaining daily routines is important for memory care. "
+            # One grouped query (or the daily rollups), cached until an entry write invalidates it
+            today = datetime.now().date()
+            buckets = self.stats.get_or_load(
+                patient_id, "year_heatmap", today.strftime('%Y-%m-%d'),
+                lambda: heatmap.load_buckets(self.queries, reader, patient_id, today))
+        except Error as e:
+            messagebox.showerror("Error", f"Failed to load activity: {e}")
+            return
 
-            if 'observation' in type_dict:
-                summary += f"Caregivers logged {type_dict['observation']} observations, showing active monitoring. "
+        filter_frame = tk.Frame(main_frame, bg="white")
+        filter_frame.pack(fill=tk.X, pady=(0, 10))
+        tk.Label(filter_frame, text="Entry type:", font=self.normal_font, bg="white").pack(side=tk.LEFT)
+        type_box = ttk.Combobox(filter_frame, values=("all",) + heatmap.ENTRY_TYPES, state="readonly", width=15)
+        type_box.current(0)
+        type_box.pack(side=tk.LEFT, padx=5)
+        legend = tk.Label(filter_frame, text="", font=("Arial", 9), bg="white", fg="#64748b")
+        legend.pack(side=tk.LEFT, padx=15)
+
+        canvas = tk.Canvas(main_frame, bg="white", highlightthickness=0)
+        canvas.pack(anchor="w")
+
+        detail = tk.Label(main_frame, text="Click a day to see its activities", font=self.normal_font,
+                          bg="white", fg="#64748b", justify=tk.LEFT)
+        detail.pack(anchor="w", pady=15)
+
+        def redraw(*_):
+            entry_type = None if type_box.get() == "all" else type_box.get()
+            totals = buckets.totals(entry_type)
+            peak = heatmap.draw(canvas, buckets, entry_type)
+            legend.config(text=f"{sum(totals)} entries on {sum(1 for value in totals if value)} days, "
+                               f"busiest day {peak}")
+
+        def show_day(event):
+            index = heatmap.day_at(buckets, event.x, event.y)
+            if index is None:
+                return
+            heatmap.select(canvas, buckets, index)
+            # Drill-down reads the cached buckets, no query
+            day = buckets.start_date + timedelta(days=index)
+            breakdown = buckets.breakdown(index)
+            lines = [day.strftime('%A, %B %d, %Y')]
+            if breakdown:
+                lines += [f"  {entry_type.capitalize()}: {count}" for entry_type, count in breakdown.items()]
+            else:
+                lines.append("  No activities logged")
+            detail.config(text="\n".join(lines), fg="#1e293b")
 
-            summary += "Keep up the consistent logging!"
-        else:
-            summary = f"No activities were logged {period_text}. Try to log daily activities to track progress."
+        type_box.bind("<<ComboboxSelected>>", redraw)
+        canvas.bind("<Button-1>", show_day)
+        redraw()
+
+    def generate_ai_summary(self, results, total, period):
+        """Generate AI-like summary text"""
+        return reports.summary_text(results, total, period)
+
+    def open_report(self, period, patient_id=None):
+        """Open the cached report for the summary patient (doctors pick one), rendering it first if needed"""
+        if self.current_role == 'doctor' and patient_id is None:
+            self.choose_patient("Open Report", lambda chosen: self.open_report(period, chosen))
+            return
+        try:
+            if self.current_role == 'patient':
+                patient_id = self.current_user
+            elif self.current_role == 'caregiver':
+                patient_id = self.queries.fetchvalue(self.connection, "caregiver_patient", (self.current_user,))
+            allowed = not patient_id or self.consent_allows(patient_id)
+        except Error as e:
+            messagebox.showerror("Error", f"Failed to open report: {e}")
+            return
+        if not patient_id:
+            messagebox.showinfo("Reports", "No patient data available")
+            return
+        if not allowed:
+            messagebox.showinfo("Reports", f"The patient has not consented to {self.current_role} access to reports")
+            return
+
+        path = self.reports.get(patient_id, period)
+        if path:
+            webbrowser.open(f"file://{path}")
+            return
+
+        def worker():
+            try:
+                new_path = self.reports.generate(patient_id, period)
+                self.root.after(0, lambda: webbrowser.open(f"file://{new_path}"))
+            except Exception as e:
+                self.root.after(0, lambda e=e: messagebox.showerror("Error", f"Failed to generate report: {e}"))
+
+        threading.Thread(target=worker, daemon=True).start()
 
-        return summary
+    def choose_patient(self, title, on_choose):
+        """Doctor's patient picker: prefix search over the directory, calls on_choose(patient_id)"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title)
+        dialog.geometry("420x420")
+        dialog.configure(bg="white")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        frame = tk.Frame(dialog, bg="white", padx=20, pady=15)
+        frame.pack(fill=tk.BOTH, expand=True)
+        tk.Label(frame, text="Search:", font=self.normal_font, bg="white").pack(anchor="w")
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(frame, textvariable=search_var, font=self.normal_font)
+        search_entry.pack(fill=tk.X, pady=(5, 10))
+        listbox = tk.Listbox(frame, font=self.normal_font, height=12)
+        listbox.pack(fill=tk.BOTH, expand=True)
+        state = {'ids': [], 'job': None}
+
+        def load():
+            state['job'] = None
+            if not listbox.winfo_exists():
+                return
+            try:
+                rows, _ = self.directory.page(search_var.get().strip() or None,
+                                              consent_type=consent.ROLE_CONSENT['doctor'])
+            except Error as e:
+                messagebox.showerror("Error", f"Failed to load patient info: {e}")
+                return
+            listbox.delete(0, tk.END)
+            state['ids'] = []
+            for patient_id, name, username, *_ in rows:
+                state['ids'].append(patient_id)
+                listbox.insert(tk.END, f"{name} ({username})")
+
+        def search_changed(_):
+            # Wait for a pause in typing before querying
+            if state['job'] is not None:
+                self.root.after_cancel(state['job'])
+            state['job'] = self.root.after(300, load)
+
+        def choose(*_):
+            selection = listbox.curselection()
+            if not selection:
+                return
+            patient_id = state['ids'][selection[0]]
+            dialog.destroy()
+            on_choose(patient_id)
+
+        btn_frame = tk.Frame(frame, bg="white")
+        btn_frame.pack(pady=(10, 0))
+        tk.Button(btn_frame, text="Open", font=self.normal_font, bg="#2563eb", fg="white", padx=20, pady=5,
+                  command=choose).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cancel", font=self.normal_font, bg="#64748b", fg="white", padx=20, pady=5,
+                  command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<KeyRelease>", search_changed)
+        listbox.bind("<Double-Button-1>", choose)
+        search_entry.focus_set()
+        load()
+
+    def prepare_clinic_reports(self):
+        """Render daily/weekly/monthly reports for every patient in the background"""
+        def worker():
+            try:
+                futures = self.reports.refresh()
+                failed = sum(1 for f in futures if f.exception() is not None)
+                message = f"{len(futures) - failed} reports regenerated, the rest were already up to date."
+                if failed:
+                    message += f"\n{failed} reports failed."
+                self.root.after(0, lambda: messagebox.showinfo("Reports", message))
+            except Exception as e:
+                self.root.after(0, lambda e=e: messagebox.showerror("Error", f"Failed to prepare reports: {e}"))
+
+        threading.Thread(target=worker, daemon=True).start()
+        messagebox.showinfo("Reports", "Preparing reports in the background. You can keep working.")
 
     def view_all_entries(self):
         """View all entries in a scrollable list"""
@@ -1138,6 +1601,11 @@ class MemoryCompanionApp:
                                command=lambda: self.load_entries(list_frame, filter_var.get()))
         refresh_btn.pack(side=tk.LEFT, padx=10)
 
+        if self.current_role in ['patient', 'caregiver']:
+            tk.Button(filter_frame, text="✗ Delete Selected", font=self.normal_font,
+                      bg="#ef4444", fg="white", padx=15, pady=5,
+                      command=lambda: self.delete_entries(self.selected_ids(self.entry_cards))).pack(side=tk.RIGHT, padx=10)
+
         # Entries list with scrollbar
         list_container = tk.Frame(main_frame, bg="white")
         list_container.pack(fill=tk.BOTH, expand=True)
@@ -1168,70 +1636,65 @@ class MemoryCompanionApp:
         """Load and display entries"""
         for widget in parent.winfo_children():
             widget.destroy()
+        self.entry_cards = {}
+        self.entry_list_frame = parent
+        self.entries_filter = filter_type
+        self.mark_screen_fresh('entries')
 
         try:
-            cursor = self.connection.cursor()
-
             # Get patient_id based on role
             if self.current_role == 'patient':
                 patient_id = self.current_user
             elif self.current_role == 'caregiver':
-                cursor.execute("SELECT patient_id FROM caregivers WHERE id = %s", (self.current_user,))
-                result = cursor.fetchone()
-                patient_id = result[0] if result else None
+                patient_id = self.queries.fetchvalue(self.connection, "caregiver_patient", (self.current_user,))
             else:  # doctor - show all patients
                 patient_id = None
+            self.entries_patient_id = patient_id
+
+            if patient_id and not self.consent_allows(patient_id):
+                self.show_no_consent(parent, "entries")
+                return
 
             if patient_id:
+                # The patient's whole history: streamed into cards rather than fetched into one list
                 if filter_type == 'all':
-                    cursor.execute(
-                        """SELECT id, entry_type, title, description, entry_date, entry_time, user_type
-                           FROM entries WHERE patient_id = %s
-                           ORDER BY entry_date DESC, entry_time DESC""",
-                        (patient_id,)
-                    )
+                    entries = self.queries.stream(self.connection, "entries_for_patient", (patient_id,), Entry)
                 else:
-                    cursor.execute(
-                        """SELECT id, entry_type, title, description, entry_date, entry_time, user_type
-                           FROM entries WHERE patient_id = %s AND entry_type = %s
-                           ORDER BY entry_date DESC, entry_time DESC""",
-                        (patient_id, filter_type)
-                    )
+                    entries = self.queries.stream(self.connection, "entries_for_patient_by_type",
+                                                  (patient_id, filter_type), Entry)
             else:
-                # Doctor view - show recent entries from all patients
+                # Doctor view - show recent entries from all patients (read-only, replica when configured;
+                # merged newest first across shards)
+                by_date = lambda row: (row[5], row[6])
                 if filter_type == 'all':
-                    cursor.execute(
-                        """SELECT id, entry_type, title, description, entry_date, entry_time, user_type
-                           FROM entries
-                           ORDER BY entry_date DESC, entry_time DESC LIMIT 50"""
-                    )
+                    entries = self.read_across("recent_entries", key=by_date, limit=50)
                 else:
-                    cursor.execute(
-                        """SELECT id, entry_type, title, description, entry_date, entry_time, user_type
-                           FROM entries WHERE entry_type = %s
-                           ORDER BY entry_date DESC, entry_time DESC LIMIT 50""",
-                        (filter_type,)
-                    )
+                    entries = self.read_across("recent_entries_by_type", (filter_type,), key=by_date, limit=50)
+                # Rows carry patient_id so consent is checked in memory, not joined into the query
+                entries = self.visible_entries(entries)
 
-            entries = cursor.fetchall()
-            cursor.close()
-
-            if not entries:
+            for entry in entries:
+                self.create_entry_card(parent, entry)
+            if not self.entry_cards:
                 tk.Label(parent, text="No entries found", font=self.normal_font,
                          bg="white", fg="#64748b").pack(pady=50)
             else:
-                for entry in entries:
-                    self.create_entry_card(parent, entry)
+                # After the cards are on screen, so attachments never delay the list
+                self.root.after_idle(lambda ids=list(self.entry_cards): self.load_entry_attachments(ids))
         except Error as e:
             messagebox.showerror("Error", f"Failed to load entries: {e}")
 
     def create_entry_card(self, parent, entry):
-        """Create an entry display card with free text visible"""
-        entry_id, entry_type, title, description, date, time, user_type = entry
+        """Create an entry display card with free text visible (entry is a records.Entry)"""
 
         card = tk.Frame(parent, bg="#f8fafc", relief=tk.RAISED, borderwidth=1)
         card.pack(fill=tk.X, pady=5, padx=5)
 
+        # Selection box for bulk delete
+        selected = tk.BooleanVar(value=False)
+        if self.current_role in ['patient', 'caregiver']:
+            tk.Checkbutton(card, variable=selected, bg="#f8fafc").pack(side=tk.LEFT, padx=(10, 0))
+
         content_frame = tk.Frame(card, bg="#f8fafc")
         content_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=15, pady=10)
 
@@ -1239,7 +1702,7 @@ class MemoryCompanionApp:
         title_frame = tk.Frame(content_frame, bg="#f8fafc")
         title_frame.pack(fill=tk.X)
 
-        tk.Label(title_frame, text=title, font=("Arial", 12, "bold"),
+        tk.Label(title_frame, text=entry.title, font=("Arial", 12, "bold"),
                  bg="#f8fafc", fg="#1e293b").pack(side=tk.LEFT)
 
         colors = {
@@ -1248,26 +1711,33 @@ class MemoryCompanionApp:
             'observation': '#06b6d4'
         }
 
-        type_label = tk.Label(title_frame, text=entry_type.upper(), font=("Arial", 8),
-                              bg=colors.get(entry_type, '#64748b'), fg="white", padx=8, pady=2)
+        type_label = tk.Label(title_frame, text=entry.entry_type.upper(), font=("Arial", 8),
+                              bg=colors.get(entry.entry_type, '#64748b'), fg="white", padx=8, pady=2)
         type_label.pack(side=tk.LEFT, padx=10)
 
         # User type badge
-        user_badge = tk.Label(title_frame, text=f"by {user_type}", font=("Arial", 8),
+        user_badge = tk.Label(title_frame, text=f"by {entry.user_type}", font=("Arial", 8),
                               bg="#e0e7ff", fg="#4338ca", padx=8, pady=2)
         user_badge.pack(side=tk.LEFT, padx=5)
 
-        # Description - SHOW FULL FREE TEXT
-        if description:
+        # Description - preview from the list query, full free text on demand
+        if entry.description:
             desc_frame = tk.Frame(content_frame, bg="white", relief=tk.SOLID, borderwidth=1)
             desc_frame.pack(fill=tk.X, pady=8)
 
-            tk.Label(desc_frame, text=description, font=("Arial", 10),
-                     bg="white", fg="#1e293b", wraplength=600, justify=tk.LEFT,
-                     anchor="w", padx=10, pady=8).pack(fill=tk.X)
+            desc_label = tk.Label(desc_frame, text=entry.description, font=("Arial", 10),
+                                  bg="white", fg="#1e293b", wraplength=600, justify=tk.LEFT,
+                                  anchor="w", padx=10, pady=8)
+            desc_label.pack(fill=tk.X)
+            self.add_show_more(desc_frame, desc_label, "entry_description", entry.id,
+                               entry.description, entry.description_length)
+
+        # Attachments are filled in after the list is built (see load_entry_attachments)
+        attachment_frame = tk.Frame(content_frame, bg="#f8fafc")
+        attachment_frame.pack(anchor="w")
 
         # Date and time
-        datetime_text = f"📅 {date} ⏰ {time}"
+        datetime_text = f"📅 {entry.entry_date} ⏰ {entry.entry_time}"
         tk.Label(content_frame, text=datetime_text, font=("Arial", 10),
                  bg="#f8fafc", fg="#64748b").pack(anchor="w")
 
@@ -1275,27 +1745,190 @@ class MemoryCompanionApp:
         if self.current_role in ['patient', 'caregiver']:
             delete_btn = tk.Button(card, text="✗", font=("Arial", 12),
                                    bg="#ef4444", fg="white", padx=10, pady=5,
-                                   command=lambda: self.delete_entry(entry_id, parent))
+                                   command=lambda: self.delete_entry(entry.id, parent))
             delete_btn.pack(side=tk.RIGHT, padx=10)
 
+        self.entry_cards[entry.id] = {'card': card, 'parent': parent, 'selected': selected, 'date': entry.entry_date,
+                                      'sort_key': (str(entry.entry_date), str(entry.entry_time)),
+                                      'template': (entry.entry_type, entry.title, entry.entry_time),
+                                      'attachments': attachment_frame}
+
+    def load_entry_attachments(self, entry_ids):
+        """Add attachment widgets to entry cards with one query; thumbnails load lazily"""
+        entry_ids = list(entry_ids)
+        if not entry_ids:
+            return
+        # The doctor's list spans every shard
+        connections = [self.connection] if self.entries_patient_id else self.reader_connections()
+        try:
+            rows = []
+            for connection in connections:
+                rows += self.queries.fetchall_in(connection, "attachments_for_entries", entry_ids)
+        except Error as e:
+            print(f"Error loading attachments: {e}")
+            return
+        for entry_id, sha256, kind, name in rows:
+            widgets = self.entry_cards.get(entry_id)
+            if not widgets or not widgets['attachments'].winfo_exists():
+                continue
+            frame = widgets['attachments']
+            if kind == 'photo':
+                thumb = tk.Label(frame, text=f"🖼 {name}", font=("Arial", 9), bg="#e2e8f0", fg="#1e293b",
+                                 padx=6, pady=4, cursor="hand2")
+                thumb.bind("<Button-1>", lambda _, h=sha256, n=name: self.show_photo(h, n))
+                thumb.pack(side=tk.LEFT, padx=(0, 6), pady=4)
+                self.attachments.thumbnail(
+                    sha256, lambda data, label=thumb: self.root.after(0, lambda: self.show_thumbnail(label, data)))
+            else:
+                tk.Button(frame, text=f"🔊 {name}", font=("Arial", 9), bg="#e2e8f0", fg="#1e293b",
+                          command=lambda h=sha256: self.open_attachment(self.attachments.voice_path(h))
+                          ).pack(side=tk.LEFT, padx=(0, 6), pady=4)
+
+    def show_thumbnail(self, label, data):
+        """Swap a photo placeholder for its thumbnail (Tk thread)"""
+        if not data or not label.winfo_exists():
+            return
+        try:
+            image = tk.PhotoImage(data=data)
+        except tk.TclError:
+            return
+        label.config(image=image, text="", padx=0, pady=0)
+        label.image = image  # keep a reference, Tk does not
+
+    def show_photo(self, sha256, name):
+        """Show a stored photo in its own window, decoded from the store's memory-mapped stream"""
+        if not os.path.exists(self.attachments.object_path(sha256)):
+            messagebox.showerror("Error", "Attachment file is missing from the attachment store")
+            return
+        max_size = (self.root.winfo_screenwidth() - 100, self.root.winfo_screenheight() - 150)
+
+        def worker():
+            try:
+                data = self.attachments.photo_png(sha256, max_size)
+            except (OSError, ValueError) as e:
+                self.root.after(0, lambda e=e: messagebox.showerror("Error", f"Failed to open photo: {e}"))
+                return
+            self.root.after(0, lambda: self.show_photo_window(sha256, name, data))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def show_photo_window(self, sha256, name, data):
+        """Photo viewer window (Tk thread); without Pillow the system viewer opens the original"""
+        if data is None:
+            self.open_attachment(self.attachments.object_path(sha256))
+            return
+        window = tk.Toplevel(self.root)
+        window.title(name)
+        image = tk.PhotoImage(data=data)
+        label = tk.Label(window, image=image, bg="black")
+        label.image = image  # keep a reference, Tk does not
+        label.pack(fill=tk.BOTH, expand=True)
+
+    def open_attachment(self, path):
+        """Open a photo or voice note in the system viewer/player"""
+        if not os.path.exists(path):
+            messagebox.showerror("Error", "Attachment file is missing from the attachment store")
+            return
+        webbrowser.open(f"file://{path}")
+
+    def add_show_more(self, parent, label, statement, item_id, preview, length):
+        """Mark a truncated description preview and offer to load the full text"""
+        if not length or length <= len(preview):
+            return
+        label.config(text=preview + "...")
+        button = tk.Button(parent, text="Show more", font=("Arial", 8), bg="#e2e8f0", fg="#1e293b",
+                           relief=tk.FLAT, padx=6)
+        button.config(command=lambda: self.show_full_description(label, button, statement, item_id))
+        button.pack(anchor="w", padx=10, pady=(0, 5))
+
+    def show_full_description(self, label, button, statement, item_id):
+        """Fetch one full description and swap it into the card"""
+        try:
+            description = self.queries.fetchvalue(self.db.reader(), statement, (item_id,), "")
+        except Error as e:
+            messagebox.showerror("Error", f"Failed to load description: {e}")
+            return
+        label.config(text=description)
+        button.destroy()
+
     def delete_entry(self, entry_id, parent):
         """Delete an entry"""
-        if messagebox.askyesno("Confirm", "Are you sure you want to delete this entry?"):
-            try:
-                cursor = self.connection.cursor()
-                cursor.execute("DELETE FROM entries WHERE id = %s", (entry_id,))
-                self.connection.commit()
-                cursor.close()
+        self.delete_entries([entry_id])
 
-                self.log_action("DELETE_ENTRY", f"Deleted entry ID: {entry_id}")
-                self.load_entries(parent, "all")
+    def delete_entries(self, entry_ids):
+        """Delete entries with one DELETE and one audit record, removing their cards in place"""
+        if not entry_ids:
+            messagebox.showinfo("Entries", "Select at least one entry first")
+            return
+        if len(entry_ids) == 1:
+            question = "Are you sure you want to delete this entry?"
+        else:
+            question = f"Are you sure you want to delete these {len(entry_ids)} entries?"
+        if messagebox.askyesno("Confirm", question):
+            try:
+                self.run_bulk_action("delete_entries", entry_ids, "DELETE_ENTRY", "Deleted", "entry",
+                                     'entries', 'delete')
             except Error as e:
                 messagebox.showerror("Error", f"Failed to delete entry: {e}")
+                return
+            parent = None
+            for entry_id in entry_ids:
+                widgets = self.entry_cards.pop(entry_id, None)
+                if widgets and self.entries_patient_id:
+                    self.reports.invalidate(self.entries_patient_id, widgets['date'])
+                    entry_type, title, entry_time = widgets['template']
+                    self.quick_entries.forget(self.entries_patient_id, entry_type, title, widgets['date'], entry_time)
+                if widgets and widgets['card'].winfo_exists():
+                    parent = widgets['parent']
+                    widgets['card'].destroy()
+            if parent is not None:
+                self.show_empty_label(parent, self.entry_cards, "No entries found")
+
+    def show_consent(self):
+        """Patient screen: grant or revoke caregiver and doctor access to their data"""
+        for widget in self.content_frame.winfo_children():
+            widget.destroy()
+        self.current_screen = None
+
+        main_frame = tk.Frame(self.content_frame, bg="white", padx=30, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        tk.Label(main_frame, text="Privacy & Consent", font=self.header_font,
+                 bg="white", fg="#1e293b").pack(pady=(0, 20))
+
+        try:
+            current = self.consent.state(self.connection, self.current_user)
+        except Error as e:
+            messagebox.showerror("Error", f"Failed to load consent: {e}")
+            return
+
+        choices = {}
+        for consent_type, label in consent.CONSENT_LABELS.items():
+            var = tk.BooleanVar(value=current.get(consent_type, self.consent.default))
+            choices[consent_type] = var
+            tk.Checkbutton(main_frame, text=label, variable=var, font=self.normal_font,
+                           bg="white", anchor="w").pack(fill=tk.X, pady=5)
+
+        def save_consent():
+            try:
+                recorded = self.consent.state(self.connection, self.current_user)
+                for consent_type, var in choices.items():
+                    given = var.get()
+                    if recorded.get(consent_type, self.consent.default) != given or consent_type not in recorded:
+                        self.consent.record(self.db, self.current_user, consent_type, given)
+                        self.log_action("CONSENT", f"{'Granted' if given else 'Revoked'} {consent_type}")
+                messagebox.showinfo("Success", "Consent preferences saved")
+            except Error as e:
+                messagebox.showerror("Error", f"Failed to save consent: {e}")
+
+        tk.Button(main_frame, text="Save", font=self.normal_font, bg="#2563eb", fg="white",
+                  padx=20, pady=5, command=save_consent).pack(anchor="w", pady=20)
 
     def show_patient_info(self):
         """Show patient information (caregiver/clinician only)"""
         for widget in self.content_frame.winfo_children():
             widget.destroy()
+        self.current_screen = None
 
         main_frame = tk.Frame(self.content_frame, bg="white", padx=30, pady=20)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -1303,28 +1936,21 @@ class MemoryCompanionApp:
         tk.Label(main_frame, text="Patient Information", font=self.header_font,
                  bg="white", fg="#1e293b").pack(pady=(0, 20))
 
-        try:
-            cursor = self.connection.cursor()
-
-            if self.current_role == 'caregiver':
-                # Show only assigned patient
-                cursor.execute("""
-                    SELECT p.id, p.full_name, p.age, p.diagnosis, p.stage, p.emergency_contact
-                    FROM patients p
-                    JOIN caregivers c ON c.patient_id = p.id
-                    WHERE c.id = %s
-                """, (self.current_user,))
-            else:  # doctor
-                # Show all patients
-                cursor.execute("""
-                    SELECT id, full_name, age, diagnosis, stage, emergency_contact
-                    FROM patients
-                """)
-
-            patients = cursor.fetchall()
-            cursor.close()
+        if self.current_role == 'doctor':
+            self.show_patient_directory(main_frame)
+            return
 
-            if not patients:
+        try:
+            # Read-only screen: served by the replica when one is configured
+            # Show only assigned patient
+            reader = self.db.reader()
+            patients = [Patient(*row) for row in self.queries.fetchall(reader, "patient_for_caregiver", (self.current_user,))]
+            withheld = [p for p in patients if not self.consent.allows(reader, p.id, self.current_role)]
+            patients = [p for p in patients if p not in withheld]
+
+            if withheld:
+                self.show_no_consent(main_frame, "their details")
+            elif not patients:
                 tk.Label(main_frame, text="No patients found", font=self.normal_font,
                          bg="white", fg="#64748b").pack(pady=50)
             else:
@@ -1333,9 +1959,123 @@ class MemoryCompanionApp:
         except Error as e:
             messagebox.showerror("Error", f"Failed to load patient info: {e}")
 
+    def show_patient_directory(self, parent):
+        """Doctor's patient directory: one page at a time, prefix search and diagnosis/stage filters"""
+        try:
+            diagnoses, stages = self.directory.filter_values()
+        except Error as e:
+            messagebox.showerror("Error", f"Failed to load patient info: {e}")
+            return
+
+        filter_frame = tk.Frame(parent, bg="white")
+        filter_frame.pack(fill=tk.X, pady=(0, 10))
+
+        tk.Label(filter_frame, text="Search:", bg="white").pack(side=tk.LEFT)
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(filter_frame, textvariable=search_var, width=25)
+        search_entry.pack(side=tk.LEFT, padx=(5, 15))
+
+        tk.Label(filter_frame, text="Diagnosis:", bg="white").pack(side=tk.LEFT)
+        diagnosis_box = ttk.Combobox(filter_frame, values=["All"] + diagnoses, state="readonly", width=18)
+        diagnosis_box.current(0)
+        diagnosis_box.pack(side=tk.LEFT, padx=(5, 15))
+
+        tk.Label(filter_frame, text="Stage:", bg="white").pack(side=tk.LEFT)
+        stage_box = ttk.Combobox(filter_frame, values=["All"] + stages, state="readonly", width=12)
+        stage_box.current(0)
+        stage_box.pack(side=tk.LEFT, padx=5)
+
+        columns = ("name", "username", "age", "diagnosis", "stage", "contact")
+        table_frame = tk.Frame(parent, bg="white")
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
+        for column, heading, width in zip(columns, ("Name", "Username", "Age", "Diagnosis", "Stage",
+                                                    "Emergency contact"), (200, 120, 50, 150, 90, 200)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor="w")
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        nav_frame = tk.Frame(parent, bg="white")
+        nav_frame.pack(fill=tk.X, pady=10)
+        prev_btn = tk.Button(nav_frame, text="◀ Previous", font=("Arial", 9), padx=10)
+        prev_btn.pack(side=tk.LEFT)
+        page_label = tk.Label(nav_frame, text="", bg="white", fg="#64748b")
+        page_label.pack(side=tk.LEFT, padx=15)
+        next_btn = tk.Button(nav_frame, text="Next ▶", font=("Arial", 9), padx=10)
+        next_btn.pack(side=tk.LEFT)
+
+        detail_frame = tk.Frame(parent, bg="white")
+        detail_frame.pack(fill=tk.X)
+
+        # Keyset of the row each visited page starts after; the last one is the current page
+        state = {'starts': [None], 'last': None, 'rows': {}, 'job': None}
+
+        def load():
+            search = search_var.get().strip()
+            diagnosis = diagnosis_box.get()
+            stage = stage_box.get()
+            try:
+                rows, has_more = self.directory.page(search or None,
+                                                     None if diagnosis == "All" else diagnosis,
+                                                     None if stage == "All" else stage,
+                                                     state['starts'][-1], consent.ROLE_CONSENT['doctor'])
+            except Error as e:
+                messagebox.showerror("Error", f"Failed to load patient info: {e}")
+                return
+            tree.delete(*tree.get_children())
+            state['rows'] = {}
+            for row in rows:
+                patient_id, name, username, age, diagnosis, stage, contact = row
+                tree.insert("", tk.END, iid=str(patient_id), values=(name, username, age, diagnosis, stage, contact))
+                state['rows'][str(patient_id)] = row
+            state['last'] = rows[-1][:2] if rows else None
+            page_label.config(text=f"Page {len(state['starts'])}" if rows else "No patients found")
+            prev_btn.config(state=tk.NORMAL if len(state['starts']) > 1 else tk.DISABLED)
+            next_btn.config(state=tk.NORMAL if has_more else tk.DISABLED)
+
+        def restart(*_):
+            if state['job'] is not None:
+                self.root.after_cancel(state['job'])
+                state['job'] = None
+            state['starts'] = [None]
+            load()
+
+        def search_changed(*_):
+            # Wait for a pause in typing before querying
+            if state['job'] is not None:
+                self.root.after_cancel(state['job'])
+            state['job'] = self.root.after(300, restart)
+
+        def next_page():
+            state['starts'].append(state['last'])
+            load()
+
+        def prev_page():
+            state['starts'].pop()
+            load()
+
+        def show_selected(_):
+            for widget in detail_frame.winfo_children():
+                widget.destroy()
+            selection = tree.selection()
+            if selection:
+                patient_id, name, _, age, diagnosis, stage, contact = state['rows'][selection[0]]
+                self.create_patient_card(detail_frame, Patient(patient_id, name, age, diagnosis, stage, contact))
+
+        prev_btn.config(command=prev_page)
+        next_btn.config(command=next_page)
+        search_entry.bind("<KeyRelease>", search_changed)
+        search_entry.bind("<Return>", restart)
+        diagnosis_box.bind("<<ComboboxSelected>>", restart)
+        stage_box.bind("<<ComboboxSelected>>", restart)
+        tree.bind("<<TreeviewSelect>>", show_selected)
+        load()
+
     def create_patient_card(self, parent, patient):
-        """Create patient information card"""
-        patient_id, name, age, diagnosis, stage, emergency_contact = patient
+        """Create patient information card (patient is a records.Patient)"""
 
         card = tk.Frame(parent, bg="#f8fafc", relief=tk.RAISED, borderwidth=2)
         card.pack(fill=tk.X, pady=10, padx=10)
@@ -1343,16 +2083,17 @@ class MemoryCompanionApp:
         info_frame = tk.Frame(card, bg="#f8fafc")
         info_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        tk.Label(info_frame, text=name, font=("Arial", 14, "bold"), bg="#f8fafc", fg="#1e293b").pack(anchor="w")
-        tk.Label(info_frame, text=f"Age: {age}   Diagnosis: {diagnosis}   Stage: {stage}",
+        tk.Label(info_frame, text=patient.full_name, font=("Arial", 14, "bold"), bg="#f8fafc", fg="#1e293b").pack(anchor="w")
+        tk.Label(info_frame, text=f"Age: {patient.age}   Diagnosis: {patient.diagnosis}   Stage: {patient.stage}",
                  font=("Arial", 10), bg="#f8fafc", fg="#64748b").pack(anchor="w", pady=5)
-        tk.Label(info_frame, text=f"Emergency contact: {emergency_contact}", font=("Arial", 10),
+        tk.Label(info_frame, text=f"Emergency contact: {patient.emergency_contact}", font=("Arial", 10),
                  bg="#f8fafc", fg="#64748b").pack(anchor="w")
 
     def add_user_form(self):
         """Doctor can add new patients, caregivers, or doctors (simple form in same window)"""
         for w in self.content_frame.winfo_children():
             w.destroy()
+        self.current_screen = None
 
         frame = tk.Frame(self.content_frame, bg="white", padx=30, pady=20)
         frame.pack(fill=tk.BOTH, expand=True)
@@ -1390,12 +2131,10 @@ class MemoryCompanionApp:
                 messagebox.showerror("Error", "Please fill username, password, and full name")
                 return
             try:
-                c = self.connection.cursor()
+                pid_val = None
                 if role == 'patient':
                     # Basic patient insertion; other fields defaulted
-                    c.execute("""INSERT INTO patients (username,password,full_name,age,diagnosis,stage,emergency_contact)
-                                 VALUES (%s,%s,%s,%s,%s,%s,%s)""",
-                              (u, p, n, 65, 'Not Diagnosed', 'Early', ex if ex else 'N/A'))
+                    values = (u, p, n, 65, 'Not Diagnosed', 'Early', ex if ex else 'N/A')
                 elif role == 'caregiver':
                     # caregiver needs patient_id — use given or fallback to first patient
                     if pid_text:
@@ -1403,23 +2142,16 @@ class MemoryCompanionApp:
                             pid_val = int(pid_text)
                         except:
                             messagebox.showerror("Error", "Patient ID must be numeric")
-                            c.close()
                             return
                     else:
-                        c.execute("SELECT id FROM patients LIMIT 1")
-                        pr = c.fetchone()
-                        pid_val = pr[0] if pr else None
-                    c.execute("""INSERT INTO caregivers (username,password,full_name,phone,relationship,patient_id)
-                                 VALUES (%s,%s,%s,%s,%s,%s)""",
-                              (u, p, n, ex if ex else '+91-9000000000', 'Relative', pid_val))
+                        pid_val = self.queries.fetchvalue(self.connection, "first_patient")
+                    values = (u, p, n, ex if ex else '+91-9000000000', 'Relative', pid_val)
                 else:  # doctor
-                    c.execute("""INSERT INTO doctors (username,password,full_name,specialization,license_number,hospital)
-                                 VALUES (%s,%s,%s,%s,%s,%s)""",
-                              (u, p, n, ex if ex else 'General', 'TEMP-LIC', 'Local Hospital'))
-                self.connection.commit()
-                c.close()
+                    values = (u, p, n, ex if ex else 'General', 'TEMP-LIC', 'Local Hospital')
+                with self.db.unit_of_work():
+                    self.create_user(role, u, values, pid_val)
+                    self.log_action("ADD_USER", f"Added new {role}: {u}")
                 messagebox.showinfo("Success", f"{role.capitalize()} added successfully!")
-                self.log_action("ADD_USER", f"Added new {role}: {u}")
                 # Clear fields
                 uname.delete(0, tk.END); pwd.delete(0, tk.END); fname.delete(0, tk.END); extra.delete(0, tk.END); patient_id_entry.delete(0, tk.END)
             except Error as e:
@@ -1431,6 +2163,7 @@ class MemoryCompanionApp:
         """Show audit logs (doctor only)"""
         for w in self.content_frame.winfo_children():
             w.destroy()
+        self.current_screen = None
 
         frame = tk.Frame(self.content_frame, bg="white", padx=20, pady=20)
         frame.pack(fill=tk.BOTH, expand=True)
@@ -1442,73 +2175,129 @@ class MemoryCompanionApp:
         text.pack(fill=tk.BOTH, expand=True)
 
         try:
-            c = self.connection.cursor()
-            c.execute("SELECT action_date, user_type, user_id, action, details FROM audit_logs ORDER BY action_date DESC LIMIT 200")
-            rows = c.fetchall()
-            for r in rows:
-                line = f"{r[0]} | {r[1]}#{r[2]} | {r[3]} | {r[4]}\n"
+            # Read-only screen: served by the replica when one is configured
+            rows = self.read_across("recent_audit_logs", key=lambda row: row[0], limit=200)
+            for event in (AuditEvent(*row) for row in rows):
+                line = f"{event.action_date} | {event.user_type}#{event.user_id} | {event.action} | {event.details}\n"
                 text.insert(tk.END, line)
-            c.close()
         except Error as e:
             messagebox.showerror("Error", f"Failed to load logs: {e}")
 
-    def start_reminder_thread(self):
-        """Start background thread that checks for reminders (simple notification)"""
-        def checker():
-            while self.running:
-                try:
-                    cursor = self.connection.cursor()
-                    now = datetime.now()
-                    today = now.strftime('%Y-%m-%d')
-                    current_time = now.strftime('%H:%M:%S')
-                    # Find reminders for current date and time within next minute
-                    cursor.execute("""
-                        SELECT id, user_type, user_id, patient_id, title, description, reminder_time
-                        FROM reminders
-                        WHERE reminder_date = %s AND is_active = TRUE AND is_completed = FALSE
-                    """, (today,))
-                    reminders = cursor.fetchall()
-                    for r in reminders:
-                        rid, utype, uid, pid, title, desc, rtime = r
-                        # if reminder time equals current hour:minute (ignores seconds)
-                        if isinstance(rtime, str):
-                            time_str = rtime
-                        else:
-                            time_str = rtime.strftime('%H:%M:%S')
-                        if time_str[:5] == current_time[:5]:
-                            # If logged-in user is the target, show a popup (only if matches)
-                            if self.current_role == utype and self.current_user == uid:
-                                try:
-                                    # Show a small popup in main thread
-                                    self.root.after(0, lambda t=title, d=desc: messagebox.showinfo("Reminder", f"{t}\n\n{d}"))
-                                    # Optionally mark as seen? Not marking automatically.
-                                except Exception as e:
-                                    print("Reminder popup failed:", e)
-                    cursor.close()
-                except Exception as e:
-                    print("Reminder thread error:", e)
-                time.sleep(30)  # check every 30 seconds
-        self.reminder_thread = threading.Thread(target=checker, daemon=True)
-        self.reminder_thread.start()
+    def route_reminders(self, due, today):
+        """Post the reminders of the scheduler's check that belong to this session's user (main thread)"""
+        mine = [((rid, today, time_str), rid, title, time_str)
+                for rid, utype, uid, title, time_str in due
+                if self.current_role == utype and self.current_user == uid]
+        if mine:
+            # One hand-off per check; the tray groups them into a single non-modal notice
+            self.show_due_reminders(mine)
+
+    def show_due_reminders(self, due):
+        """Post due reminders to the notification tray (main thread)"""
+        for key, reminder_id, title, time_str in due:
+            self.tray.post(key, reminder_id, title, time_str)
 
     def on_closing(self):
         """Clean up on close"""
+        if not self.owns_services:
+            # Kiosk session: the shared services stay up for the other sessions
+            self.stop_change_polling()
+            self.tray.clear()
+            self.services.remove_session(self)
+            self.root.destroy()
+            return
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
-            self.running = False
-            try:
-                if self.connection:
-                    self.connection.close()
-            except:
-                pass
+            if self.watchdog:
+                print(f"Main loop: {self.watchdog.stats()}")
+                self.watchdog.stop()
+            self.services.shutdown()
             self.root.destroy()
 
     def logout(self):
+        self.stop_change_polling()
+        self.tray.clear()
+        if self.owns_services:
+            # Kiosk sessions share these caches; their entries stay valid across users
+            self.stats.clear()
+            self.consent.invalidate()
+            self.quick_entries.invalidate()
+        self.db = self.home_db
+        self.current_screen = None
+        self.reminder_window = 'week'
         self.current_user = None
         self.current_role = None
+        self.root.title(" Memory Companion - Alzheimer's Care")
         self.show_login()
 
+
+def shared_font(name, **options):
+    """A named Tk font created once per interpreter and reused by every window"""
+    try:
+        return tkfont.nametofont(name)
+    except tk.TclError:
+        return tkfont.Font(name=name, family="Arial", **options)
+
+
+class KioskApp:
+    """Launcher for several concurrent sessions, each in its own window, sharing one Services"""
+
+    def __init__(self, root, seed_sample_data=False, profile=False):
+        self.root = root
+        self.root.title(" Memory Companion - Kiosk")
+        self.root.geometry("360x200")
+        self.root.configure(bg="#f0f4f8")
+        self.services = Services(seed_sample_data)
+        self.watchdog = None
+        if config.WATCHDOG_ENABLED or profile:
+            self.watchdog = stallwatch.StallWatchdog(
+                root, config.WATCHDOG_STALL_MS, config.WATCHDOG_HEARTBEAT_MS, config.WATCHDOG_LOG,
+                profile=profile, sample_ms=config.PROFILE_SAMPLE_MS, profile_dir=config.PROFILE_DIR,
+                context=self.session_screens)
+            self.watchdog.start()
+
+        tk.Label(root, text=" Memory Companion", font=shared_font("mc-header", size=16, weight="bold"),
+                 bg="#f0f4f8", fg="#2563eb").pack(pady=(25, 5))
+        self.count_label = tk.Label(root, text="", font=("Arial", 9), bg="#f0f4f8", fg="#64748b")
+        self.count_label.pack()
+        tk.Button(root, text="➕ New Session", font=shared_font("mc-normal", size=11),
+                  bg="#2563eb", fg="white", padx=20, pady=8, command=self.new_session).pack(pady=15)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+        self.services.start()
+        self.new_session()
+
+    def new_session(self):
+        window = tk.Toplevel(self.root)
+        MemoryCompanionApp(window, services=self.services)
+        window.bind("<Destroy>", lambda e: e.widget is window and self.update_count(), add="+")
+        self.update_count()
+
+    def update_count(self):
+        if self.count_label.winfo_exists():
+            count = len(self.services.sessions)
+            self.count_label.config(text=f"{count} open session{'s' if count != 1 else ''}")
+
+    def session_screens(self):
+        """Open screen of every session, for stall reports"""
+        return ",".join(str(session.current_screen) for session in list(self.services.sessions))
+
+    def on_closing(self):
+        if messagebox.askokcancel("Quit", "Close all sessions and quit?"):
+            if self.watchdog:
+                print(f"Main loop: {self.watchdog.stats()}")
+                self.watchdog.stop()
+            for session in list(self.services.sessions):
+                session.stop_change_polling()
+                self.services.remove_session(session)
+            self.services.shutdown()
+            self.root.destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
-    app = MemoryCompanionApp(root)
+    seed = config.SEED_SAMPLE_DATA or "--seed-sample-data" in sys.argv[1:]
+    profile = config.PROFILE_ENABLED or "--profile" in sys.argv[1:]
+    if config.KIOSK_MODE or "--kiosk" in sys.argv[1:]:
+        app = KioskApp(root, seed_sample_data=seed, profile=profile)
+    else:
+        app = MemoryCompanionApp(root, seed_sample_data=seed, profile=profile)
     root.mainloop()
-
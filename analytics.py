@@ -0,0 +1,272 @@
+"""De-identified analytics snapshot: a star-schema SQLite file built incrementally from the MySQL databases.
+
+Cohort questions (activity by diagnosis and stage, adherence by age band, ...)
+scan this file instead of the live entries table, so they never compete with
+interactive users. Only ids, dates, types, age, diagnosis and stage are copied;
+names, titles, descriptions and audit details stay in MySQL.
+
+Each run continues from per-shard high-water marks kept in the file: rows with
+ids above the last copied id are appended, and change_log rows after the last
+seen change id re-read (or drop) the entries and reminders that were updated
+or deleted since. Patients are small and re-copied every run.
+"""
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dim_date (
+    date_key INTEGER PRIMARY KEY,  -- yyyymmdd
+    day TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    iso_week INTEGER NOT NULL,
+    weekday INTEGER NOT NULL       -- 0 = Monday
+);
+CREATE TABLE IF NOT EXISTS dim_patient (
+    patient_id INTEGER PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    age INTEGER,
+    age_band TEXT,
+    diagnosis TEXT,
+    stage TEXT
+);
+CREATE TABLE IF NOT EXISTS fact_entry (
+    shard INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL,
+    patient_id INTEGER,
+    date_key INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    entry_type TEXT NOT NULL,
+    user_type TEXT NOT NULL,
+    PRIMARY KEY (shard, entry_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_fact_entry_patient ON fact_entry (patient_id, date_key);
+CREATE INDEX IF NOT EXISTS idx_fact_entry_date ON fact_entry (date_key);
+CREATE TABLE IF NOT EXISTS fact_reminder (
+    shard INTEGER NOT NULL,
+    reminder_id INTEGER NOT NULL,
+    patient_id INTEGER,
+    date_key INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    reminder_type TEXT NOT NULL,
+    user_type TEXT NOT NULL,
+    is_active INTEGER NOT NULL,
+    is_completed INTEGER NOT NULL,
+    PRIMARY KEY (shard, reminder_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_fact_reminder_patient ON fact_reminder (patient_id, date_key);
+CREATE TABLE IF NOT EXISTS fact_audit (
+    shard INTEGER NOT NULL,
+    audit_id INTEGER NOT NULL,
+    date_key INTEGER NOT NULL,
+    user_type TEXT NOT NULL,
+    action TEXT NOT NULL,
+    PRIMARY KEY (shard, audit_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshot_state (
+    shard INTEGER NOT NULL,
+    source TEXT NOT NULL,          -- entries, reminders, audit_logs (last id) or change_log (last change id)
+    high_water INTEGER NOT NULL,
+    PRIMARY KEY (shard, source)
+);
+CREATE TABLE IF NOT EXISTS snapshot_runs (
+    finished_at TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    rows_copied INTEGER NOT NULL
+);
+"""
+
+# Fact table and column count per source table
+_FACT_TABLES = {'entries': ("fact_entry", 7), 'reminders': ("fact_reminder", 9), 'audit_logs': ("fact_audit", 5)}
+
+AGE_BANDS = ((0, 59, "<60"), (60, 69, "60-69"), (70, 79, "70-79"), (80, 89, "80-89"), (90, 200, "90+"))
+
+# Ready-made cohort queries for `memory-companion analytics query NAME`
+REPORTS = {
+    'activity_by_diagnosis': """
+        SELECT p.diagnosis, e.entry_type, COUNT(*) AS entries,
+               ROUND(COUNT(*) * 1.0 / COUNT(DISTINCT e.patient_id), 1) AS per_patient
+        FROM fact_entry e JOIN dim_patient p USING (patient_id)
+        WHERE e.date_key BETWEEN :since AND :until
+        GROUP BY p.diagnosis, e.entry_type ORDER BY p.diagnosis, entries DESC""",
+    'activity_by_stage': """
+        SELECT p.stage, COUNT(*) AS entries, COUNT(DISTINCT e.patient_id) AS patients,
+               ROUND(COUNT(*) * 1.0 / COUNT(DISTINCT e.patient_id), 1) AS per_patient
+        FROM fact_entry e JOIN dim_patient p USING (patient_id)
+        WHERE e.date_key BETWEEN :since AND :until
+        GROUP BY p.stage ORDER BY p.stage""",
+    'adherence_by_age_band': """
+        SELECT p.age_band, COUNT(*) AS medication_reminders, SUM(r.is_completed) AS completed,
+               ROUND(100.0 * SUM(r.is_completed) / COUNT(*), 1) AS adherence_pct
+        FROM fact_reminder r JOIN dim_patient p USING (patient_id)
+        WHERE r.reminder_type = 'medication' AND r.is_active = 1 AND r.date_key BETWEEN :since AND :until
+        GROUP BY p.age_band ORDER BY p.age_band""",
+    'activity_by_hour': """
+        SELECT e.hour, d.weekday, COUNT(*) AS entries
+        FROM fact_entry e JOIN dim_date d USING (date_key)
+        WHERE e.date_key BETWEEN :since AND :until
+        GROUP BY e.hour, d.weekday ORDER BY e.hour, d.weekday""",
+    'monthly_entries': """
+        SELECT d.year, d.month, COUNT(*) AS entries, COUNT(DISTINCT e.patient_id) AS active_patients
+        FROM fact_entry e JOIN dim_date d USING (date_key)
+        WHERE e.date_key BETWEEN :since AND :until
+        GROUP BY d.year, d.month ORDER BY d.year, d.month""",
+}
+
+
+def age_band(age):
+    if age is None:
+        return None
+    for low, high, label in AGE_BANDS:
+        if low <= age <= high:
+            return label
+    return None
+
+
+def date_key(value):
+    """yyyymmdd integer of a date, datetime or ISO string"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def hour_of(value):
+    """Hour of a MySQL TIME (timedelta) value"""
+    return int(value.total_seconds()) // 3600 if hasattr(value, "total_seconds") else int(str(value)[:2])
+
+
+def open_snapshot(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(SNAPSHOT_SCHEMA)
+    return connection
+
+
+class SnapshotBuilder:
+    """Copies new and changed rows from every shard into the snapshot file"""
+
+    def __init__(self, queries, routers, path, batch_size=1000):
+        self.queries = queries
+        self.routers = routers
+        self.path = path
+        self.batch_size = batch_size
+        self._dates = set()
+
+    def build(self, full=False):
+        """Bring the snapshot up to date (from scratch with full); returns {source: rows copied}"""
+        started = time.perf_counter()
+        if full and os.path.exists(self.path):
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        out = open_snapshot(self.path)
+        copied = {'patients': 0, 'entries': 0, 'reminders': 0, 'audit_logs': 0, 'changes': 0}
+        try:
+            self._dates = {row[0] for row in out.execute("SELECT date_key FROM dim_date")}
+            for shard, router in enumerate(self.routers):
+                connection = router.reader()
+                marks = dict(out.execute("SELECT source, high_water FROM snapshot_state WHERE shard = ?", (shard,)))
+                # Take the change high-water mark first: changes made while copying are replayed next run
+                latest_change = self.queries.fetchvalue(connection, "latest_change_id", (), 0)
+                copied['patients'] += self._copy_patients(out, connection, shard)
+                if 'change_log' in marks:
+                    copied['changes'] += self._apply_changes(out, connection, shard, marks['change_log'], latest_change)
+                for source in ('entries', 'reminders', 'audit_logs'):
+                    count, marks[source] = self._append(out, connection, shard, source, marks.get(source, 0))
+                    copied[source] += count
+                marks['change_log'] = latest_change
+                out.executemany("INSERT OR REPLACE INTO snapshot_state (shard, source, high_water) VALUES (?, ?, ?)",
+                                [(shard, source, mark) for source, mark in marks.items()])
+                # One SQLite transaction per shard: a failed run leaves the last complete state
+                out.commit()
+            out.execute("INSERT INTO snapshot_runs (finished_at, seconds, rows_copied) VALUES (?, ?, ?)",
+                        (datetime.now().isoformat(timespec='seconds'), round(time.perf_counter() - started, 3),
+                         sum(copied.values())))
+            out.commit()
+        finally:
+            out.close()
+        return copied
+
+    def _add_dates(self, out, keys):
+        new = [key for key in keys if key not in self._dates]
+        rows = []
+        for key in new:
+            day = date(key // 10000, key // 100 % 100, key % 100)
+            rows.append((key, day.isoformat(), day.year, day.month, day.isocalendar()[1], day.weekday()))
+        out.executemany("INSERT OR IGNORE INTO dim_date VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self._dates.update(new)
+
+    def _copy_patients(self, out, connection, shard):
+        rows = [(patient_id, shard, age, age_band(age), diagnosis, stage)
+                for patient_id, age, diagnosis, stage in self.queries.stream(connection, "analytics_patients")]
+        out.executemany("INSERT OR REPLACE INTO dim_patient VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def _facts(self, source, shard, rows):
+        """Fact-table rows (and their date keys) for MySQL rows of one source"""
+        if source == 'entries':
+            facts = [(shard, row_id, patient_id, date_key(day), hour_of(at), entry_type, user_type)
+                     for row_id, patient_id, day, at, entry_type, user_type in rows]
+        elif source == 'reminders':
+            facts = [(shard, row_id, patient_id, date_key(day), hour_of(at), reminder_type, user_type,
+                      int(bool(is_active)), int(bool(is_completed)))
+                     for row_id, patient_id, day, at, reminder_type, user_type, is_active, is_completed in rows]
+        else:
+            facts = [(shard, row_id, date_key(action_date), user_type, action)
+                     for row_id, action_date, user_type, action in rows]
+        return facts, {fact[3] if source != 'audit_logs' else fact[2] for fact in facts}
+
+    def _store(self, out, source, facts, keys):
+        self._add_dates(out, keys)
+        table, width = _FACT_TABLES[source]
+        out.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({', '.join('?' * width)})", facts)
+
+    def _append(self, out, connection, shard, source, high_water):
+        """Copy rows with ids above high_water in batches; returns (count, new high-water mark)"""
+        count = 0
+        batch = []
+        for row in self.queries.stream(connection, f"analytics_{source}_after", (high_water,)):
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._store(out, source, *self._facts(source, shard, batch))
+                count += len(batch)
+                high_water = batch[-1][0]
+                batch = []
+        if batch:
+            self._store(out, source, *self._facts(source, shard, batch))
+            count += len(batch)
+            high_water = batch[-1][0]
+        return count, high_water
+
+    def _apply_changes(self, out, connection, shard, after, until):
+        """Re-read entries and reminders touched by change_log rows in (after, until]"""
+        changed = {'entries': set(), 'reminders': set()}
+        while after < until:
+            rows = self.queries.fetchall(connection, "changes_after_id", (after,))
+            if not rows:
+                break
+            for change_id, table, row_id, _ in rows:
+                if change_id <= until and table in changed:
+                    changed[table].add(row_id)
+            after = rows[-1][0]
+        for source, ids in changed.items():
+            ids = sorted(ids)
+            table, _ = _FACT_TABLES[source]
+            key = "entry_id" if source == 'entries' else "reminder_id"
+            for start in range(0, len(ids), self.batch_size):
+                chunk = ids[start:start + self.batch_size]
+                # Deleted rows simply do not come back
+                out.executemany(f"DELETE FROM {table} WHERE shard = ? AND {key} = ?", [(shard, i) for i in chunk])
+                rows = self.queries.fetchall_in(connection, f"analytics_{source}_by_ids", chunk)
+                self._store(out, source, *self._facts(source, shard, rows))
+        return sum(len(ids) for ids in changed.values())
+
+
+def query(path, sql, params=None):
+    """Run a read-only query on the snapshot; returns (column names, rows)"""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = connection.execute(sql, params or {})
+        return [column[0] for column in cursor.description or ()], cursor.fetchall()
+    finally:
+        connection.close()
@@ -0,0 +1,26 @@
+"""Archival of completed and deleted reminders, so the live reminders table only holds the active set"""
+from datetime import date, timedelta
+
+from changefeed import record_changes
+
+
+def archive_reminders(queries, router, retention_days, today=None):
+    """Move reminders dated more than retention_days ago that are completed or deleted to reminders_archive.
+
+    Works in batches of up to 500, one transaction each: the rows are logged in
+    the change feed as deleted (open screens drop their cards, the analytics
+    snapshot re-reads them from the archive), copied and then removed. The
+    copy ignores ids already archived, so two instances running it at once do
+    no harm. Returns the number of reminders moved.
+    """
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    moved = 0
+    while True:
+        with router.unit_of_work() as connection:
+            ids = [row[0] for row in queries.fetchall(connection, "archivable_reminders", (cutoff,))]
+            if not ids:
+                return moved
+            record_changes(queries, connection, 'reminders', 'delete', ids)
+            queries.execute_in(connection, "archive_reminders", ids)
+            queries.execute_in(connection, "purge_reminders", ids)
+        moved += len(ids)
@@ -0,0 +1,232 @@
+"""Content-addressed file store for photos and voice notes attached to entries"""
+import hashlib
+import io
+import mimetypes
+import mmap
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageFile
+except ImportError:  # thumbnails are optional
+    Image = None
+
+import config
+
+KINDS = {'image': 'photo', 'audio': 'voice'}
+CHUNK_SIZE = 1024 * 1024
+
+
+def kind_of(path):
+    """'photo', 'voice', or None for files that cannot be attached"""
+    mime = mimetypes.guess_type(path)[0] or ""
+    return KINDS.get(mime.split("/")[0])
+
+
+def _mapped(path):
+    """Memory-map a file read-only (None for empty files, which cannot be mapped)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_bytes(path):
+    """Whole file contents through a memory map (used for thumbnails handed to Tk)"""
+    mapped = _mapped(path)
+    if mapped is None:
+        return b""
+    with mapped:
+        return mapped[:]
+
+
+def sha256_of(path):
+    mapped = _mapped(path)
+    if mapped is None:
+        return hashlib.sha256().hexdigest()
+    with mapped:
+        return hashlib.sha256(mapped).hexdigest()
+
+
+def make_thumbnail(source, target, size):
+    """Process-pool worker: write a PNG thumbnail of an image"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        tmp_path = target + ".tmp"
+        image.save(tmp_path, format="PNG")
+    os.replace(tmp_path, target)
+    return target
+
+
+def transcode_voice(source, target):
+    """Process-pool worker: transcode a voice note to small mono Opus with ffmpeg"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + ".tmp.ogg"
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", source, "-ac", "1", "-c:a", "libopus",
+                    "-b:a", "24k", tmp_path], check=True, timeout=300)
+    os.replace(tmp_path, target)
+    return target
+
+
+class AttachmentStore:
+    """Files stored once under their SHA-256, however many entries reference them.
+
+    Originals live in objects/ab/<sha256>; thumbnails and transcodes derived
+    from them live in derived/<sha256>/ and are produced in a process pool,
+    thumbnails only when a card first shows them. Only the hash and metadata go
+    into MySQL (attachments, entry_attachments). Writers stage() files before
+    their transaction and publish() them after the commit, or discard() them
+    when it rolls back, so the store never gains files no row refers to.
+    """
+
+    def __init__(self, root_dir=None, thumbnail_size=None, max_workers=None):
+        self.root_dir = root_dir or config.ATTACHMENTS_DIR
+        self.thumbnail_size = thumbnail_size or config.ATTACHMENT_THUMBNAIL_SIZE
+        self.max_workers = max_workers
+        self._pool = None
+        self._pending = {}
+        # Reentrant: a future that is already done runs _forget inside derive()
+        self._lock = threading.RLock()
+
+    def object_path(self, sha256):
+        return os.path.join(self.root_dir, "objects", sha256[:2], sha256)
+
+    def thumbnail_path(self, sha256):
+        return os.path.join(self.root_dir, "derived", sha256, f"thumb-{self.thumbnail_size}.png")
+
+    def voice_path(self, sha256):
+        """Playable voice note: the transcode when it exists, otherwise the original"""
+        transcoded = os.path.join(self.root_dir, "derived", sha256, "voice.ogg")
+        return transcoded if os.path.exists(transcoded) else self.object_path(sha256)
+
+    def stage(self, path):
+        """Copy a file next to its final place without publishing it; returns (sha256, size, mime, staged_path).
+
+        staged_path is None when the same content is already stored.
+        """
+        sha256 = sha256_of(path)
+        target = self.object_path(sha256)
+        mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if os.path.exists(target):
+            return sha256, os.path.getsize(target), mime, None
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, staged_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".staged-")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, staged_path)
+        except OSError:
+            self.discard(staged_path)
+            raise
+        return sha256, os.path.getsize(staged_path), mime, staged_path
+
+    def publish(self, sha256, staged_path):
+        """Move a staged copy into the store (an atomic rename on the same file system)"""
+        if staged_path is not None:
+            os.replace(staged_path, self.object_path(sha256))
+
+    @staticmethod
+    def discard(staged_path):
+        """Remove a staged copy whose transaction rolled back"""
+        if staged_path is not None and os.path.exists(staged_path):
+            os.remove(staged_path)
+
+    def put(self, path):
+        """Store a file right away (no-op when the same content is already stored); returns (sha256, size, mime)"""
+        sha256, size, mime, staged_path = self.stage(path)
+        self.publish(sha256, staged_path)
+        return sha256, size, mime
+
+    def stream(self, sha256, chunk_size=CHUNK_SIZE):
+        """Yield the stored file as memoryview chunks of one memory map, without copying it.
+
+        Each chunk is only valid until the next one is requested.
+        """
+        mapped = _mapped(self.object_path(sha256))
+        if mapped is None:
+            return
+        with mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), chunk_size):
+                    chunk = view[offset:offset + chunk_size]
+                    try:
+                        yield chunk
+                    finally:
+                        chunk.release()
+            finally:
+                view.release()
+
+    def photo_png(self, sha256, max_size):
+        """PNG bytes of a stored photo scaled down to fit max_size, decoded from stream() as the
+        chunks arrive (None without Pillow). Slow for large photos; call it off the Tk thread."""
+        if Image is None:
+            return None
+        parser = ImageFile.Parser()
+        for chunk in self.stream(sha256):
+            # The parser may keep what it is fed, and a chunk dies with the next one
+            parser.feed(bytes(chunk))
+        with parser.close() as image:
+            image.thumbnail(max_size)
+            out = io.BytesIO()
+            image.save(out, format="PNG")
+        return out.getvalue()
+
+    def _pool_executor(self):
+        if self._pool is None:
+            # spawn, not fork: the parent runs Tk and background threads
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def derive(self, sha256, kind):
+        """Start the thumbnail (photo) or transcode (voice) in the pool; returns a future or None"""
+        if kind == 'photo':
+            if Image is None:
+                return None
+            target = self.thumbnail_path(sha256)
+            job = (make_thumbnail, self.object_path(sha256), target, self.thumbnail_size)
+        else:
+            if shutil.which("ffmpeg") is None:
+                return None
+            target = os.path.join(self.root_dir, "derived", sha256, "voice.ogg")
+            job = (transcode_voice, self.object_path(sha256), target)
+        if os.path.exists(target):
+            return None
+        with self._lock:
+            # One job per derivative, however many cards ask for it at once
+            future = self._pending.get(target)
+            if future is None:
+                future = self._pool_executor().submit(*job)
+                self._pending[target] = future
+                future.add_done_callback(lambda f: self._forget(target))
+        return future
+
+    def _forget(self, target):
+        with self._lock:
+            self._pending.pop(target, None)
+
+    def thumbnail(self, sha256, callback):
+        """Call callback(png_bytes or None) once the thumbnail exists, generating it if needed.
+
+        The callback may run on a pool thread; UI code must hand it to the Tk thread.
+        """
+        path = self.thumbnail_path(sha256)
+        if os.path.exists(path):
+            callback(read_bytes(path))
+            return
+        future = self.derive(sha256, 'photo')
+        if future is None:
+            callback(read_bytes(path) if os.path.exists(path) else None)
+            return
+        future.add_done_callback(lambda f: callback(read_bytes(path) if f.exception() is None else None))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,87 @@
+"""Startup benchmark: time-to-first-paint of the login screen and time until the database is ready
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [--runs 10] [--db-timeout 30]
+
+Needs a display (or Xvfb). The database part is reported as "n/a" when MySQL is unreachable.
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import time
+import tkinter as tk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def load_app_module():
+    """Import MEMORY-COMPANION.py (its file name is not a valid module name)"""
+    spec = importlib.util.spec_from_file_location("memory_companion_app", os.path.join(ROOT, "MEMORY-COMPANION.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure_once(app_module, db_timeout):
+    start = time.perf_counter()
+    root = tk.Tk()
+    app = app_module.MemoryCompanionApp(root)
+
+    # First paint: the login frame is mapped on screen
+    while True:
+        root.update()
+        children = root.winfo_children()
+        if children and children[0].winfo_ismapped():
+            break
+    first_paint = time.perf_counter() - start
+
+    services = app.services
+    db_ready = None
+    deadline = time.perf_counter() + db_timeout
+    while time.perf_counter() < deadline:
+        root.update()
+        if services.db_ready.is_set():
+            db_ready = time.perf_counter() - start
+            break
+        if not services.init_thread.is_alive():
+            break  # schema setup failed
+        time.sleep(0.005)
+
+    # Stops the background threads and closes every connection before the next run
+    if app.watchdog:
+        app.watchdog.stop()
+    services.shutdown()
+    root.destroy()
+    return first_paint, db_ready
+
+
+def fmt_ms(values):
+    if not values:
+        return "n/a"
+    return f"median {statistics.median(values) * 1000:.1f} ms, max {max(values) * 1000:.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--db-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    app_module = load_app_module()
+    paints, readies = [], []
+    for _ in range(args.runs):
+        first_paint, db_ready = measure_once(app_module, args.db_timeout)
+        paints.append(first_paint)
+        if db_ready is not None:
+            readies.append(db_ready)
+
+    print(f"time-to-first-paint ({args.runs} runs): {fmt_ms(paints)}")
+    print(f"time-to-database-ready ({len(readies)} runs): {fmt_ms(readies)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""Load test: many concurrent users driving the app's data-access paths against a local database
+
+Run from the repository root:
+
+    python benchmarks/loadtest.py --setup --users 200 --mix caregiver=70,patient=20,doctor=10 \
+        --ramp 30 --duration 120
+
+Every virtual user is a thread with its own connection, like one running app instance. It logs in
+and then repeats the queries behind save_entry, load_entries, generate_summary, save_reminder and
+the reminder checker, chosen by per-role weights, with an exponential think time between actions.
+Users start evenly over --ramp seconds.
+
+--setup creates the loadtest_* accounts the mix needs (safe to repeat). --cleanup removes them and
+their entries and reminders. One connection is opened per user, so MySQL's max_connections (151 by
+default) must be raised for large runs.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mysql.connector  # noqa: E402
+from mysql.connector import Error, errorcode  # noqa: E402
+
+import changefeed  # noqa: E402
+import config  # noqa: E402
+from connections import ConnectionRouter  # noqa: E402
+from queries import QueryRegistry  # noqa: E402
+
+PASSWORD = "loadtest"
+ENTRY_TYPES = ['meal', 'medication', 'activity', 'social', 'note', 'observation']
+
+# Relative weight of each action per role
+ROLE_ACTIONS = {
+    'patient': {'save_entry': 3, 'load_entries': 4, 'generate_summary': 1, 'save_reminder': 1, 'check_reminders': 2},
+    'caregiver': {'save_entry': 5, 'load_entries': 3, 'generate_summary': 1, 'save_reminder': 2, 'check_reminders': 2},
+    'doctor': {'load_entries': 3, 'generate_summary': 5, 'check_reminders': 1},
+}
+
+LOCK_ERRORS = (errorcode.ER_LOCK_WAIT_TIMEOUT, errorcode.ER_LOCK_DEADLOCK)
+
+
+def parse_mix(text):
+    """'caregiver=70,patient=20,doctor=10' -> {'caregiver': 70, ...}"""
+    mix = {}
+    for part in text.split(","):
+        role, _, weight = part.partition("=")
+        role = role.strip()
+        if role not in ROLE_ACTIONS:
+            raise SystemExit(f"unknown role in --mix: {role}")
+        mix[role] = float(weight or 1)
+    return mix
+
+
+def role_counts(users, mix):
+    """Split the user count across roles in proportion to the mix"""
+    total = sum(mix.values())
+    counts = {role: int(users * weight / total) for role, weight in mix.items()}
+    # Hand the rounding remainder to the heaviest roles
+    for role in sorted(mix, key=mix.get, reverse=True)[:users - sum(counts.values())]:
+        counts[role] += 1
+    return counts
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+class Recorder:
+    """Thread-safe latency and error bookkeeping"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.timeline = defaultdict(int)
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def ok(self, action, seconds):
+        with self._lock:
+            self.latencies[action].append(seconds)
+            self.timeline[int(time.perf_counter() - self.started)] += 1
+
+    def failed(self, action, error):
+        code = getattr(error, "errno", None) or type(error).__name__
+        with self._lock:
+            self.errors[action][code] += 1
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, role, username, queries, recorder, stop, think, start_delay, rng):
+        super().__init__(name=f"loadtest-{username}", daemon=True)
+        self.role = role
+        self.username = username
+        self.queries = queries
+        self.recorder = recorder
+        self.stop_event = stop
+        self.think = think
+        self.start_delay = start_delay
+        self.rng = rng
+        self.db = ConnectionRouter(config.DB_CONFIG, config.REPLICA_CONFIG, config.REPLICA_STICKY_SECONDS)
+        self.user_id = None
+        self.patient_id = None
+        self.patient_ids = []
+        actions = ROLE_ACTIONS[role]
+        self.actions = list(actions)
+        self.weights = [actions[action] for action in self.actions]
+
+    def timed(self, action, func):
+        start = time.perf_counter()
+        try:
+            func()
+        except Error as e:
+            self.recorder.failed(action, e)
+            try:
+                self.db.rollback()
+            except Error:
+                pass
+            return False
+        self.recorder.ok(action, time.perf_counter() - start)
+        return True
+
+    def run(self):
+        if self.stop_event.wait(self.start_delay):
+            return
+        try:
+            if not self.timed("connect", self.db.connect) or not self.timed("login", self.login):
+                return
+            while not self.stop_event.is_set():
+                action = self.rng.choices(self.actions, self.weights)[0]
+                self.timed(action, getattr(self, action))
+                if self.stop_event.wait(self.rng.expovariate(1 / self.think) if self.think > 0 else 0):
+                    break
+        finally:
+            for connection in (self.db.primary, self.db.replica):
+                if connection is not None:
+                    self.queries.close(connection)
+            self.db.close()
+
+    # Data-access paths, mirroring MemoryCompanionApp
+
+    def log_action(self, action, details):
+        self.queries.execute(self.db.primary, "log_action", (self.role, self.user_id, action, details))
+        self.db.commit()
+
+    def login(self):
+        for role in ('patient', 'caregiver', 'doctor'):
+            row = self.queries.fetchone(self.db.primary, f"login_{role}", (self.username, PASSWORD))
+            if row:
+                break
+        else:
+            raise Error(msg=f"{self.username} not found - run with --setup")
+        self.user_id = row[0]
+        if self.role == 'patient':
+            self.patient_id = self.user_id
+        elif self.role == 'caregiver':
+            self.patient_id = self.queries.fetchvalue(self.db.primary, "caregiver_patient", (self.user_id,))
+        else:
+            self.patient_ids = [pid for (pid,) in self.queries.fetchall(self.db.primary, "loadtest_patients")]
+        self.log_action("LOGIN", f"{self.role.capitalize()} {self.username} logged in")
+
+    def target_patient(self):
+        return self.patient_id or (self.rng.choice(self.patient_ids) if self.patient_ids else None)
+
+    def save_entry(self):
+        now = datetime.now()
+        entry_type = self.rng.choice(ENTRY_TYPES)
+        title = f"loadtest {entry_type}"
+        description = "Load test entry. " * self.rng.randint(1, 20)
+        entry_id = self.queries.insert(self.db.primary, "insert_entry", (
+            self.role, self.user_id, self.patient_id, entry_type, title, description,
+            now.strftime('%Y-%m-%d'), now.strftime('%H:%M:%S')))
+        changefeed.record_changes(self.queries, self.db.primary, 'entries', 'insert', [entry_id], self.patient_id)
+        self.db.commit()
+        self.log_action("ADD_ENTRY", f"Added {entry_type} entry: {title}")
+
+    def load_entries(self):
+        if self.role == 'doctor':
+            self.queries.fetchall(self.db.reader(), "recent_entries")
+        else:
+            self.queries.fetchall(self.db.primary, "entries_for_patient", (self.patient_id,))
+
+    def generate_summary(self):
+        patient_id = self.target_patient()
+        if patient_id is None:
+            return
+        reader = self.db.reader()
+        days = self.rng.choice((0, 7, 30))
+        since = (datetime.now() - timedelta(days=days)).date()
+        if days == 0:
+            self.queries.fetchall(reader, "summary_counts_on_date", (patient_id, since))
+            self.queries.fetchall(reader, "summary_recent_on_date", (patient_id, since))
+        else:
+            self.queries.fetchall(reader, "summary_counts_since", (patient_id, since))
+            self.queries.fetchall(reader, "summary_recent_since", (patient_id, since))
+
+    def save_reminder(self):
+        due = datetime.now() + timedelta(minutes=self.rng.randint(5, 600))
+        title = "loadtest reminder"
+        reminder_id = self.queries.insert(self.db.primary, "insert_reminder", (
+            self.role, self.user_id, self.patient_id, title, "Load test reminder",
+            due.strftime('%Y-%m-%d'), due.strftime('%H:%M:%S'), 'medication'))
+        changefeed.record_changes(self.queries, self.db.primary, 'reminders', 'insert', [reminder_id], self.patient_id)
+        self.db.commit()
+        self.log_action("ADD_REMINDER", f"Added medication reminder: {title}")
+
+    def check_reminders(self):
+        # Same query as the app's scheduler: the reminders due since its previous check
+        now = datetime.now()
+        since_midnight = now - now.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.queries.fetchall(self.db.primary, "due_reminders_between",
+                              (now.date(), since_midnight - timedelta(seconds=30), since_midnight))
+
+
+def setup_accounts(connection, counts):
+    """Create the loadtest_* users the run needs; existing ones are kept"""
+    cursor = connection.cursor()
+    patients = max(counts.get('patient', 0), 1)
+    for i in range(patients):
+        cursor.execute("""INSERT IGNORE INTO patients (username,password,full_name,age,diagnosis,stage,emergency_contact)
+                          VALUES (%s,%s,%s,%s,%s,%s,%s)""",
+                       (f"loadtest_patient_{i}", PASSWORD, f"Loadtest Patient {i}", 75, 'Alzheimer', 'Early', 'N/A'))
+    cursor.execute("SELECT id FROM patients WHERE username LIKE 'loadtest\\_patient\\_%' ORDER BY id")
+    patient_ids = [row[0] for row in cursor.fetchall()]
+    for i in range(counts.get('caregiver', 0)):
+        cursor.execute("""INSERT IGNORE INTO caregivers (username,password,full_name,phone,relationship,patient_id)
+                          VALUES (%s,%s,%s,%s,%s,%s)""",
+                       (f"loadtest_caregiver_{i}", PASSWORD, f"Loadtest Caregiver {i}", 'N/A', 'Relative',
+                        patient_ids[i % len(patient_ids)]))
+    for i in range(counts.get('doctor', 0)):
+        cursor.execute("""INSERT IGNORE INTO doctors (username,password,full_name,specialization,license_number,hospital)
+                          VALUES (%s,%s,%s,%s,%s,%s)""",
+                       (f"loadtest_doctor_{i}", PASSWORD, f"Loadtest Doctor {i}", 'General', 'LOADTEST', 'Loadtest'))
+    connection.commit()
+    cursor.close()
+    print(f"✓ Load test accounts ready ({patients} patients)")
+
+
+def cleanup_accounts(connection):
+    """Remove the loadtest_* users and everything recorded for their patients"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT id FROM patients WHERE username LIKE 'loadtest\\_patient\\_%'")
+    patient_ids = [row[0] for row in cursor.fetchall()]
+    if patient_ids:
+        marks = ", ".join(["%s"] * len(patient_ids))
+        for table in ("entries", "reminders", "change_log", "patient_versions", "consent_logs", "caregivers"):
+            cursor.execute(f"DELETE FROM {table} WHERE patient_id IN ({marks})", patient_ids)
+    cursor.execute("DELETE FROM caregivers WHERE username LIKE 'loadtest\\_caregiver\\_%'")
+    cursor.execute("DELETE FROM doctors WHERE username LIKE 'loadtest\\_doctor\\_%'")
+    cursor.execute("DELETE FROM patients WHERE username LIKE 'loadtest\\_patient\\_%'")
+    connection.commit()
+    cursor.close()
+    print(f"✓ Removed load test accounts ({len(patient_ids)} patients)")
+
+
+def lock_status(connection):
+    """InnoDB row lock counters (waits, total ms, max ms)"""
+    cursor = connection.cursor()
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock%'")
+    status = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return status
+
+
+def report(recorder, elapsed, before, after, interval):
+    print(f"\n{'action':<18}{'ok':>8}{'err':>6}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    total_ok = total_err = 0
+    for action in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies.get(action, []))
+        errors = sum(recorder.errors[action].values()) if action in recorder.errors else 0
+        total_ok += len(values)
+        total_err += errors
+        print(f"{action:<18}{len(values):>8}{errors:>6}{len(values) / elapsed:>9.1f}"
+              f"{percentile(values, 50) * 1000:>9.1f}{percentile(values, 95) * 1000:>9.1f}"
+              f"{percentile(values, 99) * 1000:>9.1f}{(values[-1] if values else 0) * 1000:>9.1f}")
+    attempts = total_ok + total_err
+    print(f"\nthroughput: {total_ok / elapsed:.1f} ops/s over {elapsed:.1f} s, "
+          f"error rate {total_err / attempts * 100 if attempts else 0:.2f}%")
+
+    lock_errors = sum(count for codes in recorder.errors.values()
+                      for code, count in codes.items() if code in LOCK_ERRORS)
+    if before and after:
+        waits = after.get('Innodb_row_lock_waits', 0) - before.get('Innodb_row_lock_waits', 0)
+        wait_ms = after.get('Innodb_row_lock_time', 0) - before.get('Innodb_row_lock_time', 0)
+        print(f"row lock waits: {waits} ({wait_ms} ms total, {wait_ms / waits if waits else 0:.1f} ms avg, "
+              f"max {after.get('Innodb_row_lock_time_max', 0)} ms); lock timeouts/deadlocks: {lock_errors}")
+    for action, codes in sorted(recorder.errors.items()):
+        print(f"errors in {action}: " + ", ".join(f"{code} x{count}" for code, count in sorted(codes.items(), key=str)))
+
+    if interval:
+        print(f"\nops per {interval} s:")
+        buckets = defaultdict(int)
+        for second, count in recorder.timeline.items():
+            buckets[second // interval] += count
+        for bucket in sorted(buckets):
+            print(f"  {bucket * interval:>5}s  {buckets[bucket] / interval:>8.1f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--mix", default="caregiver=70,patient=20,doctor=10",
+                        help="relative share of each role, e.g. caregiver=70,patient=20,doctor=10")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which users start")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to run after the ramp starts")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between actions (seconds)")
+    parser.add_argument("--interval", type=int, default=10, help="throughput timeline bucket (seconds, 0 = off)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--setup", action="store_true", help="create the loadtest_* accounts first")
+    parser.add_argument("--cleanup", action="store_true", help="remove the loadtest_* accounts and their data, then exit")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    counts = role_counts(args.users, mix)
+    admin = mysql.connector.connect(**config.DB_CONFIG)
+    if args.cleanup:
+        cleanup_accounts(admin)
+        admin.close()
+        return
+    if args.setup:
+        setup_accounts(admin, counts)
+
+    queries = QueryRegistry()
+    queries.register("loadtest_patients", "SELECT id FROM patients WHERE username LIKE 'loadtest\\_patient\\_%'")
+    recorder = Recorder()
+    stop = threading.Event()
+    rng = random.Random(args.seed)
+    users = []
+    for role, count in counts.items():
+        for i in range(count):
+            users.append((role, f"loadtest_{role}_{i}"))
+    rng.shuffle(users)
+    threads = [
+        VirtualUser(role, username, queries, recorder, stop, args.think,
+                    args.ramp * index / max(len(users), 1), random.Random(rng.random()))
+        for index, (role, username) in enumerate(users)
+    ]
+
+    print(f"Running {len(threads)} users ({', '.join(f'{c} {r}' for r, c in counts.items())}) "
+          f"for {args.duration:.0f} s, ramp {args.ramp:.0f} s")
+    before = lock_status(admin)
+    recorder.started = start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    elapsed = time.perf_counter() - start
+    after = lock_status(admin)
+    admin.close()
+    report(recorder, elapsed, before, after, args.interval)
+
+
+if __name__ == "__main__":
+    main()
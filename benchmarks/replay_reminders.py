@@ -0,0 +1,189 @@
+"""Reminder replay: weeks of recurring reminders for thousands of patients through the scheduler, on a simulated clock
+
+Run from the repository root:
+
+    python benchmarks/replay_reminders.py --patients 2000 --days 28 --per-patient 3 \
+        --jitter 5 --stall-rate 0.001 --stall-seconds 120
+
+Needs neither MySQL nor a display. Every patient gets --per-patient reminder schedules at random
+times of day, most daily and some weekly. The scheduler under test (scheduler.ReminderScheduler,
+or --scheduler minute for the earlier match-the-current-minute checker) runs its real loop against a
+SimulatedClock, so a month of 30-second checks takes seconds. fetch_due is served from an in-memory
+index of the schedules, like the due_reminders_between query. --jitter adds up to that many seconds
+to each sleep and --stall-rate is the chance that a check is followed by a --stall-seconds stall
+(a frozen main loop or a slow database).
+
+Reported: delivery latency (simulated time from due to hand-off) percentiles, reminders missed and
+delivered more than once, and the scheduler's CPU time per check and in total.
+"""
+import argparse
+import bisect
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import scheduler  # noqa: E402
+
+WEEKLY_SHARE = 0.2
+TITLES = ['Morning pills', 'Evening pills', 'Drink water', 'Walk in garden', 'Call family', 'Lunch']
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+class ScheduleBook:
+    """Recurring reminder schedules indexed by weekday and time of day, standing in for the reminders table"""
+
+    def __init__(self, patients, per_patient, rng):
+        # weekday -> sorted [(time of day, row)]; rows look like due_reminders_between rows
+        self.by_weekday = {weekday: [] for weekday in range(7)}
+        rid = 0
+        for patient_id in range(1, patients + 1):
+            for _ in range(per_patient):
+                rid += 1
+                at = timedelta(seconds=rng.randrange(0, 24 * 3600, 60))
+                row = (rid, 'patient', patient_id, patient_id, rng.choice(TITLES), None, at)
+                weekdays = [rng.randrange(7)] if rng.random() < WEEKLY_SHARE else range(7)
+                for weekday in weekdays:
+                    self.by_weekday[weekday].append((at, row))
+        for rows in self.by_weekday.values():
+            rows.sort(key=lambda item: (item[0], item[1][0]))
+        self.keys = {weekday: [at for at, _ in rows] for weekday, rows in self.by_weekday.items()}
+        self.schedules = rid
+
+    def fetch_due(self, day, after, until):
+        rows = self.by_weekday[day.weekday()]
+        keys = self.keys[day.weekday()]
+        return [row for _, row in rows[bisect.bisect_right(keys, after):bisect.bisect_right(keys, until)]]
+
+    def occurrences(self, start, end):
+        """(rid, date) -> due datetime for every occurrence due in (start, end]"""
+        due = {}
+        day = start.date()
+        while day <= end.date():
+            midnight = datetime.combine(day, scheduler.MIDNIGHT)
+            for at, row in self.by_weekday[day.weekday()]:
+                if start < midnight + at <= end:
+                    due[(row[0], day.isoformat())] = midnight + at
+            day += timedelta(days=1)
+        return due
+
+
+class MinuteMatchScheduler(scheduler.ReminderScheduler):
+    """The earlier checker: fetch the whole day, deliver what matches the current HH:MM"""
+
+    def check(self):
+        now = self.clock.now()
+        current = now.strftime('%H:%M')
+        due = [(rid, user_type, user_id, title, scheduler.time_label(reminder_time))
+               for rid, user_type, user_id, _, title, _, reminder_time
+               in self.fetch_due(now.date(), -scheduler.END_OF_DAY, scheduler.END_OF_DAY)
+               if scheduler.time_label(reminder_time) == current]
+        if due:
+            self.deliver(due, now.date().isoformat())
+        return len(due)
+
+
+class UnsteadyClock(scheduler.SimulatedClock):
+    """SimulatedClock whose sleeps overrun by random jitter and occasional stalls"""
+
+    def __init__(self, start, rng, jitter, stall_rate, stall_seconds):
+        super().__init__(start)
+        self.rng = rng
+        self.jitter = jitter
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.stalls = 0
+
+    def sleep(self, seconds):
+        seconds += self.rng.uniform(0, self.jitter)
+        if self.rng.random() < self.stall_rate:
+            seconds += self.stall_seconds
+            self.stalls += 1
+        super().sleep(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--days", type=float, default=28.0, help="simulated days to replay")
+    parser.add_argument("--per-patient", type=int, default=3, help="reminder schedules per patient")
+    parser.add_argument("--interval", type=float, default=30.0, help="seconds between checks")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds per sleep")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="chance of a stall after each check")
+    parser.add_argument("--stall-seconds", type=float, default=120.0)
+    parser.add_argument("--scheduler", choices=("window", "minute"), default="window",
+                        help="window: scheduler.ReminderScheduler; minute: the earlier per-minute match")
+    parser.add_argument("--start", default="2026-01-05T07:00:00", help="simulated start (ISO date and time)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    book = ScheduleBook(args.patients, args.per_patient, rng)
+    # Checks start at a random point of the check interval, not on the minute like the reminders
+    start = datetime.fromisoformat(args.start) + timedelta(seconds=rng.uniform(0, args.interval))
+    end = start + timedelta(days=args.days)
+    clock = UnsteadyClock(start, rng, args.jitter, args.stall_rate, args.stall_seconds)
+
+    delivered = {}
+    duplicates = 0
+
+    def deliver(due, day):
+        nonlocal duplicates
+        now = clock.now()
+        for rid, _, _, _, _ in due:
+            key = (rid, day)
+            if key in delivered:
+                duplicates += 1
+            else:
+                delivered[key] = now
+
+    scheduler_class = MinuteMatchScheduler if args.scheduler == "minute" else scheduler.ReminderScheduler
+    under_test = scheduler_class(book.fetch_due, deliver, clock, args.interval)
+    check_cpu = []
+    last_check = [start]
+
+    def timed_check():
+        last_check[0] = clock.now()
+        cpu = time.process_time()
+        count = scheduler_class.check(under_test)
+        check_cpu.append(time.process_time() - cpu)
+        return count
+
+    under_test.check = timed_check
+
+    print(f"Replaying {args.days:g} days of {book.schedules} schedules for {args.patients} patients "
+          f"({args.scheduler} scheduler, check every {args.interval:g} s)")
+    wall = time.perf_counter()
+    under_test.run(lambda: clock.now() < end)
+    wall = time.perf_counter() - wall
+
+    # Occurrences the scheduler has had a chance to see: due after the start (first check covers its minute)
+    expected = book.occurrences(start.replace(second=0, microsecond=0) - timedelta(microseconds=1), last_check[0])
+    latencies = sorted((delivered[key] - due).total_seconds() for key, due in expected.items() if key in delivered)
+    missed = sum(1 for key in expected if key not in delivered)
+    early = sum(1 for latency in latencies if latency < 0)
+
+    print(f"\nWall time {wall:.2f} s for {len(check_cpu)} checks "
+          f"({args.days * 86400 / max(wall, 1e-9):,.0f}x real time), {clock.stalls} stalls")
+    print(f"Due {len(expected)}  delivered {len(latencies)}  missed {missed}  duplicates {duplicates}  early {early}")
+    if latencies:
+        print(f"Latency (s)  mean {sum(latencies) / len(latencies):.1f}  p50 {percentile(latencies, 50):.1f}  "
+              f"p95 {percentile(latencies, 95):.1f}  p99 {percentile(latencies, 99):.1f}  max {latencies[-1]:.1f}")
+    cpu = sorted(check_cpu)
+    print(f"Scheduler CPU  total {sum(cpu):.3f} s  per check mean {sum(cpu) / max(len(cpu), 1) * 1e6:.0f} us  "
+          f"p99 {percentile(cpu, 99) * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Per-patient change feed: write paths bump a version, open screens poll it and fetch deltas"""
+from datetime import datetime, timedelta
+
+_LOG_STATEMENTS = {'entries': "log_entry_changes", 'reminders': "log_reminder_changes",
+                   'consent_logs': "log_consent_changes"}
+_PATIENT_STATEMENTS = {'entries': "entry_patients", 'reminders': "reminder_patients"}
+
+
+def record_changes(queries, connection, table, operation, row_ids, patient_id=None):
+    """Bump the patient version and log the touched rows, inside the caller's transaction.
+
+    Must run before a DELETE (the rows are read to find their patient). When
+    patient_id is None the owning patients are looked up from the rows.
+    Returns {patient_id: new_version}. Does not commit.
+    """
+    row_ids = list(row_ids)
+    if not row_ids:
+        return {}
+    if patient_id is None:
+        patient_ids = [row[0] for row in queries.fetchall_in(connection, _PATIENT_STATEMENTS[table], row_ids)]
+    else:
+        patient_ids = [patient_id]
+
+    versions = {}
+    for pid in patient_ids:
+        version = queries.insert(connection, "bump_patient_version", (pid,))
+        queries.execute_in(connection, _LOG_STATEMENTS[table], row_ids, (version, operation, pid))
+        versions[pid] = version
+    return versions
+
+
+def purge_changes(queries, router, retention_days, now=None):
+    """Delete change_log rows older than retention_days, 5000 per transaction; returns the number deleted.
+
+    Open screens poll every few seconds and the analytics snapshot replays the
+    log since its last run, so retention only has to outlast the longest gap
+    between snapshot runs. patient_versions is kept: versions keep counting up.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    purged = 0
+    while True:
+        with router.unit_of_work() as connection:
+            deleted = queries.execute(connection, "purge_change_log", (cutoff,))
+        purged += deleted
+        if deleted < 5000:
+            return purged
+
+
+class ChangeFeed:
+    """Tracks the last version a screen has seen and returns only what changed since.
+
+    poll() costs one primary-key lookup on patient_versions when nothing
+    changed. Screens that span all patients (the doctor's entry list) follow
+    change_log ids instead via poll_all().
+    """
+
+    def __init__(self, queries, get_connection):
+        self.queries = queries
+        self.get_connection = get_connection
+        self.seen_versions = {}
+        self.seen_change_id = None
+
+    def current_version(self, patient_id):
+        return self.queries.fetchvalue(self.get_connection(), "patient_version", (patient_id,), 0)
+
+    def mark_seen(self, patient_id, version=None):
+        """Remember the version a freshly loaded screen reflects.
+
+        Returns the changes skipped over since the last poll, so caches outside
+        the screen (consent, stat cards) can still drop what they made stale.
+        """
+        seen = self.seen_versions.get(patient_id)
+        if version is None:
+            version = self.current_version(patient_id)
+        self.seen_versions[patient_id] = version
+        if seen is None or version <= seen:
+            return []
+        return self.queries.fetchall(self.get_connection(), "changes_since_version", (patient_id, seen))
+
+    def poll(self, patient_id):
+        """Return the list of (version, table, row_id, operation) changes since the last poll"""
+        version = self.current_version(patient_id)
+        seen = self.seen_versions.get(patient_id)
+        if seen is None:
+            self.seen_versions[patient_id] = version
+            return []
+        if version <= seen:
+            return []
+        changes = self.queries.fetchall(self.get_connection(), "changes_since_version", (patient_id, seen))
+        self.seen_versions[patient_id] = version
+        return changes
+
+    def mark_all_seen(self):
+        """Jump to the latest change after loading a screen that spans all patients.
+
+        Returns the changes skipped over since the last poll (at most one batch).
+        """
+        connection = self.get_connection()
+        skipped = []
+        if self.seen_change_id is not None:
+            skipped = self.queries.fetchall(connection, "changes_after_id", (self.seen_change_id,))
+        self.seen_change_id = self.queries.fetchvalue(connection, "latest_change_id", (), 0)
+        return skipped
+
+    def poll_all(self):
+        """Return the list of (id, table, row_id, operation) changes across all patients since the last poll"""
+        connection = self.get_connection()
+        if self.seen_change_id is None:
+            self.seen_change_id = self.queries.fetchvalue(connection, "latest_change_id", (), 0)
+            return []
+        changes = self.queries.fetchall(connection, "changes_after_id", (self.seen_change_id,))
+        if changes:
+            self.seen_change_id = changes[-1][0]
+        return changes
+
+    def reset(self):
+        self.seen_versions.clear()
+        self.seen_change_id = None
+
+
+def latest_operations(changes):
+    """Collapse a change list to {(table, row_id): last operation}"""
+    latest = {}
+    for change in changes:
+        _, table, row_id, operation = change
+        latest[(table, row_id)] = operation
+    return latest
@@ -0,0 +1,355 @@
+"""Primary/replica connection routing for Memory Companion"""
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import Error, errorcode
+
+# Client errors meaning the connection itself is gone (idle timeout, server restart, network)
+DROPPED_ERRNOS = {
+    errorcode.CR_SERVER_GONE_ERROR,
+    errorcode.CR_SERVER_LOST,
+    errorcode.CR_SERVER_LOST_EXTENDED,
+    errorcode.CR_CONNECTION_ERROR,
+    errorcode.CR_CONN_HOST_ERROR,
+}
+
+
+class CircuitOpenError(Error):
+    """Raised instead of trying the database while the circuit breaker is open"""
+
+
+def connection_dropped(connection, error):
+    """True when an error means the connection is gone rather than the statement failing"""
+    if error.errno in DROPPED_ERRNOS:
+        return True
+    try:
+        return not connection.is_connected()
+    except Exception:
+        return True
+
+
+class UnitOfWork:
+    """One transaction and one commit for a group of statements.
+
+    ``with UnitOfWork(target) as connection:`` commits when the block ends and
+    rolls back when it raises. target is a ConnectionRouter (the yielded
+    connection is its primary) or a plain connection. Units opened inside
+    another unit on the same target and thread join the outer one, so helpers
+    that use a unit of their own can be called inside a larger operation
+    without committing halfway through it. A ConnectionRouter target is told
+    while its outermost unit is open, so it does not silently reconnect in the
+    middle of the transaction.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, target):
+        self.target = target
+
+    def _depths(self):
+        depths = getattr(self._local, "depths", None)
+        if depths is None:
+            depths = self._local.depths = {}
+        return depths
+
+    def __enter__(self):
+        depths = self._depths()
+        depth = depths[id(self.target)] = depths.get(id(self.target), 0) + 1
+        if depth == 1 and isinstance(self.target, ConnectionRouter):
+            self.target.begin_unit()
+        return getattr(self.target, "primary", self.target)
+
+    def __exit__(self, exc_type, exc, tb):
+        depths = self._depths()
+        depth = depths.pop(id(self.target)) - 1
+        if depth:
+            # Inner unit: the outermost one commits or rolls back
+            depths[id(self.target)] = depth
+            return False
+        try:
+            if exc_type is None:
+                try:
+                    self.target.commit()
+                    return False
+                except Error:
+                    self._rollback()
+                    raise
+            self._rollback()
+            return False
+        finally:
+            if isinstance(self.target, ConnectionRouter):
+                self.target.end_unit()
+
+    def _rollback(self):
+        try:
+            self.target.rollback()
+        except Error as e:
+            print(f"Rollback failed: {e}")
+
+
+class CircuitBreaker:
+    """Fails fast after repeated connection failures instead of letting calls pile up.
+
+    closed: calls go through. After failure_threshold consecutive failures the
+    breaker opens and calls raise CircuitOpenError until reset_seconds have
+    passed; then one trial call is let through (half-open). Success closes the
+    breaker, failure opens it again with the wait doubled, up to max_reset_seconds.
+    """
+
+    def __init__(self, failure_threshold=3, reset_seconds=2.0, max_reset_seconds=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.max_reset_seconds = max_reset_seconds
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self._delay = reset_seconds
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and self.clock() >= self._retry_at:
+                self.state = 'half-open'
+                return True
+            return False
+
+    def retry_in(self):
+        """Seconds until the next trial call (0 when closed)"""
+        with self._lock:
+            return max(0.0, self._retry_at - self.clock()) if self.state != 'closed' else 0.0
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._delay = self.reset_seconds
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half-open' or self.failures >= self.failure_threshold:
+                if self.state == 'half-open':
+                    self._delay = min(self._delay * 2, self.max_reset_seconds)
+                self.state = 'open'
+                self._retry_at = self.clock() + self._delay
+
+
+class ConnectionRouter:
+    """Sends writes to the primary and read-only screens to an optional replica.
+
+    Read-your-writes holds for the session: after a commit on the primary,
+    reads stay on the primary until the replica has applied that transaction
+    (checked with WAIT_FOR_EXECUTED_GTID_SET when GTIDs are enabled) or, on
+    servers without GTIDs, until sticky_seconds have passed. The GTID checks
+    run through the QueryRegistry the router is attached to, under the same
+    per-connection lock as every other statement; until it is attached, reads
+    are simply pinned to the primary for sticky_seconds after each commit.
+    """
+
+    def __init__(self, primary_config, replica_config=None, sticky_seconds=5.0, breaker=None):
+        self.primary_config = primary_config
+        self.replica_config = replica_config
+        self.sticky_seconds = sticky_seconds
+        self.breaker = breaker or CircuitBreaker()
+        # A lost replica only sends reads back to the primary; it never trips the primary's breaker.
+        # One failure is enough: reader() trusts this state instead of pinging the replica.
+        self.replica_breaker = CircuitBreaker(failure_threshold=1)
+        self.queries = None
+        self.primary = None
+        self.replica = None
+        self._session_setups = []
+        self._pending_gtid = None
+        self._pinned_until = 0.0
+        # Outermost units of work open on the primary, on any thread
+        self._open_units = 0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Open the primary (required) and the replica (optional, falls back to the primary)"""
+        self.primary = mysql.connector.connect(**self.primary_config)
+        self._setup_session(self.primary)
+        if self.replica_config:
+            try:
+                # Autocommit so every read sees the latest replicated data, not an old snapshot
+                self.replica = mysql.connector.connect(autocommit=True, **self.replica_config)
+                print("✓ Connected to read replica")
+            except Error as e:
+                print(f"Read replica unavailable, reading from primary: {e}")
+                self.replica = None
+        return self.primary
+
+    def clone(self, autocommit=False):
+        """A new, unconnected router for the same primary (no replica), with the same session setup.
+
+        Background threads use one so their statements and transactions never
+        share a connection with the UI. Read-only threads ask for autocommit, so
+        every read sees the latest data rather than the snapshot of a
+        transaction that is never committed.
+        """
+        primary_config = dict(self.primary_config, autocommit=True) if autocommit else self.primary_config
+        router = ConnectionRouter(primary_config, None, self.sticky_seconds)
+        router._session_setups = list(self._session_setups)
+        return router
+
+    def add_session_setup(self, setup):
+        """Run setup(primary) now (if connected) and again after every reconnect of the primary"""
+        self._session_setups.append(setup)
+        if self.primary is not None:
+            setup(self.primary)
+
+    def _setup_session(self, connection):
+        for setup in self._session_setups:
+            setup(connection)
+
+    def reconnect(self, connection):
+        """Reopen a dropped connection in place, so everything holding it keeps working"""
+        connection.reconnect(attempts=1, delay=0)
+        if connection is self.primary:
+            self._setup_session(connection)
+            with self._lock:
+                self._pending_gtid = None
+                self._pinned_until = 0.0
+        print("✓ Reconnected to database")
+
+    def call(self, connection, fn, idempotent=False, on_reconnect=None):
+        """Run fn() against connection, reconnecting once if the connection dropped.
+
+        Idempotent calls (reads) are retried after the reconnect; writes are
+        not, because their transaction was lost. While a unit of work is open
+        on the primary a dropped primary is not reconnected at all: the error
+        propagates, the unit rolls back, and the next call after it reconnects.
+        Otherwise the rest of the unit would run, and commit, on a fresh session
+        without its earlier statements. Raises CircuitOpenError without
+        touching the network while the breaker is open.
+        """
+        breaker = self.replica_breaker if connection is self.replica else self.breaker
+        if not breaker.allow():
+            raise CircuitOpenError(msg=f"Database unavailable, retrying in {breaker.retry_in():.0f} s")
+        try:
+            result = fn()
+        except Error as e:
+            if not connection_dropped(connection, e):
+                # The server answered, so the connection is fine
+                breaker.record_success()
+                raise
+            if connection is self.primary and self.in_unit():
+                raise
+            try:
+                self.reconnect(connection)
+            except Error:
+                breaker.record_failure()
+                raise e
+            if on_reconnect is not None:
+                on_reconnect(connection)
+            if not idempotent:
+                breaker.record_success()
+                raise
+            try:
+                result = fn()
+            except Error as retry_error:
+                if connection_dropped(connection, retry_error):
+                    breaker.record_failure()
+                raise
+        breaker.record_success()
+        return result
+
+    def connections(self):
+        return [connection for connection in (self.primary, self.replica) if connection is not None]
+
+    def commit(self):
+        """Commit on the primary and remember the write for read-your-writes"""
+        try:
+            self.primary.commit()
+        except Error as e:
+            # The outcome of the transaction is unknown; reconnect so later calls work
+            if connection_dropped(self.primary, e):
+                try:
+                    self.reconnect(self.primary)
+                except Error:
+                    self.breaker.record_failure()
+            raise
+        self.note_write()
+
+    def unit_of_work(self):
+        """Context manager running a block as one transaction on the primary"""
+        return UnitOfWork(self)
+
+    def begin_unit(self):
+        with self._lock:
+            self._open_units += 1
+
+    def end_unit(self):
+        with self._lock:
+            self._open_units -= 1
+
+    def in_unit(self):
+        """True while a unit of work is open on the primary (on any thread)"""
+        with self._lock:
+            return self._open_units > 0
+
+    def rollback(self):
+        try:
+            self.primary.rollback()
+        except Error as e:
+            # A dropped connection has no transaction left to roll back
+            if not connection_dropped(self.primary, e):
+                raise
+
+    def note_write(self):
+        if self.replica is None:
+            return
+        gtid = None
+        if self.queries is not None:
+            try:
+                gtid = self.queries.fetchvalue(self.primary, "gtid_executed") or None
+            except Error:
+                pass
+        with self._lock:
+            self._pending_gtid = gtid
+            self._pinned_until = time.monotonic() + self.sticky_seconds
+
+    def _replica_caught_up(self):
+        with self._lock:
+            gtid, pinned_until = self._pending_gtid, self._pinned_until
+        if gtid is None:
+            if time.monotonic() < pinned_until:
+                return False
+            with self._lock:
+                if self._pending_gtid is None and self._pinned_until == pinned_until:
+                    self._pinned_until = 0.0
+            return True
+        try:
+            waited = self.queries.fetchvalue(self.replica, "wait_for_gtid", (gtid,))
+        except Error:
+            return time.monotonic() >= pinned_until
+        if waited == 0:
+            with self._lock:
+                if self._pending_gtid == gtid:
+                    self._pending_gtid = None
+                    self._pinned_until = 0.0
+            return True
+        return False
+
+    def reader(self):
+        """Connection for read-only screens"""
+        # The breaker (tripped by failed reads and by the health monitor's pings) says whether the
+        # replica is usable; checking the connection itself would cost a round trip per read
+        if self.replica is None or self.replica_breaker.state != 'closed':
+            return self.primary
+        with self._lock:
+            pending = self._pending_gtid is not None or self._pinned_until > 0.0
+        if pending and not self._replica_caught_up():
+            return self.primary
+        return self.replica
+
+    def close(self):
+        for connection in (self.replica, self.primary):
+            try:
+                if connection is not None:
+                    connection.close()
+            except Error:
+                pass
@@ -0,0 +1,133 @@
+"""Patient consent to caregiver and doctor access, cached in memory per patient"""
+import threading
+import time
+
+from changefeed import record_changes
+
+# consent_logs.consent_type each role's access depends on (patients always see their own data)
+ROLE_CONSENT = {'caregiver': "caregiver_access", 'doctor': "doctor_access"}
+CONSENT_LABELS = {"caregiver_access": "My caregivers may see my entries and reminders",
+                  "doctor_access": "My doctors may see my entries, reminders and details"}
+
+
+def fold(rows):
+    """{consent_type: given} from (consent_type, consent_given) rows in log order (the latest wins)"""
+    state = {}
+    for consent_type, given in rows:
+        state[consent_type] = bool(given)
+    return state
+
+
+class ConsentIndex:
+    """Current consent state per patient, read from the consent_logs history once and cached.
+
+    consent_logs is append-only: every grant or revocation is a new row and the
+    latest row per consent type is the current state. Screens ask allows()
+    before running their (unchanged) patient-scoped queries, so consent never
+    adds a join to a hot query. Patients without any recorded choice get
+    default. record() and change-feed polls invalidate the cache; a cached
+    state older than max_age seconds is read again in case an invalidation
+    was missed.
+    """
+
+    def __init__(self, queries, default=True, max_age=300.0, clock=time.monotonic):
+        self.queries = queries
+        self.default = default
+        self.max_age = max_age
+        self.clock = clock
+        # patient_id -> (state, loaded at)
+        self._states = {}
+        # Set once every patient's state is cached (doctor views filter many patients)
+        self._complete_at = None
+        # Patients invalidated since then, read again on their own
+        self._stale = set()
+        # Bumped by invalidate(): a read that started earlier is returned but not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _fresh(self, loaded_at):
+        return loaded_at is not None and self.clock() - loaded_at < self.max_age
+
+    def _store(self, patient_id, state, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._states[patient_id] = (state, self.clock())
+                self._stale.discard(patient_id)
+
+    def state(self, connection, patient_id):
+        """{consent_type: given} for one patient (recorded choices only)"""
+        with self._lock:
+            item = self._states.get(patient_id)
+            if item is not None and self._fresh(item[1]):
+                return item[0]
+            if item is None and patient_id not in self._stale and self._fresh(self._complete_at):
+                return {}
+            generation = self._generation
+        state = fold(self.queries.fetchall(connection, "consent_state", (patient_id,)))
+        self._store(patient_id, state, generation)
+        return state
+
+    def load_all(self, connections):
+        """Cache every patient's state with one query per connection (shard); returns {patient_id: state}"""
+        with self._lock:
+            stale = set(self._stale) if self._fresh(self._complete_at) else None
+            generation = self._generation
+        if stale is None:
+            loaded_at = self.clock()
+            states = {}
+            for connection in connections:
+                rows = self.queries.fetchall(connection, "consent_states")
+                for patient_id, consent_type, given in rows:
+                    states.setdefault(patient_id, {})[consent_type] = bool(given)
+            with self._lock:
+                if generation == self._generation:
+                    self._states = {patient_id: (state, loaded_at) for patient_id, state in states.items()}
+                    self._complete_at = loaded_at
+                    self._stale.clear()
+            return states
+        # Patients invalidated since the full load: their rows are on one of the shards
+        states = {}
+        for patient_id in stale:
+            rows = []
+            for connection in connections:
+                rows += self.queries.fetchall(connection, "consent_state", (patient_id,))
+            states[patient_id] = fold(rows)
+            self._store(patient_id, states[patient_id], generation)
+        with self._lock:
+            cached = {patient_id: state for patient_id, (state, _) in self._states.items()}
+        cached.update(states)
+        return cached
+
+    def allows(self, connection, patient_id, role):
+        """May a user with this role see the patient's data?"""
+        consent_type = ROLE_CONSENT.get(role)
+        if consent_type is None:
+            return True
+        return self.state(connection, patient_id).get(consent_type, self.default)
+
+    def allowed_patients(self, connections, role, patient_ids):
+        """The subset of patient_ids whose data the role may see"""
+        consent_type = ROLE_CONSENT.get(role)
+        states = self.load_all(connections) if consent_type else {}
+        return {patient_id for patient_id in patient_ids
+                if consent_type is None or states.get(patient_id, {}).get(consent_type, self.default)}
+
+    def record(self, router, patient_id, consent_type, given):
+        """Append a grant or revocation, log it in the change feed and commit"""
+        with router.unit_of_work() as connection:
+            row_id = self.queries.insert(connection, "insert_consent", (patient_id, consent_type, given))
+            record_changes(self.queries, connection, 'consent_logs', 'insert', [row_id], patient_id)
+        self.invalidate(patient_id)
+
+    def invalidate(self, patient_id=None):
+        """Forget one patient's cached state (or everyone's)"""
+        with self._lock:
+            self._generation += 1
+            if patient_id is None:
+                self._states.clear()
+                self._stale.clear()
+                self._complete_at = None
+            else:
+                # The other patients' states stay complete; this one is read again on its own
+                self._states.pop(patient_id, None)
+                self._stale.add(patient_id)
@@ -0,0 +1,92 @@
+"""Paginated, searchable patient directory for doctors"""
+from shards import fan_out
+
+PAGE_SIZE = 50
+
+_COLUMNS = "id, full_name, username, age, diagnosis, stage, emergency_contact"
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _statement(search, diagnosis, stage, after, consent_type):
+    """Name and SQL of the page query for one combination of filters"""
+    conditions = []
+    parts = []
+    if consent_type:
+        # The patient's latest choice for consent_type, or the default when never recorded
+        conditions.append("""COALESCE((SELECT c.consent_given FROM consent_logs c
+                                      WHERE c.patient_id = patients.id AND c.consent_type = %s
+                                      ORDER BY c.consent_date DESC, c.id DESC LIMIT 1), %s)""")
+        parts.append("consent")
+    if search:
+        conditions.append("(full_name LIKE %s OR username LIKE %s)")
+        parts.append("search")
+    if diagnosis:
+        conditions.append("diagnosis = %s")
+        parts.append("diagnosis")
+    if stage:
+        conditions.append("stage = %s")
+        parts.append("stage")
+    if after:
+        # Keyset pagination: continue after the last (full_name, id) of the previous page
+        conditions.append("(full_name > %s OR (full_name = %s AND id > %s))")
+        parts.append("after")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT {_COLUMNS} FROM patients{where} ORDER BY full_name, id LIMIT %s"
+    return "patient_directory:" + "+".join(parts or ["all"]), sql
+
+
+class PatientDirectory:
+    """Fetches one page of patients at a time, ordered by name.
+
+    Pages are read with keyset pagination over the (full_name, id) index, so
+    every page costs the same however many patients there are. Search is a
+    prefix match on full name or username. With several shards each shard
+    returns one page and the pages are merged by name. Consent is filtered in
+    the page query itself, so pages stay full and the keyset never skips
+    patients; consent_default applies to patients who never chose.
+    """
+
+    def __init__(self, queries, get_connections, page_size=PAGE_SIZE, executor=None, consent_default=True):
+        self.queries = queries
+        self.get_connections = get_connections
+        self.page_size = page_size
+        self.executor = executor
+        self.consent_default = consent_default
+
+    def page(self, search=None, diagnosis=None, stage=None, after=None, consent_type=None):
+        """Return (rows, has_more) for the page after the (id, full_name) row `after` (first page when None).
+
+        With consent_type only patients who granted it are listed.
+        """
+        name, sql = _statement(search, diagnosis, stage, after, consent_type)
+        if name not in self.queries.statements:
+            self.queries.register(name, sql)
+        params = []
+        if consent_type:
+            params += [consent_type, self.consent_default]
+        if search:
+            prefix = _escape_like(search) + "%"
+            params += [prefix, prefix]
+        if diagnosis:
+            params.append(diagnosis)
+        if stage:
+            params.append(stage)
+        if after:
+            params += [after[1], after[1], after[0]]
+        params.append(self.page_size + 1)
+        # casefold approximates MySQL's case-insensitive collation for the merge
+        rows = fan_out(self.queries, self.get_connections(), name, params,
+                       key=lambda row: (row[1].casefold(), row[0]), limit=self.page_size + 1,
+                       executor=self.executor)
+        return rows[:self.page_size], len(rows) > self.page_size
+
+    def filter_values(self):
+        """Distinct diagnoses and stages for the filter drop-downs"""
+        diagnoses, stages = set(), set()
+        for connection in self.get_connections():
+            diagnoses.update(row[0] for row in self.queries.fetchall(connection, "patient_diagnoses"))
+            stages.update(row[0] for row in self.queries.fetchall(connection, "patient_stages"))
+        return sorted(diagnoses), sorted(stages)
@@ -0,0 +1,348 @@
+"""Escalation of missed medication reminders to caregivers and emergency contacts"""
+import heapq
+import itertools
+import json
+import smtplib
+import threading
+import time
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+
+import config
+
+
+class TimerQueue:
+    """Many one-shot timers served by a single thread.
+
+    Deadlines live in a heap; the thread sleeps on a condition until the
+    earliest one is due (or a new earlier one is armed), so thousands of
+    pending timers cost no polling. Cancelled timers are dropped lazily.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._heap = []
+        self._live = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="escalation-timers", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def arm(self, key, deadline, callback):
+        """Schedule callback() at the epoch-seconds deadline, replacing any timer with the same key"""
+        with self._cond:
+            seq = next(self._counter)
+            self._live[key] = seq
+            heapq.heappush(self._heap, (deadline, seq, key, callback))
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def cancel(self, key):
+        with self._cond:
+            return self._live.pop(key, None) is not None
+
+    def pending(self):
+        with self._cond:
+            return len(self._live)
+
+    def run_due(self):
+        """Run every timer whose deadline has passed, on the calling thread (the timer thread's job)"""
+        while True:
+            with self._cond:
+                self._drop_dead()
+                if not self._heap or self._heap[0][0] > self.clock():
+                    return
+                _, seq, key, callback = heapq.heappop(self._heap)
+                del self._live[key]
+            self._call(key, callback)
+
+    def _drop_dead(self):
+        # Cancelled or replaced timers sitting at the top
+        while self._heap and self._live.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def _call(self, key, callback):
+        try:
+            callback()
+        except Exception as e:
+            print(f"Escalation timer {key} failed: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    self._drop_dead()
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - self.clock()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if not self._running:
+                    return
+                _, seq, key, callback = heapq.heappop(self._heap)
+                del self._live[key]
+            self._call(key, callback)
+
+
+class FileChannel:
+    """Appends notifications as JSON lines to a file (local stand-in for SMS/e-mail)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send_batch(self, messages):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for message in messages:
+                f.write(json.dumps(message) + "\n")
+
+
+class SmtpChannel:
+    """Sends notifications as e-mails over one SMTP session per batch.
+
+    Recipients that are not e-mail addresses (phone numbers) go to fallback_to.
+    """
+
+    def __init__(self, host, port, sender, fallback_to):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.fallback_to = fallback_to
+
+    def send_batch(self, messages):
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            for message in messages:
+                mail = EmailMessage()
+                mail['From'] = self.sender
+                mail['To'] = message['recipient'] if "@" in str(message['recipient']) else self.fallback_to
+                mail['Subject'] = message['subject']
+                mail.set_content(f"To: {message['recipient_name']} ({message['recipient']})\n\n{message['body']}")
+                smtp.send_message(mail)
+
+
+def channel_from_config():
+    if config.ESCALATION_CHANNEL == "smtp":
+        return SmtpChannel(config.ESCALATION_SMTP_HOST, config.ESCALATION_SMTP_PORT,
+                           config.ESCALATION_SMTP_FROM, config.ESCALATION_SMTP_FALLBACK_TO)
+    return FileChannel(config.ESCALATION_FILE)
+
+
+class DeliveryQueue:
+    """Batches outbound notifications and retries failed batches with exponential backoff"""
+
+    def __init__(self, channel, batch_size=50, flush_seconds=2.0, max_attempts=5, base_delay=1.0):
+        self.channel = channel
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.sent = 0
+        self.failed = 0
+        self._items = []
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="escalation-delivery", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def put(self, message):
+        with self._cond:
+            self._items.append(message)
+            if len(self._items) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._items) < self.batch_size:
+                    self._cond.wait(self.flush_seconds)
+                batch, self._items = self._items[:self.batch_size], self._items[self.batch_size:]
+                running = self._running
+            if batch:
+                self._deliver(batch)
+            if not running and not batch:
+                return
+
+    def _deliver(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.channel.send_batch(batch)
+                self.sent += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self.failed += len(batch)
+                    print(f"Escalation delivery failed after {attempt} attempts: {e}")
+                    return
+                time.sleep(self.base_delay * 2 ** (attempt - 1))
+
+
+class EscalationEngine:
+    """Arms a deadline per due medication reminder and escalates when it is not completed.
+
+    First stage (grace period after the due time): the patient's caregivers.
+    Second stage: the patient's emergency contact. Completing or deleting the
+    reminder disarms both stages. Today's reminders are re-read every
+    sync_seconds, so reminders saved or rescheduled by other instances are
+    armed too. get_connection(patient_id) returns the connection holding a
+    patient's data; get_connections() one connection per shard (by default
+    just get_connection()), all of which sync() reads.
+    """
+
+    def __init__(self, queries, get_connection, get_connections=None, channel=None, grace_minutes=None,
+                 emergency_minutes=None, sync_seconds=None, clock=time.time):
+        self.queries = queries
+        self.get_connection = get_connection
+        self.get_connections = get_connections or (lambda: [get_connection()])
+        self.grace = timedelta(minutes=config.ESCALATION_GRACE_MINUTES if grace_minutes is None else grace_minutes)
+        self.emergency = timedelta(
+            minutes=config.ESCALATION_EMERGENCY_MINUTES if emergency_minutes is None else emergency_minutes)
+        self.sync_seconds = config.ESCALATION_SYNC_SECONDS if sync_seconds is None else sync_seconds
+        self.timers = TimerQueue(clock)
+        self.delivery = DeliveryQueue(channel or channel_from_config())
+        self.clock = clock
+        # reminder_id -> due datetime of its armed (or already escalated) occurrence
+        self._armed = {}
+        self._escalated = set()
+        self._lock = threading.Lock()
+
+    def start(self, day=None):
+        self.timers.start()
+        self.delivery.start()
+        self.arm_day(day or date.fromtimestamp(self.clock()))
+        self._arm_sync()
+
+    def stop(self):
+        self.timers.stop()
+        self.delivery.stop()
+
+    def arm_day(self, day):
+        """Arm every open medication reminder due on day, and the rollover to the next day"""
+        count = self.sync(day)
+        next_day = day + timedelta(days=1)
+        self.timers.arm(("day", next_day), datetime.combine(next_day, datetime.min.time()).timestamp(),
+                        lambda: self.arm_day(next_day))
+        return count
+
+    def sync(self, day):
+        """Arm the open medication reminders due on day as they are now in the database.
+
+        Re-arming is idempotent; a reminder whose time changed gets its new
+        deadline, and one no longer due on day (moved, completed, deleted) is
+        disarmed. Returns the number of open reminders.
+        """
+        rows = []
+        for connection in self.get_connections():
+            rows += self.queries.fetchall(connection, "due_medication_reminders", (day,))
+        open_ids = set()
+        for reminder_id, patient_id, title, reminder_date, reminder_time in rows:
+            self.arm(reminder_id, patient_id, title, reminder_date, reminder_time)
+            open_ids.add(reminder_id)
+        with self._lock:
+            gone = [reminder_id for reminder_id, due in self._armed.items()
+                    if due.date() == day and reminder_id not in open_ids]
+        for reminder_id in gone:
+            self.disarm(reminder_id)
+        with self._lock:
+            # Occurrences of earlier days are not read again; their pending timers still fire
+            self._armed = {reminder_id: due for reminder_id, due in self._armed.items() if due.date() >= day}
+            self._escalated = {(reminder_id, due) for reminder_id, due in self._escalated if due.date() >= day}
+        return len(rows)
+
+    def _arm_sync(self):
+        def run():
+            try:
+                self.sync(date.fromtimestamp(self.clock()))
+            finally:
+                self._arm_sync()
+        self.timers.arm(("sync",), self.clock() + self.sync_seconds, run)
+
+    def arm(self, reminder_id, patient_id, title, reminder_date, reminder_time):
+        """Arm the first escalation stage for one reminder occurrence (re-arming with a new time moves it)"""
+        if patient_id is None:
+            return
+        if isinstance(reminder_date, str):
+            reminder_date = datetime.strptime(reminder_date, '%Y-%m-%d').date()
+        if isinstance(reminder_time, timedelta):  # MySQL TIME columns arrive as timedelta
+            due = datetime.combine(reminder_date, datetime.min.time()) + reminder_time
+        else:
+            due = datetime.combine(reminder_date, datetime.strptime(str(reminder_time)[:5], '%H:%M').time())
+        with self._lock:
+            # Already armed for this time, or caregivers were told already (the emergency stage runs on)
+            if self._armed.get(reminder_id) == due or (reminder_id, due) in self._escalated:
+                return
+            moved = reminder_id in self._armed
+            self._armed[reminder_id] = due
+        if moved:
+            self.timers.cancel(("emergency", reminder_id))
+        deadline = (due + self.grace).timestamp()
+        self.timers.arm(("caregiver", reminder_id), deadline,
+                        lambda: self._escalate_to_caregivers(reminder_id, patient_id, title, due))
+
+    def disarm(self, reminder_id):
+        with self._lock:
+            self._armed.pop(reminder_id, None)
+        self.timers.cancel(("caregiver", reminder_id))
+        self.timers.cancel(("emergency", reminder_id))
+
+    def _still_open(self, reminder_id, patient_id):
+        return bool(self.queries.fetchvalue(self.get_connection(patient_id), "reminder_open", (reminder_id,), 0))
+
+    def _notify(self, name, contact, subject, body):
+        if not contact:
+            return
+        self.delivery.put({
+            'recipient': contact, 'recipient_name': name, 'subject': subject, 'body': body,
+            'queued_at': datetime.fromtimestamp(self.clock()).isoformat(timespec='seconds'),
+        })
+
+    def _escalate_to_caregivers(self, reminder_id, patient_id, title, due):
+        with self._lock:
+            self._escalated.add((reminder_id, due))
+        if not self._still_open(reminder_id, patient_id):
+            return
+        connection = self.get_connection(patient_id)
+        patient = self.queries.fetchone(connection, "patient_contact", (patient_id,))
+        patient_name = patient[0] if patient else f"Patient #{patient_id}"
+        subject = f"Missed medication: {patient_name}"
+        body = f"{patient_name} has not marked '{title}' (due {due:%H:%M}) as taken."
+        for name, phone in self.queries.fetchall(connection, "patient_caregivers", (patient_id,)):
+            self._notify(name, phone, subject, body)
+        self.timers.arm(("emergency", reminder_id), (due + self.grace + self.emergency).timestamp(),
+                        lambda: self._escalate_to_emergency(reminder_id, patient_id, title, due))
+
+    def _escalate_to_emergency(self, reminder_id, patient_id, title, due):
+        if not self._still_open(reminder_id, patient_id):
+            return
+        patient = self.queries.fetchone(self.get_connection(patient_id), "patient_contact", (patient_id,))
+        if not patient:
+            return
+        patient_name, emergency_contact = patient
+        self._notify("Emergency contact", emergency_contact, f"URGENT - missed medication: {patient_name}",
+                     f"{patient_name} has still not taken '{title}' (due {due:%H:%M}). "
+                     "Their caregiver was notified and has not confirmed.")
@@ -0,0 +1,146 @@
+"""Year-at-a-glance activity heatmap: per-day, per-type entry counts drawn on one Canvas"""
+from array import array
+from datetime import timedelta
+
+ENTRY_TYPES = ('meal', 'medication', 'appointment', 'social', 'note', 'activity', 'observation')
+DAYS = 366  # twelve months including today
+COLORS = ('#ebedf0', '#c6e48b', '#7bc96f', '#239a3b', '#196127')
+CELL = 13
+GAP = 3
+LEFT = 34
+TOP = 22
+# More runs of days without usable rollups than this are counted with one query over their span
+MAX_LIVE_QUERIES = 4
+
+
+class YearBuckets:
+    """Entry counts for DAYS days ending on end_date, one unsigned int per (day, entry type)"""
+
+    def __init__(self, end_date, days=DAYS):
+        self.end_date = end_date
+        self.days = days
+        self.start_date = end_date - timedelta(days=days - 1)
+        self.counts = array('I', bytes(4 * days * len(ENTRY_TYPES)))
+
+    def add_rows(self, rows):
+        """Add (date, entry_type, count) rows; dates outside the window and unknown types are ignored"""
+        for day, entry_type, count in rows:
+            offset = (day - self.start_date).days
+            if 0 <= offset < self.days and entry_type in ENTRY_TYPES:
+                self.counts[offset * len(ENTRY_TYPES) + ENTRY_TYPES.index(entry_type)] += count
+
+    def day_index(self, day):
+        return (day - self.start_date).days
+
+    def value(self, index, entry_type=None):
+        """Count for one day: all types, or just entry_type"""
+        base = index * len(ENTRY_TYPES)
+        if entry_type is None:
+            return sum(self.counts[base:base + len(ENTRY_TYPES)])
+        return self.counts[base + ENTRY_TYPES.index(entry_type)]
+
+    def breakdown(self, index):
+        """{entry_type: count} of one day, without zero counts"""
+        base = index * len(ENTRY_TYPES)
+        return {entry_type: self.counts[base + i] for i, entry_type in enumerate(ENTRY_TYPES) if self.counts[base + i]}
+
+    def totals(self, entry_type=None):
+        return [self.value(index, entry_type) for index in range(self.days)]
+
+
+def rollup_trusted(rebuilt):
+    """Days whose daily_rollups are complete, from (rollup_date, rebuilt_at) rows of rollup_days.
+
+    A day counts only if a rebuild ran after it was over. The last day rebuilt
+    never counts: entries saved since that rebuild are not in its rollups.
+    """
+    last = max((day for day, _ in rebuilt), default=None)
+    return {day for day, rebuilt_at in rebuilt if day < last and rebuilt_at.date() > day}
+
+
+def live_runs(start, end, trusted):
+    """[first, last] runs of consecutive days from start to end that are not trusted"""
+    runs = []
+    day = start
+    while day <= end:
+        if day not in trusted:
+            if runs and runs[-1][1] == day - timedelta(days=1):
+                runs[-1][1] = day
+            else:
+                runs.append([day, day])
+        day += timedelta(days=1)
+    return runs
+
+
+def load_buckets(queries, connection, patient_id, end_date, days=DAYS):
+    """Fill YearBuckets from daily_rollups for the days rebuilds completed and grouped queries for the rest.
+
+    Without rollups this is a single GROUP BY over the patient's entries. Days
+    no rebuild completed (holes between rebuilds, the last day rebuilt and
+    everything after it) are counted live, one query per run of such days.
+    """
+    buckets = YearBuckets(end_date, days)
+    start = buckets.start_date
+    trusted = rollup_trusted(queries.fetchall(connection, "rollup_days", (start, end_date)))
+    if trusted:
+        rows = queries.fetchall(connection, "heatmap_rollups", (patient_id, min(trusted), max(trusted)))
+        buckets.add_rows(row for row in rows if row[0] in trusted)
+    runs = live_runs(start, end_date, trusted)
+    if len(runs) > MAX_LIVE_QUERIES:
+        runs = [[runs[0][0], runs[-1][1]]]
+    for first, last in runs:
+        rows = queries.fetchall(connection, "heatmap_counts", (patient_id, first, last))
+        buckets.add_rows(row for row in rows if row[0] not in trusted)
+    return buckets
+
+
+def level(value, peak):
+    """Colour index 0-4 for a count, relative to the busiest day"""
+    if value <= 0 or peak <= 0:
+        return 0
+    return min(4, 1 + (value * 4 - 1) // peak)
+
+
+def draw(canvas, buckets, entry_type=None):
+    """Draw the grid (weeks as columns, Monday..Sunday as rows) with one rectangle per day"""
+    canvas.delete("all")
+    totals = buckets.totals(entry_type)
+    peak = max(totals) if totals else 0
+    first_weekday = buckets.start_date.weekday()
+    for label, row in (("Mon", 0), ("Wed", 2), ("Fri", 4)):
+        canvas.create_text(LEFT - 6, TOP + row * (CELL + GAP) + CELL / 2, text=label, anchor="e",
+                           font=("Arial", 8), fill="#64748b")
+    month = None
+    for index, value in enumerate(totals):
+        slot = index + first_weekday
+        column, row = divmod(slot, 7)
+        x = LEFT + column * (CELL + GAP)
+        y = TOP + row * (CELL + GAP)
+        day = buckets.start_date + timedelta(days=index)
+        if (row == 0 or index == 0) and day.month != month:
+            month = day.month
+            canvas.create_text(x, TOP - 8, text=day.strftime("%b"), anchor="w", font=("Arial", 8), fill="#64748b")
+        canvas.create_rectangle(x, y, x + CELL, y + CELL, fill=COLORS[level(value, peak)], outline="")
+    canvas.create_rectangle(0, 0, 0, 0, outline="#1e293b", width=2, tags=("selection",))
+    width = LEFT + ((buckets.days + first_weekday + 6) // 7) * (CELL + GAP)
+    canvas.configure(width=width, height=TOP + 7 * (CELL + GAP))
+    return peak
+
+
+def day_at(buckets, x, y):
+    """Day index under a canvas point, or None (hit-testing by arithmetic, not per-cell bindings)"""
+    column = (x - LEFT) // (CELL + GAP)
+    row = (y - TOP) // (CELL + GAP)
+    if x < LEFT or y < TOP or not 0 <= row < 7:
+        return None
+    index = int(column * 7 + row - buckets.start_date.weekday())
+    return index if 0 <= index < buckets.days else None
+
+
+def select(canvas, buckets, index):
+    """Move the selection outline to a day"""
+    column, row = divmod(index + buckets.start_date.weekday(), 7)
+    x = LEFT + column * (CELL + GAP)
+    y = TOP + row * (CELL + GAP)
+    canvas.coords("selection", x - 1, y - 1, x + CELL + 1, y + CELL + 1)
+    canvas.tag_raise("selection")
@@ -0,0 +1,462 @@
+"""memory-companion: command-line administration and batch jobs (no Tk, no display needed)
+
+    python memory_companion_cli.py migrate [--status]
+    python memory_companion_cli.py seed
+    python memory_companion_cli.py user add ROLE USERNAME --name NAME [--password PW] [...]
+    python memory_companion_cli.py user list [--role ROLE]
+    python memory_companion_cli.py export PATIENT_ID FILE [--since DATE] [--until DATE]
+    python memory_companion_cli.py import FILE [--patient PATIENT_ID]
+    python memory_companion_cli.py summary PATIENT_ID [--period daily|weekly|monthly] [--format text|html|pdf]
+    python memory_companion_cli.py reports refresh [--period ...] [--format html|pdf]
+    python memory_companion_cli.py rollup rebuild [--since DATE] [--until DATE]
+    python memory_companion_cli.py consent show|grant|revoke PATIENT_ID [TYPE]
+    python memory_companion_cli.py reminders archive [--days N]
+    python memory_companion_cli.py changes purge [--days N]
+    python memory_companion_cli.py analytics snapshot [--full]
+    python memory_companion_cli.py analytics query REPORT|--sql SQL [--since DATE] [--until DATE]
+
+Uses the same configuration (config.py / MEMORY_COMPANION_* variables), named
+statements, schema and shard routing as the desktop app. Exits 0 on success
+and 1 on database or input errors, so it can run from cron. `analytics query`
+only reads the snapshot file and does not connect to MySQL.
+"""
+import argparse
+import getpass
+import json
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+from mysql.connector import Error
+
+import analytics
+import archive
+import config
+import consent
+import schema
+import shards
+from changefeed import purge_changes, record_changes
+from connections import ConnectionRouter
+from queries import QueryRegistry
+from records import Caregiver, Doctor, Patient
+
+ROLES = ('patient', 'caregiver', 'doctor')
+IMPORT_BATCH_SIZE = 500
+# The range MySQL supports for DATE columns
+EARLIEST_DATE = date(1000, 1, 1)
+LATEST_DATE = date(9999, 12, 31)
+
+_LIST_STATEMENTS = {'patient': ("list_patients", Patient), 'caregiver': ("list_caregivers", Caregiver),
+                    'doctor': ("list_doctors", Doctor)}
+_ENTRY_FIELDS = ('user_type', 'user_id', 'patient_id', 'entry_type', 'title', 'description', 'entry_date', 'entry_time')
+_REMINDER_FIELDS = ('user_type', 'user_id', 'patient_id', 'title', 'description', 'reminder_date', 'reminder_time',
+                    'reminder_type', 'is_active', 'is_completed')
+
+
+class Database:
+    """The home database plus the configured shards, opened once per command"""
+
+    def __init__(self):
+        self.queries = QueryRegistry()
+        self.home = ConnectionRouter(config.DB_CONFIG, None, config.REPLICA_STICKY_SECONDS)
+        self.shards = shards.ShardSet(self.home, config.SHARD_CONFIGS) if config.SHARD_CONFIGS else None
+
+    def connect(self):
+        self.home.connect()
+        if self.shards:
+            self.shards.connect()
+        for router in self.routers:
+            self.queries.attach(router)
+
+    @property
+    def routers(self):
+        return self.shards.routers if self.shards else [self.home]
+
+    def router_for_patient(self, patient_id):
+        return self.shards.router_for_patient(self.queries, patient_id) if self.shards else self.home
+
+    def close(self):
+        if self.shards:
+            self.shards.close(self.queries)
+        if self.home.primary is not None:
+            self.queries.close(self.home.primary)
+        self.home.close()
+
+
+def _date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {text!r}")
+
+
+def _json_value(value):
+    """Dates, TIME values (timedelta) and decimals as plain strings"""
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    return str(value)
+
+
+def cmd_migrate(db, args):
+    for index, router in enumerate(db.routers):
+        if args.status:
+            print(f"shard {index}: schema version {schema.stored_version(router.primary)} "
+                  f"(code expects {schema.SCHEMA_VERSION})")
+            continue
+        upgraded = schema.ensure_schema(router.primary)
+        if db.shards:
+            db.shards.backfill_directory(db.queries, index)
+        print(f"✓ shard {index}: schema {'upgraded to' if upgraded else 'already at'} version {schema.SCHEMA_VERSION}")
+    return 0
+
+
+def cmd_seed(db, args):
+    schema.ensure_schema(db.home.primary)
+    if not schema.seed_sample_data(db.home.primary):
+        print("Patients already exist; sample data not inserted")
+        return 0
+    if db.shards:
+        db.shards.backfill_directory(db.queries, 0)
+    return 0
+
+
+def cmd_user_add(db, args):
+    password = args.password or getpass.getpass(f"Password for {args.username}: ")
+    if not password:
+        print("Error: a password is required", file=sys.stderr)
+        return 1
+    # Same defaults as the Add User form
+    if args.role == 'patient':
+        values = (args.username, password, args.name, args.age, args.diagnosis, args.stage, args.emergency_contact)
+    elif args.role == 'caregiver':
+        if args.patient_id is None:
+            print("Error: caregivers need --patient-id", file=sys.stderr)
+            return 1
+        values = (args.username, password, args.name, args.phone, args.relationship, args.patient_id)
+    else:
+        values = (args.username, password, args.name, args.specialization, args.license, args.hospital)
+    user_id = shards.create_user(db.queries, db.shards, db.home, args.role, args.username, values, args.patient_id)
+    print(f"✓ Created {args.role} {args.username} (id {user_id})")
+    return 0
+
+
+def cmd_user_list(db, args):
+    connections = [router.reader() for router in db.routers]
+    for role in ([args.role] if args.role else ROLES):
+        statement, record = _LIST_STATEMENTS[role]
+        rows = shards.fan_out(db.queries, connections, statement, key=lambda row: row[0])
+        for user in (record(*row) for row in rows):
+            print(f"{role}\t{user.id}\t{user.username}\t{user.full_name}\t{user.created_at}")
+    return 0
+
+
+def cmd_export(db, args):
+    """Write a patient's entries and reminders as JSON lines (one object per row)"""
+    since = args.since or EARLIEST_DATE
+    until = args.until or LATEST_DATE
+    connection = db.router_for_patient(args.patient_id).reader()
+    count = 0
+    with open(args.file, "w", encoding="utf-8") as f:
+        for table, statement in (('entries', "export_entries"), ('reminders', "export_reminders")):
+            # Streamed: the export never holds a patient's whole history in memory
+            rows = db.queries.stream(connection, statement, (args.patient_id, since, until))
+            fields = ('id',) + (_ENTRY_FIELDS if table == 'entries' else _REMINDER_FIELDS)
+            for row in rows:
+                record = {field: _json_value(value) for field, value in zip(fields, row)}
+                record['table'] = table
+                f.write(json.dumps(record) + "\n")
+                count += 1
+    print(f"✓ Exported {count} rows for patient {args.patient_id} to {args.file}")
+    return 0
+
+
+def _flush(db, router, table, pending):
+    """Insert one batch of imported rows, log them in the change feed and commit"""
+    statement, fields = ("insert_entry", _ENTRY_FIELDS) if table == 'entries' else ("import_reminder", _REMINDER_FIELDS)
+    by_patient = {}
+    with router.unit_of_work() as connection:
+        for record in pending:
+            row_id = db.queries.insert(connection, statement, tuple(record.get(field) for field in fields))
+            by_patient.setdefault(record['patient_id'], []).append(row_id)
+        for patient_id, row_ids in by_patient.items():
+            record_changes(db.queries, connection, table, 'insert', row_ids, patient_id)
+    return len(pending)
+
+
+def cmd_import(db, args):
+    """Insert rows written by `export` (new ids; --patient moves them to another patient)"""
+    batches = {}
+    imported = 0
+    with open(args.file, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                table = record['table']
+                if table not in ('entries', 'reminders'):
+                    raise KeyError(table)
+                if args.patient is not None:
+                    record['patient_id'] = args.patient
+                fields = _ENTRY_FIELDS if table == 'entries' else _REMINDER_FIELDS
+                missing = [field for field in fields if field != 'description' and record.get(field) is None]
+                if missing:
+                    raise ValueError(f"missing {', '.join(missing)}")
+                record['patient_id'] = int(record['patient_id'])
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Error: {args.file}:{line_number}: not an exported row ({e})", file=sys.stderr)
+                return 1
+            router = db.router_for_patient(record['patient_id'])
+            pending = batches.setdefault((id(router), table), (router, []))[1]
+            pending.append(record)
+            if len(pending) >= IMPORT_BATCH_SIZE:
+                imported += _flush(db, router, table, pending)
+                pending.clear()
+    for (_, table), (router, pending) in batches.items():
+        if pending:
+            imported += _flush(db, router, table, pending)
+    print(f"✓ Imported {imported} rows from {args.file}")
+    return 0
+
+
+def cmd_summary(db, args):
+    # Imported here: reportlab (PDF output) is slow to import and only this command needs it
+    import reports
+
+    end_date = args.date or date.today()
+    router = db.router_for_patient(args.patient_id)
+    if args.format == 'text':
+        start, end = reports.period_window(args.period, end_date)
+        results = db.queries.fetchall(router.reader(), "summary_counts_between", (args.patient_id, start, end))
+        print(reports.summary_text(results, sum(count for _, count in results), args.period))
+        return 0
+    generator = reports.ReportGenerator(lambda patient_id=None: router.reader(), db.queries)
+    try:
+        print(generator.get_or_generate(args.patient_id, args.period, end_date, args.format))
+    finally:
+        generator.shutdown()
+    return 0
+
+
+def cmd_reports_refresh(db, args):
+    import reports
+
+    generator = reports.ReportGenerator(lambda patient_id=None: db.router_for_patient(patient_id).reader(),
+                                        db.queries,
+                                        get_connections=lambda: [router.reader() for router in db.routers])
+    rendered = failed = 0
+    try:
+        futures = generator.refresh(periods=args.period or reports.PERIODS, end_date=args.date, fmt=args.format)
+        for future in futures:
+            if future.exception() is None:
+                rendered += 1
+            else:
+                failed += 1
+                print(f"Report failed: {future.exception()}", file=sys.stderr)
+    finally:
+        generator.shutdown()
+    print(f"✓ Rendered {rendered} reports ({failed} failed)")
+    return 1 if failed else 0
+
+
+def cmd_rollup_rebuild(db, args):
+    """Recompute daily_rollups for a date range (yesterday and today by default)"""
+    until = args.until or date.today()
+    since = args.since or until - timedelta(days=1)
+    for index, router in enumerate(db.routers):
+        with router.unit_of_work() as connection:
+            db.queries.execute(connection, "delete_rollups", (since, until))
+            rows = db.queries.execute(connection, "rebuild_rollups", (since, until))
+            day = since
+            while day <= until:
+                db.queries.execute(connection, "mark_rollup_day", (day,))
+                day += timedelta(days=1)
+        print(f"✓ shard {index}: {rows} rollup rows for {since} .. {until}")
+    return 0
+
+
+def cmd_consent(db, args):
+    """Show a patient's consent state, or record a grant/revocation"""
+    router = db.router_for_patient(args.patient_id)
+    index = consent.ConsentIndex(db.queries, config.CONSENT_DEFAULT_GRANTED)
+    if args.action != 'show':
+        if args.consent_type is None:
+            print("Error: grant and revoke need a consent type", file=sys.stderr)
+            return 1
+        index.record(router, args.patient_id, args.consent_type, args.action == 'grant')
+    state = index.state(router.primary, args.patient_id)
+    for consent_type in consent.CONSENT_LABELS:
+        given = state.get(consent_type)
+        text = ("granted" if given else "revoked") if given is not None else \
+            f"not recorded ({'granted' if index.default else 'revoked'} by default)"
+        print(f"{consent_type}\t{text}")
+    return 0
+
+
+def cmd_reminders_archive(db, args):
+    """Move completed and deleted reminders older than --days to reminders_archive"""
+    for index, router in enumerate(db.routers):
+        moved = archive.archive_reminders(db.queries, router, args.days)
+        print(f"✓ shard {index}: archived {moved} reminders dated before {date.today() - timedelta(days=args.days)}")
+    return 0
+
+
+def cmd_changes_purge(db, args):
+    """Delete change_log rows older than --days"""
+    for index, router in enumerate(db.routers):
+        purged = purge_changes(db.queries, router, args.days)
+        print(f"✓ shard {index}: purged {purged} change_log rows older than {args.days} days")
+    return 0
+
+
+def cmd_analytics_snapshot(db, args):
+    """Copy new and changed rows into the analytics snapshot (all of them with --full)"""
+    builder = analytics.SnapshotBuilder(db.queries, db.routers, args.path)
+    copied = builder.build(full=args.full)
+    print(f"✓ Analytics snapshot {args.path}: " + ", ".join(f"{count} {source}" for source, count in copied.items()))
+    return 0
+
+
+def cmd_analytics_query(db, args):
+    """Run a canned report or an ad-hoc SELECT on the snapshot and print tab-separated rows"""
+    if (args.report is None) == (args.sql is None):
+        print(f"Error: give a report name ({', '.join(analytics.REPORTS)}) or --sql", file=sys.stderr)
+        return 1
+    if args.report is not None and args.report not in analytics.REPORTS:
+        print(f"Error: unknown report {args.report!r}; choose from {', '.join(analytics.REPORTS)}", file=sys.stderr)
+        return 1
+    sql = args.sql or analytics.REPORTS[args.report]
+    params = {'since': analytics.date_key(args.since or EARLIEST_DATE),
+              'until': analytics.date_key(args.until or LATEST_DATE)}
+    columns, rows = analytics.query(args.path, sql, params)
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if value is None else str(value) for value in row))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="memory-companion", description="Memory Companion administration")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="bring every shard's schema up to date")
+    migrate.add_argument("--status", action="store_true", help="only print the stored schema versions")
+    migrate.set_defaults(handler=cmd_migrate)
+
+    seed = commands.add_parser("seed", help="insert the demo users into an empty database")
+    seed.set_defaults(handler=cmd_seed)
+
+    user = commands.add_parser("user", help="manage patients, caregivers and doctors").add_subparsers(
+        dest="user_command", required=True)
+    add = user.add_parser("add", help="create a user")
+    add.add_argument("role", choices=ROLES)
+    add.add_argument("username")
+    add.add_argument("--name", required=True, help="full name")
+    add.add_argument("--password", help="prompted for when omitted")
+    add.add_argument("--age", type=int, default=65)
+    add.add_argument("--diagnosis", default="Not Diagnosed")
+    add.add_argument("--stage", default="Early")
+    add.add_argument("--emergency-contact", default="N/A")
+    add.add_argument("--phone", default="+91-9000000000")
+    add.add_argument("--relationship", default="Relative")
+    add.add_argument("--patient-id", type=int, help="the caregiver's patient")
+    add.add_argument("--specialization", default="General")
+    add.add_argument("--license", default="TEMP-LIC")
+    add.add_argument("--hospital", default="Local Hospital")
+    add.set_defaults(handler=cmd_user_add)
+    listing = user.add_parser("list", help="list users")
+    listing.add_argument("--role", choices=ROLES)
+    listing.set_defaults(handler=cmd_user_list)
+
+    export = commands.add_parser("export", help="write a patient's entries and reminders as JSON lines")
+    export.add_argument("patient_id", type=int)
+    export.add_argument("file")
+    export.add_argument("--since", type=_date)
+    export.add_argument("--until", type=_date)
+    export.set_defaults(handler=cmd_export)
+
+    load = commands.add_parser("import", help="insert rows from an export file")
+    load.add_argument("file")
+    load.add_argument("--patient", type=int, help="import for this patient instead of the exported one")
+    load.set_defaults(handler=cmd_import)
+
+    summary = commands.add_parser("summary", help="print a summary or render a report for one patient")
+    summary.add_argument("patient_id", type=int)
+    summary.add_argument("--period", choices=('daily', 'weekly', 'monthly'), default='daily')
+    summary.add_argument("--format", choices=('text', 'html', 'pdf'), default='text')
+    summary.add_argument("--date", type=_date, help="last day of the period (default today)")
+    summary.set_defaults(handler=cmd_summary)
+
+    report_commands = commands.add_parser("reports", help="batch report rendering").add_subparsers(
+        dest="reports_command", required=True)
+    refresh = report_commands.add_parser("refresh", help="re-render every report whose entries changed")
+    refresh.add_argument("--period", action="append", choices=('daily', 'weekly', 'monthly'))
+    refresh.add_argument("--format", choices=('html', 'pdf'), default='html')
+    refresh.add_argument("--date", type=_date, help="last day of the periods (default today)")
+    refresh.set_defaults(handler=cmd_reports_refresh)
+
+    rollup = commands.add_parser("rollup", help="daily entry count rollups").add_subparsers(
+        dest="rollup_command", required=True)
+    rebuild = rollup.add_parser("rebuild", help="recompute daily_rollups for a date range")
+    rebuild.add_argument("--since", type=_date, help="first day (default the day before --until)")
+    rebuild.add_argument("--until", type=_date, help="last day (default today)")
+    rebuild.set_defaults(handler=cmd_rollup_rebuild)
+
+    consents = commands.add_parser("consent", help="a patient's consent to caregiver/doctor access")
+    consents.add_argument("action", choices=('show', 'grant', 'revoke'))
+    consents.add_argument("patient_id", type=int)
+    consents.add_argument("consent_type", nargs="?", choices=tuple(consent.CONSENT_LABELS))
+    consents.set_defaults(handler=cmd_consent)
+
+    reminder_commands = commands.add_parser("reminders", help="reminder maintenance").add_subparsers(
+        dest="reminders_command", required=True)
+    archiving = reminder_commands.add_parser("archive", help="move old completed and deleted reminders to the archive")
+    archiving.add_argument("--days", type=int, default=config.REMINDER_ARCHIVE_DAYS,
+                           help="keep reminders dated within this many days (default %(default)s)")
+    archiving.set_defaults(handler=cmd_reminders_archive)
+
+    change_commands = commands.add_parser("changes", help="change feed maintenance").add_subparsers(
+        dest="changes_command", required=True)
+    purging = change_commands.add_parser("purge", help="delete old change_log rows")
+    purging.add_argument("--days", type=int, default=config.CHANGE_LOG_RETENTION_DAYS or 14,
+                         help="keep changes from the last this many days (default %(default)s)")
+    purging.set_defaults(handler=cmd_changes_purge)
+
+    analytic = commands.add_parser("analytics", help="de-identified reporting snapshot").add_subparsers(
+        dest="analytics_command", required=True)
+    snapshot = analytic.add_parser("snapshot", help="bring the snapshot file up to date")
+    snapshot.add_argument("--full", action="store_true", help="rebuild from scratch instead of incrementally")
+    snapshot.add_argument("--path", default=config.ANALYTICS_PATH)
+    snapshot.set_defaults(handler=cmd_analytics_snapshot)
+    scan = analytic.add_parser("query", help="run a report or SELECT on the snapshot (no MySQL needed)")
+    scan.add_argument("report", nargs="?", help=", ".join(analytics.REPORTS))
+    scan.add_argument("--sql", help="ad-hoc SELECT; :since and :until are yyyymmdd date keys")
+    scan.add_argument("--since", type=_date)
+    scan.add_argument("--until", type=_date)
+    scan.add_argument("--path", default=config.ANALYTICS_PATH)
+    scan.set_defaults(handler=cmd_analytics_query, offline=True)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = Database()
+    try:
+        if not getattr(args, "offline", False):
+            db.connect()
+        return args.handler(db, args)
+    except Error as e:
+        print(f"Database error: {e}", file=sys.stderr)
+        return 1
+    except sqlite3.Error as e:
+        print(f"Analytics error: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
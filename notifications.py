@@ -0,0 +1,135 @@
+"""Non-modal notification tray for due reminders"""
+import tkinter as tk
+
+
+class NotificationTray:
+    """Stacks reminder notices in the corner of the main window without blocking it.
+
+    Reminders posted within coalesce_ms of each other are grouped into one
+    notice. Each reminder can be marked done (through on_done, which gets a
+    list of reminder ids and returns True on success) and a whole notice can
+    be snoozed or dismissed. A reminder occurrence is only shown once, however
+    often the checker reports it; occurrence keys are (reminder id, ISO date,
+    time) and only the current and previous day's are remembered. Screens
+    keep the tray's frame when they clear the window and call lift() once
+    they are built, so notices survive navigation until they are acted on.
+    """
+
+    def __init__(self, root, on_done, coalesce_ms=1500, snooze_minutes=10):
+        self.root = root
+        self.on_done = on_done
+        self.coalesce_ms = coalesce_ms
+        self.snooze_minutes = snooze_minutes
+        self.frame = None
+        self.delivered = set()
+        self._day = None
+        self._pending = {}
+        self._flush_job = None
+        self._snooze_jobs = set()
+
+    def post(self, key, reminder_id, title, due_label):
+        """Queue one due reminder occurrence; key identifies the occurrence (id, date, time)"""
+        if key in self.delivered:
+            return
+        day = key[1]
+        if self._day is None or day > self._day:
+            # A new day: forget the occurrences from before the previous one
+            self.delivered = {seen for seen in self.delivered if seen[1] >= (self._day or day)}
+            self._day = day
+        self.delivered.add(key)
+        self._queue(reminder_id, title, due_label)
+
+    def lift(self):
+        """Keep the notices above a screen built after them"""
+        if self.frame is not None and self.frame.winfo_exists():
+            self.frame.lift()
+
+    def _queue(self, reminder_id, title, due_label):
+        self._pending[reminder_id] = (title, due_label)
+        if self._flush_job is None:
+            self._flush_job = self.root.after(self.coalesce_ms, self._flush)
+
+    def _container(self):
+        # Recreated on demand: clear() (and a window rebuilt without keeping it) destroys it
+        if self.frame is None or not self.frame.winfo_exists():
+            self.frame = tk.Frame(self.root, bg="#f0f4f8")
+            self.frame.place(relx=1.0, rely=1.0, x=-20, y=-20, anchor="se")
+        self.frame.lift()
+        return self.frame
+
+    def _flush(self):
+        self._flush_job = None
+        items, self._pending = self._pending, {}
+        if items:
+            self._show_notice(items)
+
+    def _show_notice(self, items):
+        notice = tk.Frame(self._container(), bg="#fffbeb", relief=tk.RAISED, borderwidth=2, padx=12, pady=8)
+        notice.pack(side=tk.BOTTOM, fill=tk.X, pady=4)
+        rows = {}
+
+        header = "⏰ Reminder due" if len(items) == 1 else f"⏰ {len(items)} reminders due"
+        tk.Label(notice, text=header, font=("Arial", 11, "bold"), bg="#fffbeb", fg="#92400e").pack(anchor="w")
+
+        for reminder_id, (title, due_label) in items.items():
+            row = tk.Frame(notice, bg="#fffbeb")
+            row.pack(fill=tk.X, pady=2)
+            tk.Label(row, text=f"{due_label}  {title}", font=("Arial", 10), bg="#fffbeb", fg="#1e293b",
+                     anchor="w", wraplength=260, justify=tk.LEFT).pack(side=tk.LEFT, fill=tk.X, expand=True)
+            tk.Button(row, text="✓ Done", font=("Arial", 8), bg="#10b981", fg="white", padx=6,
+                      command=lambda r=reminder_id: self._done(notice, items, rows, [r])).pack(side=tk.RIGHT, padx=(8, 0))
+            rows[reminder_id] = row
+
+        actions = tk.Frame(notice, bg="#fffbeb")
+        actions.pack(fill=tk.X, pady=(6, 0))
+        if len(items) > 1:
+            tk.Button(actions, text="✓ All done", font=("Arial", 8), bg="#10b981", fg="white", padx=6,
+                      command=lambda: self._done(notice, items, rows, list(items))).pack(side=tk.LEFT)
+        tk.Button(actions, text=f"💤 Snooze {self.snooze_minutes:g} min", font=("Arial", 8), bg="#f59e0b",
+                  fg="white", padx=6, command=lambda: self._snooze(notice, items)).pack(side=tk.LEFT, padx=4)
+        tk.Button(actions, text="✕", font=("Arial", 8), bg="#e2e8f0", fg="#1e293b", padx=6,
+                  command=lambda: self._close(notice)).pack(side=tk.RIGHT)
+
+    def _done(self, notice, items, rows, reminder_ids):
+        if not self.on_done(reminder_ids):
+            return
+        for reminder_id in reminder_ids:
+            items.pop(reminder_id, None)
+            row = rows.pop(reminder_id, None)
+            if row is not None and row.winfo_exists():
+                row.destroy()
+        if not items:
+            self._close(notice)
+
+    def _snooze(self, notice, items):
+        self._close(notice)
+        snoozed = dict(items)
+
+        def wake():
+            self._snooze_jobs.discard(job)
+            for reminder_id, (title, due_label) in snoozed.items():
+                self._queue(reminder_id, title, due_label)
+
+        job = self.root.after(int(self.snooze_minutes * 60000), wake)
+        self._snooze_jobs.add(job)
+
+    def _close(self, notice):
+        if notice.winfo_exists():
+            notice.destroy()
+        if self.frame is not None and self.frame.winfo_exists() and not self.frame.winfo_children():
+            self.frame.destroy()
+            self.frame = None
+
+    def clear(self):
+        """Drop every notice and pending snooze (on logout)"""
+        for job in [self._flush_job, *self._snooze_jobs]:
+            if job is not None:
+                self.root.after_cancel(job)
+        self._flush_job = None
+        self._snooze_jobs.clear()
+        self._pending.clear()
+        self.delivered.clear()
+        self._day = None
+        if self.frame is not None and self.frame.winfo_exists():
+            self.frame.destroy()
+        self.frame = None
@@ -0,0 +1,487 @@
+"""Named SQL statements for Memory Companion, prepared once per connection"""
+import threading
+import time
+import weakref
+
+
+# Every hot statement the app issues lives here, keyed by name, so there is
+# one place to read and tune the SQL that runs against MySQL.
+#
+# List queries only fetch the first 100 characters of description TEXT plus
+# its full length; cards load the rest on demand through *_description.
+STATEMENTS = {
+    # Login probes
+    "login_patient": "SELECT id, full_name FROM patients WHERE username = %s AND password = %s",
+    "login_caregiver": "SELECT id, full_name FROM caregivers WHERE username = %s AND password = %s",
+    "login_doctor": "SELECT id, full_name FROM doctors WHERE username = %s AND password = %s",
+
+    # Liveness check (also reconnects a dropped connection through its router)
+    "ping": "SELECT 1",
+
+    # Read-your-writes tracking for the replica (see ConnectionRouter)
+    "gtid_executed": "SELECT @@GLOBAL.gtid_executed",
+    "wait_for_gtid": "SELECT WAIT_FOR_EXECUTED_GTID_SET(%s, 0)",
+
+    # Session helpers
+    "caregiver_patient": "SELECT patient_id FROM caregivers WHERE id = %s",
+    "first_patient": "SELECT id FROM patients LIMIT 1",
+    "log_action": "INSERT INTO audit_logs (user_type, user_id, action, details) VALUES (%s, %s, %s, %s)",
+
+    # Dashboard stats
+    "count_today_entries": "SELECT COUNT(*) FROM entries WHERE patient_id = %s AND entry_date = CURDATE()",
+    "count_open_reminders": "SELECT COUNT(*) FROM reminders WHERE patient_id = %s AND is_active = TRUE AND is_completed = FALSE",
+
+    # Entries
+    "insert_entry": """INSERT INTO entries (user_type, user_id, patient_id, entry_type, title, description, entry_date, entry_time)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+    "delete_entries": "DELETE FROM entries WHERE id IN ({ids})",
+    "entry_description": "SELECT description FROM entries WHERE id = %s",
+    # Quick-entry templates (quickentry.py): how often each title was logged in each hour
+    "entry_templates": """SELECT entry_type, title, HOUR(entry_time), COUNT(*), SUM(TIME_TO_SEC(entry_time))
+                          FROM entries WHERE patient_id = %s AND entry_date >= %s
+                          GROUP BY entry_type, title, HOUR(entry_time)""",
+
+    # Attachments (files live in the attachment store, keyed by SHA-256)
+    "insert_attachment": "INSERT IGNORE INTO attachments (sha256, size, mime, kind) VALUES (%s, %s, %s, %s)",
+    "link_attachment": "INSERT IGNORE INTO entry_attachments (entry_id, sha256, original_name) VALUES (%s, %s, %s)",
+    "attachments_for_entries": """SELECT ea.entry_id, a.sha256, a.kind, ea.original_name
+                                  FROM entry_attachments ea JOIN attachments a ON a.sha256 = ea.sha256
+                                  WHERE ea.entry_id IN ({ids})
+                                  ORDER BY ea.entry_id, ea.original_name""",
+
+    "entries_for_patient": """SELECT id, entry_type, title, LEFT(description, 100), CHAR_LENGTH(description), entry_date, entry_time, user_type
+                              FROM entries WHERE patient_id = %s
+                              ORDER BY entry_date DESC, entry_time DESC""",
+    "entries_for_patient_by_type": """SELECT id, entry_type, title, LEFT(description, 100), CHAR_LENGTH(description), entry_date, entry_time, user_type
+                                      FROM entries WHERE patient_id = %s AND entry_type = %s
+                                      ORDER BY entry_date DESC, entry_time DESC""",
+    "recent_entries": """SELECT id, entry_type, title, LEFT(description, 100), CHAR_LENGTH(description), entry_date, entry_time, user_type,
+                                patient_id
+                         FROM entries
+                         ORDER BY entry_date DESC, entry_time DESC LIMIT 50""",
+    "recent_entries_by_type": """SELECT id, entry_type, title, LEFT(description, 100), CHAR_LENGTH(description), entry_date, entry_time, user_type,
+                                        patient_id
+                                 FROM entries WHERE entry_type = %s
+                                 ORDER BY entry_date DESC, entry_time DESC LIMIT 50""",
+
+    # Reminders
+    "insert_reminder": """INSERT INTO reminders (user_type, user_id, patient_id, title, description, reminder_date, reminder_time, reminder_type)
+                          VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+    "complete_reminders": "UPDATE reminders SET is_completed = TRUE WHERE id IN ({ids})",
+    "deactivate_reminders": "UPDATE reminders SET is_active = FALSE WHERE id IN ({ids})",
+    "reminder_description": "SELECT description FROM reminders WHERE id = %s",
+    # The reminder screen's date window (inclusive) and the open reminders dated before it
+    "reminders_for_patient_between": """SELECT id, title, LEFT(description, 100), CHAR_LENGTH(description), reminder_date, reminder_time, reminder_type, is_completed
+                                        FROM reminders WHERE patient_id = %s AND reminder_date BETWEEN %s AND %s AND is_active = TRUE
+                                        ORDER BY reminder_date, reminder_time""",
+    "reminders_for_user_between": """SELECT id, title, LEFT(description, 100), CHAR_LENGTH(description), reminder_date, reminder_time, reminder_type, is_completed
+                                     FROM reminders WHERE user_type = %s AND user_id = %s AND reminder_date BETWEEN %s AND %s
+                                     AND is_active = TRUE
+                                     ORDER BY reminder_date, reminder_time""",
+    "overdue_reminders_for_patient": """SELECT id, title, LEFT(description, 100), CHAR_LENGTH(description), reminder_date, reminder_time, reminder_type, is_completed
+                                        FROM reminders WHERE patient_id = %s AND reminder_date < %s
+                                        AND is_active = TRUE AND is_completed = FALSE
+                                        ORDER BY reminder_date, reminder_time LIMIT 50""",
+    "overdue_reminders_for_user": """SELECT id, title, LEFT(description, 100), CHAR_LENGTH(description), reminder_date, reminder_time, reminder_type, is_completed
+                                     FROM reminders WHERE user_type = %s AND user_id = %s AND reminder_date < %s
+                                     AND is_active = TRUE AND is_completed = FALSE
+                                     ORDER BY reminder_date, reminder_time LIMIT 50""",
+    "due_reminders_on_date": """SELECT id, user_type, user_id, patient_id, title, description, reminder_time
+                                FROM reminders
+                                WHERE reminder_date = %s AND is_active = TRUE AND is_completed = FALSE""",
+    "due_reminders_between": """SELECT id, user_type, user_id, patient_id, title, description, reminder_time
+                                FROM reminders
+                                WHERE reminder_date = %s AND reminder_time > %s AND reminder_time <= %s
+                                AND is_active = TRUE AND is_completed = FALSE""",
+    "due_medication_reminders": """SELECT id, patient_id, title, reminder_date, reminder_time FROM reminders
+                                   WHERE reminder_date = %s AND reminder_type = 'medication'
+                                   AND is_active = TRUE AND is_completed = FALSE""",
+    # Archival: completed or deleted reminders dated before the cutoff move to reminders_archive
+    "archivable_reminders": """SELECT id FROM reminders
+                               WHERE reminder_date < %s AND (is_completed = TRUE OR is_active = FALSE)
+                               ORDER BY reminder_date LIMIT 500""",
+    "archive_reminders": """INSERT IGNORE INTO reminders_archive (id, user_type, user_id, patient_id, title, description,
+                                                            reminder_date, reminder_time, reminder_type, is_active,
+                                                            is_completed, created_at)
+                            SELECT id, user_type, user_id, patient_id, title, description, reminder_date, reminder_time,
+                                   reminder_type, is_active, is_completed, created_at
+                            FROM reminders WHERE id IN ({ids})""",
+    "purge_reminders": "DELETE FROM reminders WHERE id IN ({ids})",
+    "reminder_open": "SELECT is_active = TRUE AND is_completed = FALSE FROM reminders WHERE id = %s",
+    "patient_caregivers": "SELECT full_name, phone FROM caregivers WHERE patient_id = %s",
+    "patient_contact": "SELECT full_name, emergency_contact FROM patients WHERE id = %s",
+
+    # Summaries
+    "summary_counts_on_date": """SELECT entry_type, COUNT(*) FROM entries
+                                 WHERE patient_id = %s AND entry_date = %s
+                                 GROUP BY entry_type""",
+    "summary_counts_since": """SELECT entry_type, COUNT(*) FROM entries
+                               WHERE patient_id = %s AND entry_date >= %s
+                               GROUP BY entry_type""",
+    "summary_counts_between": """SELECT entry_type, COUNT(*) FROM entries
+                                 WHERE patient_id = %s AND entry_date BETWEEN %s AND %s
+                                 GROUP BY entry_type""",
+    "summary_recent_on_date": """SELECT title, entry_type, entry_time, LEFT(description, 100), CHAR_LENGTH(description) FROM entries
+                                 WHERE patient_id = %s AND entry_date = %s
+                                 ORDER BY entry_time DESC LIMIT 5""",
+    "summary_recent_since": """SELECT title, entry_type, entry_date, entry_time, LEFT(description, 100), CHAR_LENGTH(description) FROM entries
+                               WHERE patient_id = %s AND entry_date >= %s
+                               ORDER BY entry_date DESC, entry_time DESC LIMIT 5""",
+
+    # Year heatmap (rollups for the days a rebuild completed, live counts for the rest)
+    "rollup_days": "SELECT rollup_date, rebuilt_at FROM rollup_days WHERE rollup_date BETWEEN %s AND %s",
+    "heatmap_rollups": """SELECT rollup_date, entry_type, entry_count FROM daily_rollups
+                          WHERE patient_id = %s AND rollup_date BETWEEN %s AND %s""",
+    "heatmap_counts": """SELECT entry_date, entry_type, COUNT(*) FROM entries
+                         WHERE patient_id = %s AND entry_date BETWEEN %s AND %s
+                         GROUP BY entry_date, entry_type""",
+
+    # Reports
+    "report_patient": "SELECT full_name, age, diagnosis, stage FROM patients WHERE id = %s",
+    "report_entries": """SELECT entry_date, entry_time, entry_type, title, description FROM entries
+                         WHERE patient_id = %s AND entry_date BETWEEN %s AND %s
+                         ORDER BY entry_date, entry_time""",
+    # (entries, max id, last change_log id of those entries): inserts, deletes and edits all change it
+    "report_fingerprint": """SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(MAX(last_change), 0) FROM (
+                                 SELECT e.id, (SELECT MAX(c.id) FROM change_log c
+                                               WHERE c.table_name = 'entries' AND c.row_id = e.id) AS last_change
+                                 FROM entries e WHERE e.patient_id = %s AND e.entry_date BETWEEN %s AND %s
+                             ) window_entries""",
+    "report_fingerprints": """SELECT patient_id, COUNT(*), COALESCE(MAX(id), 0), COALESCE(MAX(last_change), 0) FROM (
+                                  SELECT e.patient_id, e.id, (SELECT MAX(c.id) FROM change_log c
+                                                              WHERE c.table_name = 'entries' AND c.row_id = e.id) AS last_change
+                                  FROM entries e WHERE e.entry_date BETWEEN %s AND %s
+                              ) window_entries
+                              GROUP BY patient_id""",
+
+    # Change feed
+    "bump_patient_version": """INSERT INTO patient_versions (patient_id, version) VALUES (%s, LAST_INSERT_ID(1))
+                               ON DUPLICATE KEY UPDATE version = LAST_INSERT_ID(version + 1)""",
+    "patient_version": "SELECT version FROM patient_versions WHERE patient_id = %s",
+    "log_entry_changes": """INSERT INTO change_log (patient_id, version, table_name, row_id, operation)
+                            SELECT patient_id, %s, 'entries', id, %s FROM entries
+                            WHERE patient_id = %s AND id IN ({ids})""",
+    "log_reminder_changes": """INSERT INTO change_log (patient_id, version, table_name, row_id, operation)
+                               SELECT patient_id, %s, 'reminders', id, %s FROM reminders
+                               WHERE patient_id = %s AND id IN ({ids})""",
+    "log_consent_changes": """INSERT INTO change_log (patient_id, version, table_name, row_id, operation)
+                              SELECT patient_id, %s, 'consent_logs', id, %s FROM consent_logs
+                              WHERE patient_id = %s AND id IN ({ids})""",
+    "entry_patients": "SELECT DISTINCT patient_id FROM entries WHERE id IN ({ids}) AND patient_id IS NOT NULL",
+    "reminder_patients": "SELECT DISTINCT patient_id FROM reminders WHERE id IN ({ids}) AND patient_id IS NOT NULL",
+    "changes_since_version": """SELECT version, table_name, row_id, operation FROM change_log
+                                WHERE patient_id = %s AND version > %s
+                                ORDER BY version, id""",
+    "latest_change_id": "SELECT COALESCE(MAX(id), 0) FROM change_log",
+    "changes_after_id": """SELECT id, table_name, row_id, operation FROM change_log
+                           WHERE id > %s ORDER BY id LIMIT 500""",
+    "purge_change_log": "DELETE FROM change_log WHERE changed_at < %s ORDER BY changed_at LIMIT 5000",
+    "entries_by_ids": """SELECT id, entry_type, title, LEFT(description, 100), CHAR_LENGTH(description), entry_date, entry_time, user_type,
+                                patient_id
+                         FROM entries WHERE id IN ({ids})""",
+    "reminders_by_ids": """SELECT id, title, LEFT(description, 100), CHAR_LENGTH(description), reminder_date, reminder_time, reminder_type, is_completed,
+                                  is_active, user_type, user_id
+                           FROM reminders WHERE id IN ({ids})""",
+
+    # Patients and users
+    "all_patient_ids": "SELECT id FROM patients",
+    "patient_for_caregiver": """SELECT p.id, p.full_name, p.age, p.diagnosis, p.stage, p.emergency_contact
+                                FROM patients p
+                                JOIN caregivers c ON c.patient_id = p.id
+                                WHERE c.id = %s""",
+    "patient_diagnoses": "SELECT DISTINCT diagnosis FROM patients WHERE diagnosis IS NOT NULL ORDER BY diagnosis",
+    "patient_stages": "SELECT DISTINCT stage FROM patients WHERE stage IS NOT NULL ORDER BY stage",
+    "insert_patient": """INSERT INTO patients (username,password,full_name,age,diagnosis,stage,emergency_contact)
+                         VALUES (%s,%s,%s,%s,%s,%s,%s)""",
+    "insert_patient_with_id": """INSERT INTO patients (id,username,password,full_name,age,diagnosis,stage,emergency_contact)
+                                 VALUES (%s,%s,%s,%s,%s,%s,%s,%s)""",
+    "insert_caregiver": """INSERT INTO caregivers (username,password,full_name,phone,relationship,patient_id)
+                           VALUES (%s,%s,%s,%s,%s,%s)""",
+    "insert_doctor": """INSERT INTO doctors (username,password,full_name,specialization,license_number,hospital)
+                        VALUES (%s,%s,%s,%s,%s,%s)""",
+
+    # Column order of records.Patient / Caregiver / Doctor
+    "list_patients": """SELECT id, full_name, age, diagnosis, stage, emergency_contact, username, created_at
+                        FROM patients ORDER BY id""",
+    "list_caregivers": """SELECT id, full_name, phone, relationship, patient_id, username, created_at
+                          FROM caregivers ORDER BY id""",
+    "list_doctors": """SELECT id, full_name, specialization, license_number, hospital, username, created_at
+                       FROM doctors ORDER BY id""",
+
+    # Export / import (command-line tool)
+    "export_entries": """SELECT id, user_type, user_id, patient_id, entry_type, title, description, entry_date, entry_time
+                         FROM entries WHERE patient_id = %s AND entry_date BETWEEN %s AND %s
+                         ORDER BY entry_date, entry_time, id""",
+    "export_reminders": """SELECT id, user_type, user_id, patient_id, title, description, reminder_date, reminder_time,
+                                  reminder_type, is_active, is_completed
+                           FROM (SELECT id, user_type, user_id, patient_id, title, description, reminder_date,
+                                        reminder_time, reminder_type, is_active, is_completed FROM reminders
+                                 UNION ALL
+                                 SELECT id, user_type, user_id, patient_id, title, description, reminder_date,
+                                        reminder_time, reminder_type, is_active, is_completed FROM reminders_archive) r
+                           WHERE patient_id = %s AND reminder_date BETWEEN %s AND %s
+                           ORDER BY reminder_date, reminder_time, id""",
+    "import_reminder": """INSERT INTO reminders (user_type, user_id, patient_id, title, description, reminder_date, reminder_time,
+                                                 reminder_type, is_active, is_completed)
+                          VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+
+    # Daily rollups
+    "delete_rollups": "DELETE FROM daily_rollups WHERE rollup_date BETWEEN %s AND %s",
+    "rebuild_rollups": """INSERT INTO daily_rollups (patient_id, rollup_date, entry_type, entry_count)
+                          SELECT patient_id, entry_date, entry_type, COUNT(*) FROM entries
+                          WHERE entry_date BETWEEN %s AND %s AND patient_id IS NOT NULL
+                          GROUP BY patient_id, entry_date, entry_type""",
+    "mark_rollup_day": """INSERT INTO rollup_days (rollup_date) VALUES (%s)
+                          ON DUPLICATE KEY UPDATE rebuilt_at = CURRENT_TIMESTAMP""",
+
+    # Consent (append-only history; the latest row per type is the current state)
+    "insert_consent": "INSERT INTO consent_logs (patient_id, consent_type, consent_given) VALUES (%s, %s, %s)",
+    "consent_state": """SELECT consent_type, consent_given FROM consent_logs
+                        WHERE patient_id = %s ORDER BY consent_date, id""",
+    "consent_states": "SELECT patient_id, consent_type, consent_given FROM consent_logs ORDER BY consent_date, id",
+
+    # Audit
+    "recent_audit_logs": "SELECT action_date, user_type, user_id, action, details FROM audit_logs ORDER BY action_date DESC LIMIT 200",
+
+    # Analytics snapshot (analytics.py): de-identified columns only, copied in id order
+    "analytics_patients": "SELECT id, age, diagnosis, stage FROM patients",
+    "analytics_entries_after": """SELECT id, patient_id, entry_date, entry_time, entry_type, user_type
+                                  FROM entries WHERE id > %s ORDER BY id""",
+    "analytics_entries_by_ids": """SELECT id, patient_id, entry_date, entry_time, entry_type, user_type
+                                   FROM entries WHERE id IN ({ids})""",
+    # Archived reminders keep their ids, so both tables count as one id sequence
+    "analytics_reminders_after": """SELECT id, patient_id, reminder_date, reminder_time, reminder_type, user_type,
+                                           is_active, is_completed
+                                    FROM (SELECT id, patient_id, reminder_date, reminder_time, reminder_type, user_type,
+                                                 is_active, is_completed FROM reminders
+                                          UNION ALL
+                                          SELECT id, patient_id, reminder_date, reminder_time, reminder_type, user_type,
+                                                 is_active, is_completed FROM reminders_archive) r
+                                    WHERE id > %s ORDER BY id""",
+    "analytics_reminders_by_ids": """SELECT id, patient_id, reminder_date, reminder_time, reminder_type, user_type,
+                                            is_active, is_completed
+                                     FROM (SELECT id, patient_id, reminder_date, reminder_time, reminder_type, user_type,
+                                                  is_active, is_completed FROM reminders
+                                           UNION ALL
+                                           SELECT id, patient_id, reminder_date, reminder_time, reminder_type, user_type,
+                                                  is_active, is_completed FROM reminders_archive) r
+                                     WHERE id IN ({ids})""",
+    "analytics_audit_logs_after": """SELECT id, action_date, user_type, action FROM audit_logs
+                                     WHERE id > %s ORDER BY id""",
+
+    # Shard directory (home database)
+    "user_shards": "SELECT user_type, user_id, shard FROM user_directory WHERE username = %s",
+    "register_user": """INSERT INTO user_directory (username, user_type, user_id, shard) VALUES (%s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE user_id = VALUES(user_id), shard = VALUES(shard)""",
+    "patient_shard": "SELECT shard FROM shard_map WHERE patient_id = %s",
+    "shard_patient_counts": "SELECT shard, COUNT(*) FROM shard_map GROUP BY shard",
+    "allocate_patient": "INSERT INTO shard_map (shard) VALUES (%s)",
+    "map_patient": "INSERT IGNORE INTO shard_map (patient_id, shard) VALUES (%s, %s)",
+    "unmap_patient": "DELETE FROM shard_map WHERE patient_id = %s",
+    "directory_patients": "SELECT username, id FROM patients",
+    "directory_caregivers": "SELECT username, id FROM caregivers",
+    "directory_doctors": "SELECT username, id FROM doctors",
+}
+
+
+# Rows fetched per round trip by QueryRegistry.stream()
+STREAM_BATCH_SIZE = 500
+
+
+def id_bucket(count):
+    """Number of placeholders used for an IN list of count ids: the next power of two"""
+    return 1 << (count - 1).bit_length()
+
+
+class QueryRegistry:
+    """Runs named statements through server-side prepared cursors.
+
+    Each connection gets one prepared cursor per statement name, created on
+    first use and reused afterwards, so MySQL parses every statement once per
+    connection. Execution counts and cumulative time are kept per name.
+
+    Statements containing ``{ids}`` take a list of ids for an ``IN (...)``
+    clause. Lists are padded (repeating the last id) to the next power of
+    two, so a statement is prepared at most once per bucket size instead of
+    once per list length, which keeps the server's prepared statement count
+    small under bulk actions.
+
+    Connections of an attached ConnectionRouter run through its circuit
+    breaker: a dropped connection is reconnected (its cursors re-prepared)
+    and reads are retried once.
+    """
+
+    def __init__(self, statements=None):
+        self.statements = dict(STATEMENTS if statements is None else statements)
+        self._cursors = weakref.WeakKeyDictionary()
+        self._counts = {}
+        self._elapsed = {}
+        # Guards the registry's own bookkeeping
+        self._lock = threading.RLock()
+        # The UI and the reminder checker share a connection; serialize use of its cursors.
+        # Different connections (shards) can run in parallel.
+        self._connection_locks = weakref.WeakKeyDictionary()
+        self._routers = weakref.WeakKeyDictionary()
+
+    def _locked(self, connection):
+        with self._lock:
+            lock = self._connection_locks.get(connection)
+            if lock is None:
+                lock = threading.RLock()
+                self._connection_locks[connection] = lock
+            return lock
+
+    def attach(self, router):
+        """Route calls on the router's (current) connections through its reconnect/breaker logic,
+        and let the router run its own replication checks through this registry"""
+        with self._lock:
+            for connection in router.connections():
+                self._routers[connection] = router
+        router.queries = self
+
+    def _forget_cursors(self, connection):
+        """Drop a reconnected connection's cursors; their prepared statements died with the session"""
+        with self._lock:
+            cursors = self._cursors.pop(connection, {})
+        for cursor in cursors.values():
+            self._close_cursor(cursor)
+
+    def _call(self, connection, fn, idempotent):
+        with self._locked(connection):
+            with self._lock:
+                router = self._routers.get(connection)
+            if router is None:
+                return fn()
+            return router.call(connection, fn, idempotent, self._forget_cursors)
+
+    def register(self, name, sql):
+        """Add or replace a named statement (open cursors for it are dropped)"""
+        with self._lock:
+            self.statements[name] = sql
+            for cursors in self._cursors.values():
+                for key in [k for k in cursors if k == name or k.startswith(name + "[")]:
+                    self._close_cursor(cursors.pop(key))
+
+    def _cursor(self, connection, name):
+        with self._lock:
+            cursors = self._cursors.get(connection)
+            if cursors is None:
+                cursors = {}
+                self._cursors[connection] = cursors
+            cursor = cursors.get(name)
+        if cursor is None:
+            cursor = connection.cursor(prepared=True)
+            with self._lock:
+                cursors[name] = cursor
+        return cursor
+
+    def _run(self, connection, name, params, ids=None):
+        sql = self.statements[name]
+        key = name
+        if ids is not None:
+            if not ids:
+                raise ValueError(f"{name} needs at least one id")
+            before = sql[:sql.index("{ids}")].count("%s")
+            size = id_bucket(len(ids))
+            ids = list(ids) + [ids[-1]] * (size - len(ids))
+            sql = sql.format(ids=", ".join(["%s"] * size))
+            key = f"{name}[{size}]"
+            params = tuple(params[:before]) + tuple(ids) + tuple(params[before:])
+        cursor = self._cursor(connection, key)
+        start = time.perf_counter()
+        try:
+            cursor.execute(sql, tuple(params))
+        except Exception:
+            # A failed prepare/execute can leave the cursor unusable; rebuild it next time
+            with self._lock:
+                self._cursors[connection].pop(key, None)
+            self._close_cursor(cursor)
+            raise
+        finally:
+            with self._lock:
+                self._counts[name] = self._counts.get(name, 0) + 1
+                self._elapsed[name] = self._elapsed.get(name, 0.0) + (time.perf_counter() - start)
+        return cursor
+
+    def fetchall(self, connection, name, params=()):
+        """Execute a named query and return all rows"""
+        return self._call(connection, lambda: self._run(connection, name, params).fetchall(), True)
+
+    def stream(self, connection, name, params=(), record=None, batch_size=STREAM_BATCH_SIZE):
+        """Execute a named query and yield its rows batch by batch instead of materializing them all.
+
+        With record, each row is yielded as record(*row). The connection stays
+        locked while the generator is open; consume it promptly (or close it)
+        and do not run other statements on the connection from inside the loop.
+        """
+        with self._locked(connection):
+            cursor = self._call(connection, lambda: self._run(connection, name, params), True)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    for row in rows:
+                        yield row if record is None else record(*row)
+            finally:
+                # Abandoned early: read the rest so the connection can run the next statement
+                try:
+                    while cursor.fetchmany(batch_size):
+                        pass
+                except Exception:
+                    pass
+
+    def fetchone(self, connection, name, params=()):
+        """Execute a named query and return the first row (or None)"""
+        rows = self.fetchall(connection, name, params)
+        return rows[0] if rows else None
+
+    def fetchvalue(self, connection, name, params=(), default=None):
+        """Execute a named query and return the first column of the first row"""
+        row = self.fetchone(connection, name, params)
+        return row[0] if row else default
+
+    def execute(self, connection, name, params=()):
+        """Execute a named write statement and return the affected row count (no commit)"""
+        return self._call(connection, lambda: self._run(connection, name, params).rowcount, False)
+
+    def execute_in(self, connection, name, ids, params=()):
+        """Execute a named ``{ids}`` write statement for a list of ids and return the row count (no commit)"""
+        ids = list(ids)
+        return self._call(connection, lambda: self._run(connection, name, params, ids=ids).rowcount, False)
+
+    def fetchall_in(self, connection, name, ids, params=()):
+        """Execute a named ``{ids}`` query for a list of ids and return all rows"""
+        ids = list(ids)
+        return self._call(connection, lambda: self._run(connection, name, params, ids=ids).fetchall(), True)
+
+    def insert(self, connection, name, params=()):
+        """Execute a named INSERT and return the new row id (no commit)"""
+        return self._call(connection, lambda: self._run(connection, name, params).lastrowid, False)
+
+    def ping(self, connection):
+        """Liveness check; a dropped connection is reconnected on the way (raises when it cannot be)"""
+        self.fetchall(connection, "ping")
+
+    def stats(self):
+        """Per-statement execution counts and cumulative milliseconds"""
+        with self._lock:
+            return {
+                name: {"executions": count, "total_ms": round(self._elapsed.get(name, 0.0) * 1000, 3)}
+                for name, count in sorted(self._counts.items())
+            }
+
+    def close(self, connection):
+        """Close the prepared cursors held for a connection"""
+        with self._locked(connection):
+            with self._lock:
+                cursors = self._cursors.pop(connection, {})
+            for cursor in cursors.values():
+                self._close_cursor(cursor)
+
+    @staticmethod
+    def _close_cursor(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
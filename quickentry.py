@@ -0,0 +1,211 @@
+"""Quick-entry templates: each patient's most frequent entries, for autocomplete and one-tap logging"""
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from scheduler import time_of_day
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _key(entry_type, title):
+    return entry_type, " ".join(title.split()).casefold()
+
+
+class Template:
+    """One (entry_type, title) a patient logs repeatedly, with how often it was logged in each hour of the day"""
+    __slots__ = ('entry_type', 'title', 'count', 'hours')
+
+    def __init__(self, entry_type, title):
+        self.entry_type = entry_type
+        self.title = title
+        self.count = 0
+        # hour -> [entries, total seconds since midnight]
+        self.hours = {}
+
+    def add(self, hour, count, total_seconds):
+        slot = self.hours.setdefault(hour, [0, 0])
+        slot[0] += count
+        slot[1] += total_seconds
+        self.count += count
+
+    def typical_minute(self):
+        """Minute of the day it is usually logged: the average time within its busiest hour"""
+        count, total = max(self.hours.values())
+        return int(total / count) // 60
+
+    def typical_time(self):
+        minute = self.typical_minute()
+        return f"{minute // 60:02d}:{minute % 60:02d}"
+
+    def score(self, minute):
+        """Frequency, discounted by how far the typical time is from minute (two hours away halves it)"""
+        distance = abs(self.typical_minute() - minute)
+        distance = min(distance, MINUTES_PER_DAY - distance)
+        return self.count / (1 + distance / 120)
+
+    def __repr__(self):
+        return f"Template({self.entry_type!r}, {self.title!r}, count={self.count}, at={self.typical_time()})"
+
+
+class _Node:
+    __slots__ = ('children', 'keys')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = set()
+
+
+class PatientTemplates:
+    """All templates of one patient plus a prefix trie over every word of their titles"""
+
+    def __init__(self):
+        self.templates = {}
+        self.root = _Node()
+        self.loaded_at = time.monotonic()
+        self.since = None  # first entry_date the loaded counts cover
+
+    def add(self, entry_type, title, hour, count, total_seconds):
+        title = " ".join(title.split())
+        if not title:
+            return
+        key = _key(entry_type, title)
+        template = self.templates.get(key)
+        if template is None:
+            template = self.templates[key] = Template(entry_type, title)
+            self._index(key, title.casefold())
+        template.add(hour, count, total_seconds)
+
+    def remove(self, entry_type, title, hour, total_seconds):
+        """Take back one entry; a template whose count drops to zero leaves the trie"""
+        key = _key(entry_type, title)
+        template = self.templates.get(key)
+        if template is None or hour not in template.hours:
+            return
+        template.add(hour, -1, -total_seconds)
+        if template.hours[hour][0] <= 0:
+            del template.hours[hour]
+        if not template.hours:
+            del self.templates[key]
+            self._unindex(key, key[1])
+
+    def _suffixes(self, text):
+        # "Morning pills" is found by "mor" and by "pil"
+        words = text.split(" ")
+        return [" ".join(words[start:]) for start in range(len(words))]
+
+    def _index(self, key, text):
+        for suffix in self._suffixes(text):
+            node = self.root
+            for char in suffix:
+                node = node.children.setdefault(char, _Node())
+                node.keys.add(key)
+
+    def _unindex(self, key, text):
+        for suffix in self._suffixes(text):
+            node = self.root
+            for char in suffix:
+                child = node.children.get(char)
+                if child is None:
+                    break
+                child.keys.discard(key)
+                if not child.keys:
+                    del node.children[char]
+                    break
+                node = child
+
+    def complete(self, prefix):
+        """Templates with a title word starting with prefix (every template for an empty prefix)"""
+        node = self.root
+        for char in " ".join(prefix.split()).casefold():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if node is self.root:
+            return list(self.templates.values())
+        return [self.templates[key] for key in node.keys]
+
+
+class QuickEntryIndex:
+    """Per-patient top-K entry templates, built from one grouped query and kept current by record().
+
+    The first show_entries for a patient reads its last history_days of entries
+    grouped by type, title and hour; after that suggestions and autocomplete
+    are answered from memory, so typing runs no queries. Saves made in this
+    process call record(); entries written by other instances show up when the
+    patient's templates are reloaded after refresh_seconds. At most
+    max_patients patients are kept (least recently used first out).
+    """
+
+    def __init__(self, queries, history_days=180, max_patients=256, refresh_seconds=3600.0):
+        self.queries = queries
+        self.history_days = history_days
+        self.max_patients = max_patients
+        self.refresh_seconds = refresh_seconds
+        self._patients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def templates(self, connection, patient_id):
+        """The patient's PatientTemplates, loading them on first use or once they are stale"""
+        with self._lock:
+            patient = self._patients.get(patient_id)
+            if patient is not None and time.monotonic() - patient.loaded_at < self.refresh_seconds:
+                self._patients.move_to_end(patient_id)
+                return patient
+        patient = PatientTemplates()
+        since = patient.since = date.today() - timedelta(days=self.history_days)
+        for entry_type, title, hour, count, total_seconds in self.queries.fetchall(
+                connection, "entry_templates", (patient_id, since)):
+            patient.add(entry_type, title, int(hour), int(count), int(total_seconds))
+        with self._lock:
+            self._patients[patient_id] = patient
+            self._patients.move_to_end(patient_id)
+            while len(self._patients) > self.max_patients:
+                self._patients.popitem(last=False)
+        return patient
+
+    def suggest(self, connection, patient_id, k=8, prefix="", entry_types=None, now=None):
+        """The k best templates for prefix, ranked by frequency near the current time of day"""
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        patient = self.templates(connection, patient_id)
+        with self._lock:
+            candidates = [template for template in patient.complete(prefix)
+                          if entry_types is None or template.entry_type in entry_types]
+            return heapq.nlargest(k, candidates, key=lambda template: (template.score(minute), template.count))
+
+    def record(self, patient_id, entry_type, title, at):
+        """Count a newly saved entry (at: its 'HH:MM' time) if the patient's templates are loaded"""
+        seconds = self._seconds(at)
+        if seconds is None:
+            return
+        with self._lock:
+            patient = self._patients.get(patient_id)
+            if patient is not None:
+                patient.add(entry_type, title, seconds // 3600, 1, seconds)
+
+    def forget(self, patient_id, entry_type, title, entry_date, at):
+        """Uncount a deleted entry if the patient's loaded templates include it"""
+        seconds = self._seconds(at)
+        if seconds is None:
+            return
+        with self._lock:
+            patient = self._patients.get(patient_id)
+            if patient is not None and (patient.since is None or entry_date >= patient.since):
+                patient.remove(entry_type, " ".join(title.split()), seconds // 3600, seconds)
+
+    @staticmethod
+    def _seconds(at):
+        try:
+            return int(time_of_day(at).total_seconds()) % (24 * 3600)
+        except ValueError:  # free-form time MySQL accepted but that is not HH:MM
+            return None
+
+    def invalidate(self, patient_id=None):
+        with self._lock:
+            if patient_id is None:
+                self._patients.clear()
+            else:
+                self._patients.pop(patient_id, None)
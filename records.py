@@ -0,0 +1,64 @@
+"""Row models: one small slotted class per kind of row the screens display.
+
+Each class lists its fields in the column order of the queries that produce
+it, so a row becomes a record with Model(*row). Trailing fields that a query
+does not select are None. __slots__ keeps an instance to a fixed-size block
+of references (no per-row __dict__), which matters for long lists and exports.
+"""
+
+
+class Record:
+    __slots__ = ()
+
+    def __init__(self, *values):
+        if len(values) > len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} takes at most {len(self.__slots__)} values, got {len(values)}")
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for name in self.__slots__[len(values):]:
+            setattr(self, name, None)
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.astuple() == self.astuple()
+
+    def __hash__(self):
+        return hash(self.astuple())
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Patient(Record):
+    """patient_for_caregiver and directory rows; list_patients adds username and created_at"""
+    __slots__ = ('id', 'full_name', 'age', 'diagnosis', 'stage', 'emergency_contact', 'username', 'created_at')
+
+
+class Caregiver(Record):
+    """list_caregivers rows"""
+    __slots__ = ('id', 'full_name', 'phone', 'relationship', 'patient_id', 'username', 'created_at')
+
+
+class Doctor(Record):
+    """list_doctors rows"""
+    __slots__ = ('id', 'full_name', 'specialization', 'license_number', 'hospital', 'username', 'created_at')
+
+
+class Entry(Record):
+    """recent_entries*, entries_for_patient* and entries_by_ids rows (description truncated to 100 characters)"""
+    __slots__ = ('id', 'entry_type', 'title', 'description', 'description_length', 'entry_date', 'entry_time',
+                 'user_type', 'patient_id')
+
+
+class Reminder(Record):
+    """reminders_for_*_between and overdue_reminders_for_* rows; reminders_by_ids adds the last three"""
+    __slots__ = ('id', 'title', 'description', 'description_length', 'reminder_date', 'reminder_time',
+                 'reminder_type', 'is_completed', 'is_active', 'user_type', 'user_id')
+
+
+class AuditEvent(Record):
+    """recent_audit_logs rows"""
+    __slots__ = ('action_date', 'user_type', 'user_id', 'action', 'details')
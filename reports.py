@@ -0,0 +1,342 @@
+"""Daily, weekly and monthly patient reports rendered to static HTML/PDF and cached on disk"""
+import html
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas as pdf_canvas
+except ImportError:  # PDF output is optional
+    pdf_canvas = None
+
+import config
+
+PERIODS = ('daily', 'weekly', 'monthly')
+PERIOD_DAYS = {'daily': 0, 'weekly': 7, 'monthly': 30}
+PERIOD_LABELS = {'daily': "Daily", 'weekly': "Weekly", 'monthly': "Monthly"}
+FORMATS = ('html', 'pdf')
+
+TYPE_COLORS = {
+    'meal': '#10b981', 'medication': '#3b82f6', 'appointment': '#8b5cf6',
+    'social': '#f59e0b', 'note': '#64748b', 'activity': '#ec4899',
+    'observation': '#06b6d4'
+}
+
+
+def period_window(period, end_date):
+    """First and last day covered by a report ending on end_date"""
+    return end_date - timedelta(days=PERIOD_DAYS[period]), end_date
+
+
+def summary_text(results, total, period):
+    """Generate AI-like summary text"""
+    period_text = {"daily": "today", "weekly": "this week", "monthly": "this month"}[period]
+
+    summary = f"You had {total} activities logged {period_text}. "
+
+    if results:
+        type_dict = {entry_type: count for entry_type, count in results}
+
+        if 'medication' in type_dict:
+            summary += f"Great job tracking {type_dict['medication']} medication entries! "
+
+        if 'social' in type_dict:
+            summary += f"You engaged in {type_dict['social']} social activities, which is excellent for cognitive health. "
+
+        if 'activity' in type_dict or 'meal' in type_dict:
+            summary += "Maintaining daily routines is important for memory care. "
+
+        if 'observation' in type_dict:
+            summary += f"Caregivers logged {type_dict['observation']} observations, showing active monitoring. "
+
+        summary += "Keep up the consistent logging!"
+    else:
+        summary = f"No activities were logged {period_text}. Try to log daily activities to track progress."
+
+    return summary
+
+
+def _counts(entries):
+    counts = {}
+    for entry in entries:
+        counts[entry['entry_type']] = counts.get(entry['entry_type'], 0) + 1
+    return sorted(counts.items())
+
+
+def render_html(payload):
+    """Render a report payload to a standalone HTML document"""
+    patient = payload['patient']
+    counts = _counts(payload['entries'])
+    total = len(payload['entries'])
+    esc = html.escape
+
+    cards = [f'<div class="card" style="background:#3b82f6"><b>{total}</b>Total Entries</div>']
+    for entry_type, count in counts:
+        color = TYPE_COLORS.get(entry_type, '#64748b')
+        cards.append(f'<div class="card" style="background:{color}"><b>{count}</b>{esc(entry_type.capitalize())}</div>')
+
+    rows = []
+    for entry in payload['entries']:
+        rows.append(
+            f"<tr><td>{esc(entry['entry_date'])}</td><td>{esc(entry['entry_time'])}</td>"
+            f"<td>{esc(entry['entry_type'])}</td><td>{esc(entry['title'])}</td>"
+            f"<td>{esc(entry['description'] or '')}</td></tr>"
+        )
+    table = (
+        "<table><tr><th>Date</th><th>Time</th><th>Type</th><th>Title</th><th>Description</th></tr>"
+        + "".join(rows) + "</table>"
+    ) if rows else "<p>No entries found for this period</p>"
+
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<title>{esc(patient['full_name'])} - {PERIOD_LABELS[payload['period']]} report</title>
+<style>
+body {{ font-family: Arial, sans-serif; background: #f0f4f8; color: #1e293b; margin: 30px; }}
+h1 {{ color: #2563eb; }}
+.meta {{ color: #64748b; }}
+.card {{ display: inline-block; color: white; padding: 15px 25px; margin: 5px; text-align: center; }}
+.card b {{ display: block; font-size: 28px; }}
+.summary {{ background: #eff6ff; color: #1e40af; padding: 15px; margin: 20px 0; }}
+table {{ border-collapse: collapse; width: 100%; background: white; }}
+th, td {{ border: 1px solid #e2e8f0; padding: 6px 10px; text-align: left; vertical-align: top; }}
+th {{ background: #f1f5f9; }}
+</style></head><body>
+<h1>{esc(patient['full_name'])}</h1>
+<p class="meta">Age: {esc(str(patient['age']))} &nbsp; Diagnosis: {esc(str(patient['diagnosis']))} &nbsp; Stage: {esc(str(patient['stage']))}</p>
+<h2>{PERIOD_LABELS[payload['period']]} report: {esc(payload['start'])} to {esc(payload['end'])}</h2>
+<div>{''.join(cards)}</div>
+<div class="summary">{esc(summary_text(counts, total, payload['period']))}</div>
+{table}
+<p class="meta">Generated {esc(payload['generated_at'])}</p>
+</body></html>
+"""
+
+
+def render_pdf(payload, path):
+    """Render a report payload to a simple one-column PDF (needs reportlab)"""
+    if pdf_canvas is None:
+        raise RuntimeError("PDF reports need the reportlab package (pip install reportlab)")
+    patient = payload['patient']
+    counts = _counts(payload['entries'])
+    total = len(payload['entries'])
+
+    pdf = pdf_canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    y = height - 50
+
+    def line(text, size=10, gap=14):
+        nonlocal y
+        if y < 50:
+            pdf.showPage()
+            y = height - 50
+        pdf.setFont("Helvetica", size)
+        pdf.drawString(40, y, text[:110])
+        y -= gap
+
+    line(patient['full_name'], 18, 24)
+    line(f"Age: {patient['age']}   Diagnosis: {patient['diagnosis']}   Stage: {patient['stage']}")
+    line(f"{PERIOD_LABELS[payload['period']]} report: {payload['start']} to {payload['end']}", 12, 20)
+    line(f"Total entries: {total}   " + "   ".join(f"{t}: {c}" for t, c in counts))
+    line(summary_text(counts, total, payload['period']), 9, 20)
+    for entry in payload['entries']:
+        line(f"{entry['entry_date']} {entry['entry_time']}  [{entry['entry_type']}]  {entry['title']}")
+        if entry['description']:
+            line(f"    {entry['description']}", 9)
+    pdf.save()
+
+
+def render_report(payload, fmt, path):
+    """Process-pool worker: render one report and write it to path"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    if fmt == 'pdf':
+        render_pdf(payload, tmp_path)
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(render_html(payload))
+    os.replace(tmp_path, path)
+    return path
+
+
+class ReportGenerator:
+    """Renders patient reports in a process pool and caches them by (patient, period, end date).
+
+    A cached report stays valid until the entries in its window change. Each
+    report records its window's fingerprint: entry count, max id and the last
+    change_log id of those entries, so inserts, deletes and edits made by any
+    instance all change it, while writes outside the window (other dates,
+    reminders, consent) leave it alone. get() checks it with one query; local
+    writes also call invalidate(), and refresh() compares the fingerprints of
+    all patients using one grouped query per period.
+    get_connection(patient_id) returns a read connection for that patient's
+    data; get_connections() one read connection per shard (by default just
+    get_connection()), which refresh() visits in turn.
+    """
+
+    def __init__(self, get_connection, queries, output_dir=None, max_workers=None, get_connections=None):
+        self.get_connection = get_connection
+        self.get_connections = get_connections or (lambda: [get_connection()])
+        self.queries = queries
+        self.output_dir = output_dir or config.REPORTS_DIR
+        self.max_workers = max_workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # v2: fingerprints include the last change_log id (manifest.json held the patient version)
+        self._manifest_path = os.path.join(self.output_dir, "manifest-v2.json")
+        self._manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self._manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    @staticmethod
+    def _key(patient_id, period, end_date, fmt):
+        return f"{patient_id}:{period}:{end_date.isoformat()}:{fmt}"
+
+    def report_path(self, patient_id, period, end_date, fmt='html'):
+        return os.path.join(self.output_dir, str(patient_id), f"{period}-{end_date.isoformat()}.{fmt}")
+
+    def get(self, patient_id, period, end_date=None, fmt='html'):
+        """Path of a cached, still-valid report, or None if it must be (re)generated"""
+        end_date = end_date or date.today()
+        path = self.report_path(patient_id, period, end_date, fmt)
+        with self._lock:
+            cached = self._manifest.get(self._key(patient_id, period, end_date, fmt))
+        if not cached or not os.path.exists(path):
+            return None
+        fingerprint = self._fingerprint(self.get_connection(patient_id), patient_id, period, end_date)
+        return path if cached == fingerprint else None
+
+    def invalidate(self, patient_id, entry_date):
+        """Drop cached reports of a patient whose window contains entry_date"""
+        if isinstance(entry_date, str):
+            entry_date = datetime.strptime(entry_date, '%Y-%m-%d').date()
+        prefix = f"{patient_id}:"
+        with self._lock:
+            stale = []
+            for key in self._manifest:
+                if not key.startswith(prefix):
+                    continue
+                _, period, end_text, _ = key.split(":")
+                start, end = period_window(period, date.fromisoformat(end_text))
+                if start <= entry_date <= end:
+                    stale.append(key)
+            for key in stale:
+                del self._manifest[key]
+            if stale:
+                self._save_manifest()
+
+    def _pool_executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn, not fork: the parent runs Tk and background threads
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _fetch_payload(self, patient_id, period, end_date):
+        connection = self.get_connection(patient_id)
+        start, end = period_window(period, end_date)
+        patient = self.queries.fetchone(connection, "report_patient", (patient_id,))
+        rows = self.queries.fetchall(connection, "report_entries", (patient_id, start, end))
+        full_name, age, diagnosis, stage = patient if patient else (f"Patient #{patient_id}", "", "", "")
+        return {
+            'patient': {'id': patient_id, 'full_name': full_name, 'age': age, 'diagnosis': diagnosis, 'stage': stage},
+            'period': period,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M'),
+            'entries': [
+                {'entry_date': str(d), 'entry_time': str(t), 'entry_type': et, 'title': title, 'description': desc}
+                for d, t, et, title, desc in rows
+            ],
+        }
+
+    def _fingerprint(self, connection, patient_id, period, end_date):
+        start, end = period_window(period, end_date)
+        row = self.queries.fetchone(connection, "report_fingerprint", (patient_id, start, end))
+        return [int(value) for value in row] if row else [0, 0, 0]
+
+    def _fingerprints(self, connection, period, end_date):
+        start, end = period_window(period, end_date)
+        rows = self.queries.fetchall(connection, "report_fingerprints", (start, end))
+        return {patient_id: [int(count), int(max_id), int(last_change)]
+                for patient_id, count, max_id, last_change in rows}
+
+    def _submit(self, patient_id, period, end_date, fmt, fingerprint):
+        """Render one report in the pool; fingerprint is the [count, max id, last change] the manifest records"""
+        payload = self._fetch_payload(patient_id, period, end_date)
+        path = self.report_path(patient_id, period, end_date, fmt)
+        future = self._pool_executor().submit(render_report, payload, fmt, path)
+        key = self._key(patient_id, period, end_date, fmt)
+
+        def done(f):
+            if f.exception() is None:
+                with self._lock:
+                    self._manifest[key] = fingerprint
+                    self._save_manifest()
+
+        future.add_done_callback(done)
+        return future
+
+    def generate(self, patient_id, period, end_date=None, fmt='html'):
+        """Render one report now (in the pool) and return its path"""
+        end_date = end_date or date.today()
+        # Read the fingerprint first: a change landing during rendering then leaves the report stale, not wrong
+        fingerprint = self._fingerprint(self.get_connection(patient_id), patient_id, period, end_date)
+        future = self._submit(patient_id, period, end_date, fmt, fingerprint)
+        path = future.result()
+        # The manifest callback may run on another thread; record it here as well
+        with self._lock:
+            self._manifest[self._key(patient_id, period, end_date, fmt)] = fingerprint
+            self._save_manifest()
+        return path
+
+    def get_or_generate(self, patient_id, period, end_date=None, fmt='html'):
+        return self.get(patient_id, period, end_date, fmt) or self.generate(patient_id, period, end_date, fmt)
+
+    def refresh(self, patient_ids=None, periods=PERIODS, end_date=None, fmt='html'):
+        """Re-render every report whose entries changed since it was cached; returns the futures.
+
+        Each shard is read with one query per period for the patients it holds.
+        """
+        end_date = end_date or date.today()
+        wanted = None if patient_ids is None else set(patient_ids)
+        futures = []
+        for connection in self.get_connections():
+            shard_patients = [row[0] for row in self.queries.fetchall(connection, "all_patient_ids")
+                              if wanted is None or row[0] in wanted]
+            if not shard_patients:
+                continue
+            for period in periods:
+                fingerprints = self._fingerprints(connection, period, end_date)
+                for patient_id in shard_patients:
+                    fingerprint = fingerprints.get(patient_id, [0, 0, 0])
+                    key = self._key(patient_id, period, end_date, fmt)
+                    path = self.report_path(patient_id, period, end_date, fmt)
+                    with self._lock:
+                        fresh = self._manifest.get(key) == fingerprint and os.path.exists(path)
+                    if not fresh:
+                        futures.append(self._submit(patient_id, period, end_date, fmt, fingerprint))
+        return futures
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
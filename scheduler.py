@@ -0,0 +1,99 @@
+"""Due-reminder scheduling, with the clock passed in so schedules can be replayed faster than real time"""
+import time
+from datetime import datetime, timedelta
+
+MIDNIGHT = datetime.min.time()
+END_OF_DAY = timedelta(days=1)
+
+
+def time_of_day(value):
+    """A reminder_time as a timedelta since midnight (MySQL TIME arrives as a timedelta, text as 'HH:MM[:SS]')"""
+    if isinstance(value, timedelta):
+        return value
+    hours, minutes, *seconds = (int(part) for part in str(value).split(":"))
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds[0] if seconds else 0)
+
+
+def time_label(value):
+    """HH:MM of a reminder_time"""
+    minutes = int(time_of_day(value).total_seconds()) // 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class SystemClock:
+    """Real time: what the app uses"""
+
+    def now(self):
+        return datetime.now()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """Virtual time that only moves when sleep() or advance() is called, so weeks replay in seconds"""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+    advance = sleep
+
+
+class ReminderScheduler:
+    """Finds the reminders that fell due since the previous check and hands them to deliver().
+
+    Each check covers the window (previous check, now], so every occurrence is
+    delivered exactly once however late, early or often the checks run; a
+    failed check leaves its window to the next one. fetch_due(day, after, until)
+    returns due_reminders_between rows for one date and a time-of-day range
+    (after exclusive, until inclusive, both timedeltas). deliver(due, day)
+    receives (id, user_type, user_id, title, 'HH:MM') tuples and the ISO date.
+    """
+
+    def __init__(self, fetch_due, deliver, clock=None, interval=30.0):
+        self.fetch_due = fetch_due
+        self.deliver = deliver
+        self.clock = clock or SystemClock()
+        self.interval = interval
+        self.last_check = None
+
+    def check(self):
+        """Deliver everything due since the last check; returns the number of reminders delivered"""
+        now = self.clock.now()
+        if self.last_check is None:
+            # The first check also covers the current minute, as the old per-minute match did
+            self.last_check = now.replace(second=0, microsecond=0) - timedelta(microseconds=1)
+        start = self.last_check
+        delivered = 0
+        day = start.date()
+        while day <= now.date():
+            midnight = datetime.combine(day, MIDNIGHT)
+            after = start - midnight if start >= midnight else -END_OF_DAY
+            until = min(now - midnight, END_OF_DAY)
+            due = [(rid, user_type, user_id, title, time_label(reminder_time))
+                   for rid, user_type, user_id, _, title, _, reminder_time in self.fetch_due(day, after, until)]
+            if due:
+                self.deliver(due, day.isoformat())
+                delivered += len(due)
+            day += timedelta(days=1)
+            # Days already delivered are not repeated if a later day's query fails
+            self.last_check = min(now, datetime.combine(day, MIDNIGHT) - timedelta(microseconds=1))
+        return delivered
+
+    def run(self, running, on_error=None):
+        """Check every interval seconds while running() is true (scheduler thread)"""
+        while running():
+            try:
+                self.check()
+            except Exception as e:
+                if on_error is None:
+                    print("Reminder scheduler error:", e)
+                else:
+                    on_error(e)
+            self.clock.sleep(self.interval)
@@ -0,0 +1,405 @@
+"""Schema definition, version tracking and sample data for Memory Companion"""
+from datetime import datetime
+
+from mysql.connector import Error, errorcode
+
+from connections import UnitOfWork
+
+
+# Bump SCHEMA_VERSION whenever TABLES or MIGRATIONS change. Startup only runs
+# DDL when the version stored in the database is behind this number.
+SCHEMA_VERSION = 12
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS patients (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(100) UNIQUE NOT NULL,
+        password VARCHAR(100) NOT NULL,
+        full_name VARCHAR(255) NOT NULL,
+        age INT,
+        diagnosis VARCHAR(100),
+        stage VARCHAR(50),
+        emergency_contact VARCHAR(255),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS caregivers (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(100) UNIQUE NOT NULL,
+        password VARCHAR(100) NOT NULL,
+        full_name VARCHAR(255) NOT NULL,
+        phone VARCHAR(50),
+        relationship VARCHAR(100),
+        patient_id INT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (patient_id) REFERENCES patients(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS doctors (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(100) UNIQUE NOT NULL,
+        password VARCHAR(100) NOT NULL,
+        full_name VARCHAR(255) NOT NULL,
+        specialization VARCHAR(100),
+        license_number VARCHAR(100),
+        hospital VARCHAR(255),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_type ENUM('patient', 'caregiver', 'doctor') NOT NULL,
+        user_id INT NOT NULL,
+        patient_id INT,
+        entry_type ENUM('meal', 'medication', 'appointment', 'social', 'note', 'activity', 'observation') NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        entry_date DATE NOT NULL,
+        entry_time TIME NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (patient_id) REFERENCES patients(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reminders (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_type ENUM('patient', 'caregiver', 'doctor') NOT NULL,
+        user_id INT NOT NULL,
+        patient_id INT,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        reminder_date DATE NOT NULL,
+        reminder_time TIME NOT NULL,
+        reminder_type ENUM('medication', 'appointment', 'event', 'other') NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        is_completed BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (patient_id) REFERENCES patients(id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS consent_logs (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        patient_id INT NOT NULL,
+        consent_type VARCHAR(100) NOT NULL,
+        consent_given BOOLEAN NOT NULL,
+        consent_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (patient_id) REFERENCES patients(id),
+        INDEX idx_consent_latest (patient_id, consent_type, consent_date, id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS audit_logs (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_type ENUM('patient', 'caregiver', 'doctor') NOT NULL,
+        user_id INT NOT NULL,
+        action VARCHAR(255) NOT NULL,
+        details TEXT,
+        action_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # v2: change feed — one version row per patient plus the rows each version touched
+    """
+    CREATE TABLE IF NOT EXISTS patient_versions (
+        patient_id INT PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS change_log (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        patient_id INT NOT NULL,
+        version BIGINT NOT NULL,
+        table_name ENUM('entries', 'reminders', 'consent_logs') NOT NULL,
+        row_id INT NOT NULL,
+        operation ENUM('insert', 'update', 'delete') NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_change_log_patient_version (patient_id, version),
+        INDEX idx_change_log_changed_at (changed_at),
+        INDEX idx_change_log_row (table_name, row_id, id)
+    )
+    """,
+    # v4: shard directory — only used on the home database when sharding is configured
+    """
+    CREATE TABLE IF NOT EXISTS shard_map (
+        patient_id INT AUTO_INCREMENT PRIMARY KEY,
+        shard INT NOT NULL,
+        INDEX idx_shard_map_shard (shard)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_directory (
+        username VARCHAR(100) NOT NULL,
+        user_type ENUM('patient', 'caregiver', 'doctor') NOT NULL,
+        user_id INT NOT NULL,
+        shard INT NOT NULL,
+        PRIMARY KEY (username, user_type)
+    )
+    """,
+    # v5: photos and voice notes — the files live in the attachment store, rows hold their SHA-256
+    """
+    CREATE TABLE IF NOT EXISTS attachments (
+        sha256 CHAR(64) PRIMARY KEY,
+        size BIGINT NOT NULL,
+        mime VARCHAR(100),
+        kind ENUM('photo', 'voice') NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS entry_attachments (
+        entry_id INT NOT NULL,
+        sha256 CHAR(64) NOT NULL,
+        original_name VARCHAR(255),
+        PRIMARY KEY (entry_id, sha256),
+        INDEX idx_entry_attachments_sha256 (sha256),
+        FOREIGN KEY (entry_id) REFERENCES entries(id) ON DELETE CASCADE,
+        FOREIGN KEY (sha256) REFERENCES attachments(sha256)
+    )
+    """,
+    # v6: per-day entry counts, rebuilt by `memory_companion_cli.py rollup rebuild`
+    """
+    CREATE TABLE IF NOT EXISTS daily_rollups (
+        patient_id INT NOT NULL,
+        rollup_date DATE NOT NULL,
+        entry_type VARCHAR(20) NOT NULL,
+        entry_count INT NOT NULL,
+        rebuilt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (patient_id, rollup_date, entry_type),
+        INDEX idx_daily_rollups_date (rollup_date)
+    )
+    """,
+    # v10: each day a rollup rebuild covered, so readers only trust days that were actually rebuilt
+    """
+    CREATE TABLE IF NOT EXISTS rollup_days (
+        rollup_date DATE PRIMARY KEY,
+        rebuilt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # v8: completed and deleted reminders past the retention age, moved out of reminders (same ids)
+    """
+    CREATE TABLE IF NOT EXISTS reminders_archive (
+        id INT PRIMARY KEY,
+        user_type ENUM('patient', 'caregiver', 'doctor') NOT NULL,
+        user_id INT NOT NULL,
+        patient_id INT,
+        title VARCHAR(255) NOT NULL,
+        description TEXT,
+        reminder_date DATE NOT NULL,
+        reminder_time TIME NOT NULL,
+        reminder_type ENUM('medication', 'appointment', 'event', 'other') NOT NULL,
+        is_active BOOLEAN NOT NULL,
+        is_completed BOOLEAN NOT NULL,
+        created_at TIMESTAMP NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_reminders_archive_patient (patient_id, reminder_date)
+    )
+    """,
+]
+
+# Statements that alter existing tables, keyed by the version that introduced them.
+# They may be re-applied on a partially migrated database, so "already exists"
+# errors are ignored.
+MIGRATIONS = {
+    # v3: patient directory — prefix search and keyset pagination by name, filters by diagnosis/stage
+    3: [
+        "ALTER TABLE patients ADD INDEX idx_patients_name (full_name)",
+        "ALTER TABLE patients ADD INDEX idx_patients_diagnosis (diagnosis, full_name)",
+        "ALTER TABLE patients ADD INDEX idx_patients_stage (stage, full_name)",
+    ],
+    # v7: consent grants/revocations travel through the change feed
+    7: [
+        "ALTER TABLE change_log MODIFY table_name ENUM('entries', 'reminders', 'consent_logs') NOT NULL",
+    ],
+    # v8: the reminder screen loads a date window; the scheduler, escalation and archival scan by date
+    8: [
+        "ALTER TABLE reminders ADD INDEX idx_reminders_patient_date (patient_id, reminder_date, reminder_time)",
+        "ALTER TABLE reminders ADD INDEX idx_reminders_user_date (user_type, user_id, reminder_date, reminder_time)",
+        "ALTER TABLE reminders ADD INDEX idx_reminders_date (reminder_date, reminder_time)",
+    ],
+    # v9: change_log rows older than the retention period are purged by age
+    9: [
+        "ALTER TABLE change_log ADD INDEX idx_change_log_changed_at (changed_at)",
+    ],
+    # v11: report fingerprints look up the last change of each entry in their window
+    11: [
+        "ALTER TABLE change_log ADD INDEX idx_change_log_row (table_name, row_id, id)",
+    ],
+    # v12: the doctor's directory filters each page by the patient's latest consent choice
+    12: [
+        "ALTER TABLE consent_logs ADD INDEX idx_consent_latest (patient_id, consent_type, consent_date, id)",
+    ],
+}
+
+_IGNORED_ERRORS = (
+    errorcode.ER_TABLE_EXISTS_ERROR,
+    errorcode.ER_DUP_KEYNAME,
+    errorcode.ER_DUP_FIELDNAME,
+)
+
+_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        id TINYINT PRIMARY KEY,
+        version INT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+
+def stored_version(connection):
+    """Return the schema version recorded in the database (0 if never recorded)"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT version FROM schema_version WHERE id = 1")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    except Error as e:
+        if e.errno == errorcode.ER_NO_SUCH_TABLE:
+            return 0
+        raise
+    finally:
+        cursor.close()
+
+
+def _apply(cursor, statement):
+    try:
+        cursor.execute(statement)
+    except Error as e:
+        if e.errno not in _IGNORED_ERRORS:
+            raise
+
+
+def ensure_schema(connection):
+    """Bring the schema up to SCHEMA_VERSION; returns True if any DDL ran"""
+    current = stored_version(connection)
+    if current >= SCHEMA_VERSION:
+        return False
+
+    cursor = connection.cursor()
+    try:
+        for ddl in TABLES:
+            cursor.execute(ddl)
+        for version in range(current + 1, SCHEMA_VERSION + 1):
+            for statement in MIGRATIONS.get(version, ()):
+                _apply(cursor, statement)
+        cursor.execute(_VERSION_TABLE)
+        cursor.execute(
+            """INSERT INTO schema_version (id, version) VALUES (1, %s)
+               ON DUPLICATE KEY UPDATE version = VALUES(version)""",
+            (SCHEMA_VERSION,)
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+    return True
+
+
+def seed_sample_data(connection):
+    """Create sample patients, caregivers, doctors — only 2 entries each — and shared appointment/reminder
+
+    Does nothing when patients already exist. Returns True if data was inserted.
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM patients")
+    if cursor.fetchone()[0] > 0:
+        cursor.close()
+        return False
+
+    # Everything below is one unit of work: a failure leaves no half-seeded database
+    try:
+        with UnitOfWork(connection):
+            # --- Patients (2 entries) ---
+            patients = [
+                ('ram_kumar', 'patient123', 'Ram Kumar', 72, "Alzheimer's Disease", 'Early Stage', '+91-9876543210'),
+                ('meena_rao', 'patient456', 'Meena Rao', 68, "Vascular Dementia", 'Moderate Stage', '+91-9123456789')
+            ]
+            patient_ids = []
+            for username, password, full_name, age, diagnosis, stage, emergency in patients:
+                cursor.execute(
+                    """INSERT INTO patients (username, password, full_name, age, diagnosis, stage, emergency_contact)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+                    (username, password, full_name, age, diagnosis, stage, emergency)
+                )
+                patient_ids.append(cursor.lastrowid)
+            ram_id, meena_id = patient_ids
+
+            # --- Caregivers (2 entries) ---
+            caregivers = [
+                ('sita_k', 'care123', 'Sita Kumar', '+91-9876501234', 'Wife', ram_id),
+                ('raj_r', 'care456', 'Raj Rao', '+91-9123409876', 'Son', meena_id)
+            ]
+            caregiver_ids = []
+            for username, password, full_name, phone, relationship, patient_id in caregivers:
+                cursor.execute(
+                    """INSERT INTO caregivers (username, password, full_name, phone, relationship, patient_id)
+                       VALUES (%s, %s, %s, %s, %s, %s)""",
+                    (username, password, full_name, phone, relationship, patient_id)
+                )
+                caregiver_ids.append(cursor.lastrowid)
+            # ram's caregiver
+            sita_id = caregiver_ids[0]
+
+            # --- Doctors (2 entries) ---
+            doctors = [
+                ('dr_sharma', 'doc123', 'Dr. A.K. Sharma', 'Neurology', 'MD-IN-12345', 'AIIMS Delhi'),
+                ('dr_reddy', 'doc456', 'Dr. Priya Reddy', 'Psychiatry', 'MD-IN-67890', 'Apollo Chennai')
+            ]
+            doctor_ids = []
+            for username, password, full_name, spec, license_no, hospital in doctors:
+                cursor.execute(
+                    """INSERT INTO doctors (username, password, full_name, specialization, license_number, hospital)
+                       VALUES (%s, %s, %s, %s, %s, %s)""",
+                    (username, password, full_name, spec, license_no, hospital)
+                )
+                doctor_ids.append(cursor.lastrowid)
+            # dr_sharma, to link appointment/reminder
+            dr_sharma_id = doctor_ids[0]
+
+            # --- Create a shared appointment entry and a shared reminder so it appears for patient, caregiver, doctor ---
+            today = (datetime.now()).strftime('%Y-%m-%d')
+
+            # Insert appointment entry (as doctor) only if not existing
+            cursor.execute("""
+                SELECT COUNT(*) FROM entries
+                WHERE user_type='doctor' AND user_id=%s AND patient_id=%s AND entry_type='appointment' AND title=%s AND entry_date=%s
+            """, (dr_sharma_id, ram_id, 'Follow-up with Dr. Sharma', today))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(
+                    """INSERT INTO entries (user_type, user_id, patient_id, entry_type, title, description, entry_date, entry_time)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+                    ('doctor', dr_sharma_id, ram_id, 'appointment', 'Follow-up with Dr. Sharma',
+                     'Routine Alzheimer review and medication check', today, '10:00:00')
+                )
+
+            # Add corresponding reminders for patient, caregiver, and doctor — only if not present
+            shared_title = 'Doctor Appointment'
+            shared_desc = 'Follow-up with Dr. Sharma at 10:00 AM'
+            shared_time = '10:00:00'
+
+            roles_and_uids = [
+                ('patient', ram_id),
+                ('caregiver', sita_id if sita_id else 1),
+                ('doctor', dr_sharma_id)
+            ]
+
+            for role, uid in roles_and_uids:
+                # uid might be None — skip if no uid
+                if uid is None:
+                    continue
+                cursor.execute("""
+                    SELECT COUNT(*) FROM reminders
+                    WHERE user_type=%s AND user_id=%s AND patient_id=%s AND title=%s AND reminder_date=%s AND reminder_time=%s
+                """, (role, uid, ram_id, shared_title, today, shared_time))
+                if cursor.fetchone()[0] == 0:
+                    cursor.execute("""INSERT INTO reminders (user_type, user_id, patient_id, title, description, reminder_date, reminder_time, reminder_type)
+                                      VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+                                   (role, uid, ram_id, shared_title, shared_desc, today, shared_time, 'appointment'))
+    finally:
+        cursor.close()
+    print("✓ Sample data (2 each) created with shared appointment & reminders")
+    return True
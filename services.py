@@ -0,0 +1,293 @@
+"""Process-wide services shared by every open session: connections, caches and background threads"""
+import threading
+import time
+
+from mysql.connector import Error
+
+import archive
+import attachments
+import changefeed
+import config
+import consent
+import directory
+import escalation
+import quickentry
+import reports
+import scheduler
+import schema
+import shards
+import statcache
+from connections import CircuitOpenError, ConnectionRouter
+from queries import QueryRegistry
+
+
+class Services:
+    """Connections, prepared statements, caches and background threads, created once per process.
+
+    A normal window owns one Services; kiosk mode shares one between all its
+    session windows, so an extra session only adds its widgets and a few dicts.
+    Sessions register with add_session() and are called back on their own Tk
+    thread (through root.after) with set_connection_status, show_degraded_banner,
+    show_error and route_reminders.
+    """
+
+    def __init__(self, seed_sample_data=False):
+        self.home_db = ConnectionRouter(config.DB_CONFIG, config.REPLICA_CONFIG, config.REPLICA_STICKY_SECONDS)
+        self.shards = None
+        if config.SHARD_CONFIGS:
+            self.shards = shards.ShardSet(self.home_db, config.SHARD_CONFIGS, config.REPLICA_STICKY_SECONDS)
+        self.queries = QueryRegistry()
+        self.reports = reports.ReportGenerator(self.patient_reader, self.queries,
+                                               get_connections=self.reader_connections)
+        self.attachments = attachments.AttachmentStore()
+        self.directory = directory.PatientDirectory(self.queries, self.reader_connections,
+                                                    executor=self.shards.executor if self.shards else None,
+                                                    consent_default=config.CONSENT_DEFAULT_GRANTED)
+        self.stats = statcache.StatCache(config.STAT_CACHE_SIZE, config.STAT_CACHE_TTL_SECONDS)
+        self.consent = consent.ConsentIndex(self.queries, config.CONSENT_DEFAULT_GRANTED,
+                                            config.CONSENT_MAX_AGE_SECONDS)
+        self.quick_entries = quickentry.QuickEntryIndex(self.queries, config.QUICK_ENTRY_HISTORY_DAYS)
+        self.escalation = None
+        # One reminder scheduler for all sessions: a query per shard every 30 s, routed to each session
+        self.scheduler = scheduler.ReminderScheduler(
+            self.fetch_due, lambda due, day: self.notify("route_reminders", due, day), interval=30.0)
+        self.seed_sample_data = seed_sample_data
+        self.db_ready = threading.Event()
+        self.init_thread = None
+        self.running = True
+        # Last connection status, shown by windows opened later
+        self.status = ("Connecting to database...", "#64748b")
+        self.sessions = []
+        # Connections of the background threads (scheduler, escalation, daily maintenance), closed on shutdown
+        self.background_routers = []
+        self.scheduler_routers = None
+        self._lock = threading.Lock()
+
+    @property
+    def routers(self):
+        return self.shards.routers if self.shards else [self.home_db]
+
+    def start(self):
+        """Connect, check the schema version and start the background threads"""
+        self.init_thread = threading.Thread(target=self.initialize_database, name="db-init", daemon=True)
+        self.init_thread.start()
+
+    def add_session(self, session):
+        with self._lock:
+            self.sessions.append(session)
+
+    def remove_session(self, session):
+        with self._lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+
+    def notify(self, method, *args):
+        """Call a method on every session, on the Tk thread"""
+        with self._lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            try:
+                session.root.after(0, lambda s=session: getattr(s, method)(*args))
+            except (RuntimeError, AttributeError) as e:  # window already gone
+                print(f"Could not notify session: {e}")
+
+    def set_status(self, text, color):
+        self.status = (text, color)
+        self.notify("set_connection_status", text, color)
+
+    def shard_of(self, patient_id):
+        """Index in self.routers of the shard holding a patient"""
+        if self.shards and patient_id:
+            return self.shards.shard_for_patient(self.queries, patient_id)
+        return 0
+
+    def connect_background(self, autocommit=False):
+        """A connected clone of every shard's router, for one background thread"""
+        routers = []
+        try:
+            for router in self.routers:
+                clone = router.clone(autocommit)
+                clone.connect()
+                self.queries.attach(clone)
+                routers.append(clone)
+        except Error:
+            for router in routers:
+                router.close()
+            raise
+        with self._lock:
+            self.background_routers += routers
+        return routers
+
+    def router_for_patient(self, patient_id):
+        if self.shards and patient_id:
+            return self.shards.router_for_patient(self.queries, patient_id)
+        return self.home_db
+
+    def patient_reader(self, patient_id=None):
+        """Read connection for one patient's data (the home database when patient_id is None)"""
+        return self.router_for_patient(patient_id).reader()
+
+    def reader_connections(self):
+        """Read connections for views spanning all patients: every shard, or just this database"""
+        if self.shards:
+            return self.shards.readers()
+        return [self.home_db.reader()]
+
+    def connect_db(self, notify=True):
+        """Connect to MySQL database (and the optional read replica) using the settings in config.py"""
+        try:
+            self.home_db.connect()
+            print("✓ Connected to database")
+            return True
+        except Error as e:
+            if notify:
+                self.notify("show_error", "Database Error", f"Failed to connect: {e}")
+            else:
+                print(f"Database still unavailable: {e}")
+            return False
+
+    def initialize_database(self):
+        """Connect and bring the schema up to date (runs off the UI thread)"""
+        # Keep trying with exponential backoff; only the first failure opens a dialog
+        delay = 1.0
+        notify = True
+        while not self.connect_db(notify):
+            if not self.running:
+                return
+            self.set_status(f"Database unavailable, retrying in {delay:.0f} s", "#dc2626")
+            time.sleep(delay)
+            delay = min(delay * 2, 60.0)
+            notify = False
+        try:
+            upgraded = schema.ensure_schema(self.home_db.primary)
+            if upgraded:
+                print(f"✓ Schema upgraded to version {schema.SCHEMA_VERSION}")
+            if self.seed_sample_data:
+                schema.seed_sample_data(self.home_db.primary)
+            if self.shards:
+                self.shards.connect()
+                for index, router in enumerate(self.shards.routers):
+                    if index:
+                        schema.ensure_schema(router.primary)
+                    # Users created before sharding, on a new shard or while the directory was
+                    # unreachable are added on every start (the directory writes are upserts)
+                    self.shards.backfill_directory(self.queries, index)
+        except Error as e:
+            self.notify("show_error", "Database Error", f"Failed to prepare schema: {e}")
+            self.set_status("Database unavailable", "#dc2626")
+            return
+
+        if config.ESCALATION_ENABLED:
+            try:
+                # Own connections: timer callbacks must not run statements inside a UI transaction
+                routers = self.connect_background(autocommit=True)
+                self.escalation = escalation.EscalationEngine(
+                    self.queries, lambda patient_id=None: routers[self.shard_of(patient_id)].primary,
+                    lambda: [router.primary for router in routers])
+                self.escalation.start()
+                print(f"✓ Medication escalation armed ({self.escalation.timers.pending()} timers)")
+            except Error as e:
+                print(f"Escalation engine not started: {e}")
+                self.escalation = None
+
+        for router in self.routers:
+            self.queries.attach(router)
+        self.db_ready.set()
+        self.set_status("✓ Connected", "#10b981")
+        threading.Thread(target=self.scheduler.run, args=(lambda: self.running, self.scheduler_error),
+                         name="reminders", daemon=True).start()
+        threading.Thread(target=self.monitor_connections, name="db-health", daemon=True).start()
+        if config.REMINDER_ARCHIVE_DAYS > 0 or config.CHANGE_LOG_RETENTION_DAYS > 0:
+            threading.Thread(target=self.daily_maintenance, name="db-maintenance", daemon=True).start()
+
+    def fetch_due(self, day, after, until):
+        """Reminders due on day within (after, until], from every shard (scheduler thread)"""
+        if self.scheduler_routers is None:
+            # Own autocommit connections: the checks must not join, or see, a UI transaction.
+            # A failed connect fails this check, and the scheduler retries it.
+            self.scheduler_routers = self.connect_background(autocommit=True)
+        due = []
+        for router in self.scheduler_routers:
+            due += self.queries.fetchall(router.primary, "due_reminders_between", (day, after, until))
+        return due
+
+    def scheduler_error(self, error):
+        if not isinstance(error, CircuitOpenError):  # the health monitor reconnects and shows the banner
+            print("Reminder thread error:", error)
+
+    def daily_maintenance(self):
+        """Once a day, move old completed and deleted reminders to reminders_archive
+        and purge old change_log rows (background thread)"""
+        routers = None
+        while self.running:
+            if routers is None:
+                try:
+                    # Own connections: the batches must not commit or roll back a UI transaction
+                    routers = self.connect_background()
+                except Error as e:
+                    print(f"Maintenance skipped, cannot connect: {e}")
+            for index, router in enumerate(routers or []):
+                if config.REMINDER_ARCHIVE_DAYS > 0:
+                    try:
+                        moved = archive.archive_reminders(self.queries, router, config.REMINDER_ARCHIVE_DAYS)
+                        if moved:
+                            print(f"✓ Archived {moved} old reminders on shard {index}")
+                    except Error as e:
+                        print(f"Reminder archival failed: {e}")
+                if config.CHANGE_LOG_RETENTION_DAYS > 0:
+                    try:
+                        purged = changefeed.purge_changes(self.queries, router, config.CHANGE_LOG_RETENTION_DAYS)
+                        if purged:
+                            print(f"✓ Purged {purged} old change_log rows on shard {index}")
+                    except Error as e:
+                        print(f"change_log purge failed: {e}")
+            next_run = time.monotonic() + 24 * 3600
+            while self.running and time.monotonic() < next_run:
+                time.sleep(60)
+
+    def monitor_connections(self):
+        """Ping every connection periodically so dropped ones are reconnected before the UI needs
+        them, and show the degraded-mode banner while any circuit breaker is open (background thread)"""
+        routers = self.routers
+        degraded = False
+        while self.running:
+            for router in routers:
+                for connection in router.connections():
+                    if connection is router.primary and router.in_unit():
+                        # A ping would run inside that transaction (and must not reconnect it)
+                        continue
+                    try:
+                        self.queries.ping(connection)
+                    except Error:
+                        pass
+            now_degraded = any(router.breaker.state != 'closed' for router in routers)
+            if now_degraded or degraded:
+                self.notify("show_degraded_banner", now_degraded)
+            degraded = now_degraded
+            # Probe again as soon as an open breaker allows a trial call
+            wait = config.HEALTH_CHECK_SECONDS
+            if degraded:
+                wait = min(wait, max(1.0, min(router.breaker.retry_in() for router in routers
+                                              if router.breaker.state != 'closed')))
+            time.sleep(wait)
+
+    def shutdown(self):
+        self.running = False
+        print(f"Stat cache: {self.stats.stats()}")
+        self.reports.shutdown()
+        self.attachments.shutdown()
+        if self.escalation:
+            self.escalation.stop()
+        try:
+            for connection in (self.home_db.primary, self.home_db.replica):
+                if connection:
+                    self.queries.close(connection)
+            for router in self.background_routers:
+                if router.primary is not None:
+                    self.queries.close(router.primary)
+                router.close()
+            if self.shards:
+                self.shards.close(self.queries)
+            self.home_db.close()
+        except Error as e:
+            print(f"Error closing connections: {e}")
@@ -0,0 +1,163 @@
+"""Patient-keyed sharding across several Memory Companion databases"""
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error
+
+from connections import ConnectionRouter
+
+_DIRECTORY_STATEMENTS = (
+    ('patient', "directory_patients"),
+    ('caregiver', "directory_caregivers"),
+    ('doctor', "directory_doctors"),
+)
+
+
+def fan_out(queries, connections, name, params=(), key=None, reverse=False, limit=None, executor=None):
+    """Run one named query on every connection and merge the (already sorted) results.
+
+    Each shard's rows must be ordered by key (descending when reverse); the
+    merge keeps that order and stops after limit rows.
+    """
+    if len(connections) == 1:
+        rows = queries.fetchall(connections[0], name, params)
+        return rows[:limit] if limit is not None else rows
+    if executor is None:
+        results = [queries.fetchall(connection, name, params) for connection in connections]
+    else:
+        results = list(executor.map(lambda connection: queries.fetchall(connection, name, params), connections))
+    merged = heapq.merge(*results, key=key, reverse=reverse)
+    if limit is not None:
+        return [row for _, row in zip(range(limit), merged)]
+    return list(merged)
+
+
+def create_user(queries, shard_set, router, role, username, values, patient_id=None):
+    """Insert a patient, caregiver or doctor and commit; returns the new id.
+
+    Runs as a unit of work, so inside a caller's unit on the same router it
+    commits with the caller. Without shards (shard_set None) the user goes to router. With shards the
+    patient gets a directory-allocated id on the least loaded shard, caregivers
+    go to their patient's shard and doctors to the home database, and the
+    username is recorded in the directory.
+    """
+    if shard_set is None:
+        with router.unit_of_work() as connection:
+            return queries.insert(connection, f"insert_{role}", values)
+    if role == 'patient':
+        user_id, shard = shard_set.allocate_patient(queries)
+        router = shard_set.routers[shard]
+        try:
+            with router.unit_of_work() as connection:
+                queries.execute(connection, "insert_patient_with_id", (user_id,) + tuple(values))
+        except Error:
+            shard_set.release_patient(queries, user_id)
+            raise
+    else:
+        # Caregivers live with their patient, doctors on the home database
+        shard = shard_set.shard_for_patient(queries, patient_id) if role == 'caregiver' else 0
+        with shard_set.routers[shard].unit_of_work() as connection:
+            user_id = queries.insert(connection, f"insert_{role}", values)
+    shard_set.register_user(queries, username, role, user_id, shard)
+    return user_id
+
+
+class ShardSet:
+    """The home database (shard 0) plus any number of patient shards.
+
+    Patient rows and everything keyed by patient_id (entries, reminders,
+    consent logs, change feed) live on the patient's shard. Shard 0 also holds
+    the directory: shard_map (patient_id -> shard, and the allocator of
+    globally unique patient ids) and user_directory (username -> shard).
+    Doctors live on shard 0; caregivers live with their patient.
+    """
+
+    def __init__(self, home, shard_configs, sticky_seconds=5.0):
+        self.routers = [home] + [ConnectionRouter(shard_config, None, sticky_seconds) for shard_config in shard_configs]
+        self.executor = ThreadPoolExecutor(max_workers=len(self.routers), thread_name_prefix="shard")
+        self._patient_shards = {}
+
+    @property
+    def home(self):
+        return self.routers[0]
+
+    def _interleave(self, index):
+        """Session setup for one shard, re-run by its router after every reconnect"""
+        def setup(connection):
+            # Interleave AUTO_INCREMENT values so entry/reminder ids are unique across shards
+            cursor = connection.cursor()
+            cursor.execute("SET SESSION auto_increment_increment = %s, auto_increment_offset = %s",
+                           (len(self.routers), index + 1))
+            cursor.close()
+        return setup
+
+    def connect(self):
+        """Open the extra shards (the home router is connected by the app)"""
+        for index, router in enumerate(self.routers):
+            router.add_session_setup(self._interleave(index))
+            if index:
+                router.connect()
+        print(f"✓ Connected to {len(self.routers)} shards")
+
+    def readers(self):
+        return [router.reader() for router in self.routers]
+
+    def fan_out(self, queries, name, params=(), key=None, reverse=False, limit=None):
+        """Run a read on every shard in parallel and merge the results"""
+        return fan_out(queries, self.readers(), name, params, key, reverse, limit, self.executor)
+
+    def shard_for_patient(self, queries, patient_id):
+        """Index of the shard holding a patient (patients missing from the map stay on shard 0)"""
+        shard = self._patient_shards.get(patient_id)
+        if shard is None:
+            shard = queries.fetchvalue(self.home.primary, "patient_shard", (patient_id,), 0)
+            if shard >= len(self.routers):
+                raise Error(msg=f"Patient {patient_id} is mapped to unknown shard {shard}")
+            self._patient_shards[patient_id] = shard
+        return shard
+
+    def router_for_patient(self, queries, patient_id):
+        return self.routers[self.shard_for_patient(queries, patient_id)]
+
+    def login_routers(self, queries, username):
+        """Routers to try for a login: the directory's answer, or every shard when the user is unknown"""
+        rows = queries.fetchall(self.home.primary, "user_shards", (username,))
+        shards = sorted({shard for _, _, shard in rows if shard < len(self.routers)})
+        return [self.routers[shard] for shard in shards] if shards else list(self.routers)
+
+    def allocate_patient(self, queries):
+        """Pick the least loaded shard and reserve a new patient id on it; returns (patient_id, shard)"""
+        counts = dict(queries.fetchall(self.home.primary, "shard_patient_counts"))
+        shard = min(range(len(self.routers)), key=lambda index: counts.get(index, 0))
+        with self.home.unit_of_work() as directory:
+            patient_id = queries.insert(directory, "allocate_patient", (shard,))
+        self._patient_shards[patient_id] = shard
+        return patient_id, shard
+
+    def release_patient(self, queries, patient_id):
+        """Undo allocate_patient when the patient row could not be created"""
+        with self.home.unit_of_work() as directory:
+            queries.execute(directory, "unmap_patient", (patient_id,))
+        self._patient_shards.pop(patient_id, None)
+
+    def register_user(self, queries, username, user_type, user_id, shard):
+        with self.home.unit_of_work() as directory:
+            queries.execute(directory, "register_user", (username, user_type, user_id, shard))
+
+    def backfill_directory(self, queries, shard):
+        """Record a shard's existing users and patients in the directory (safe to repeat)"""
+        connection = self.routers[shard].primary
+        with self.home.unit_of_work() as directory:
+            for user_type, statement in _DIRECTORY_STATEMENTS:
+                for username, user_id in queries.fetchall(connection, statement):
+                    queries.execute(directory, "register_user", (username, user_type, user_id, shard))
+                    if user_type == 'patient':
+                        queries.execute(directory, "map_patient", (user_id, shard))
+
+    def close(self, queries):
+        self.executor.shutdown(wait=False)
+        for router in self.routers[1:]:
+            for connection in (router.primary, router.replica):
+                if connection is not None:
+                    queries.close(connection)
+            router.close()
@@ -0,0 +1,158 @@
+"""Tk main-loop stall watchdog and sampling profiler"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+def _frame_label(frame):
+    """file:function for one frame; QueryRegistry frames also name the statement being run"""
+    code = frame.f_code
+    label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+    if code.co_name == "_run" and os.path.basename(code.co_filename) == "queries.py":
+        statement = frame.f_locals.get("name")
+        if isinstance(statement, str):
+            label += f"[{statement}]"
+    return label.replace(";", ":").replace(" ", "_")
+
+
+def collapsed_stack(frame):
+    """Stack from the outermost frame to frame, in flamegraph collapsed format (a;b;c)"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def format_stack(frame):
+    lines = []
+    while frame is not None:
+        lines.append(f'  File "{frame.f_code.co_filename}", line {frame.f_lineno}, in {_frame_label(frame)}')
+        frame = frame.f_back
+    return "\n".join(reversed(lines))
+
+
+class StallWatchdog:
+    """Measures Tk event-loop latency and records what the main thread was doing when it stalled.
+
+    A heartbeat scheduled with root.after notes when it last ran. A background
+    thread checks it; once the loop has not run for threshold_ms it logs the
+    main thread's stack (with the statement name when a query is running) to
+    log_path, and logs the total stall length when the loop recovers.
+
+    With profile=True the same thread also samples the main thread every
+    sample_ms and writes the counts to profile_dir/session-<time>-<pid>.collapsed
+    on stop(), ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, root, threshold_ms=500, heartbeat_ms=100, log_path=None,
+                 profile=False, sample_ms=10, profile_dir=None, context=None):
+        self.root = root
+        self.threshold = threshold_ms / 1000.0
+        self.heartbeat_ms = heartbeat_ms
+        self.log_path = log_path
+        self.profile = profile
+        self.sample = sample_ms / 1000.0
+        self.profile_dir = profile_dir
+        self.context = context
+        self.max_latency = 0.0
+        self.stalls = 0
+        self.samples = {}
+        self._main_ident = threading.main_thread().ident
+        self._last_beat = time.monotonic()
+        self._expected = None
+        self._running = False
+        self._thread = None
+        self._after_id = None
+        self._started_at = datetime.now()
+
+    def start(self):
+        self._running = True
+        self._last_beat = time.monotonic()
+        self._after_id = self.root.after(self.heartbeat_ms, self._beat)
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def _beat(self):
+        """Main thread: record the heartbeat and how late it ran"""
+        now = time.monotonic()
+        if self._expected is not None:
+            self.max_latency = max(self.max_latency, now - self._expected)
+        self._last_beat = now
+        if self._running:
+            self._expected = now + self.heartbeat_ms / 1000.0
+            self._after_id = self.root.after(self.heartbeat_ms, self._beat)
+
+    def _main_frame(self):
+        return sys._current_frames().get(self._main_ident)
+
+    def _watch(self):
+        stalled_since = None
+        interval = self.sample if self.profile else min(self.threshold / 2, self.heartbeat_ms / 1000.0)
+        while self._running:
+            time.sleep(interval)
+            frame = self._main_frame()
+            if frame is None:
+                continue
+            if self.profile:
+                stack = collapsed_stack(frame)
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+            age = time.monotonic() - self._last_beat
+            if stalled_since is None and age >= self.threshold:
+                stalled_since = self._last_beat
+                self.stalls += 1
+                self._log(f"stall > {self.threshold * 1000:.0f} ms{self._context_text()}\n{format_stack(frame)}")
+            elif stalled_since is not None and self._last_beat > stalled_since:
+                self._log(f"recovered after {(self._last_beat - stalled_since) * 1000:.0f} ms")
+                stalled_since = None
+
+    def _context_text(self):
+        if self.context is None:
+            return ""
+        try:
+            return f" (screen: {self.context()})"
+        except Exception:
+            return ""
+
+    def _log(self, text):
+        line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {text}"
+        print(line)
+        if self.log_path:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Could not write stall log: {e}")
+
+    def write_profile(self):
+        """Write the collapsed stacks sampled so far; returns the path (None when nothing was sampled)"""
+        if not self.samples or not self.profile_dir:
+            return None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir,
+                            f"session-{self._started_at.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.collapsed")
+        samples = dict(self.samples)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(samples.items()):
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def stop(self):
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        path = self.write_profile() if self.profile else None
+        if path:
+            print(f"✓ Profile written to {path}")
+        return path
+
+    def stats(self):
+        return {"stalls": self.stalls, "max_latency_ms": round(self.max_latency * 1000, 1)}
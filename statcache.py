@@ -0,0 +1,80 @@
+"""In-process cache for the dashboard stat cards, invalidated by the write paths"""
+import threading
+import time
+from collections import OrderedDict
+
+# Metrics each table's writes affect
+TABLE_METRICS = {'entries': ("today_entries", "year_heatmap"), 'reminders': ("open_reminders",)}
+
+
+class StatCache:
+    """LRU cache of (patient_id, metric, day) -> value with a TTL.
+
+    Writes made by this process invalidate their patient's metric directly;
+    the TTL bounds how stale a count can get from writes made elsewhere.
+    Loaders run outside the lock, so every invalidation bumps a generation
+    counter and a load that started before it is returned but not cached.
+    """
+
+    def __init__(self, maxsize=256, ttl=60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generation = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, patient_id, metric, day, loader):
+        """Return the cached value, calling loader() on a miss or after expiry"""
+        key = (patient_id, metric, day)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[1] > self.clock():
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[0]
+            self.misses += 1
+            generation = self._generation
+        value = loader()
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated while loading: the value may predate that write
+                return value
+            self._items[key] = (value, self.clock() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, patient_id, metric=None, day=None):
+        """Drop a patient's cached values, narrowed to one metric and/or day when given"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._items
+                        if k[0] == patient_id and metric in (None, k[1]) and day in (None, k[2])]:
+                del self._items[key]
+
+    def invalidate_table(self, table, patient_ids, day=None):
+        """Drop what writes to table for these patients made stale"""
+        for patient_id in patient_ids:
+            for metric in TABLE_METRICS[table]:
+                # The heatmap spans a year, so any entry write makes it stale
+                self.invalidate(patient_id, metric, None if metric == "year_heatmap" else day)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
+
+    def stats(self):
+        """Hit/miss counters for tuning size and TTL"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "size": len(self._items), "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,5 @@
+"""Unit tests for the modules that need neither MySQL nor a display; run with python -m pytest"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
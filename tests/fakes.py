@@ -0,0 +1,58 @@
+"""Small in-memory stand-ins for mysql.connector connections and cursors"""
+
+
+class FakeCursor:
+    def __init__(self, connection, prepared):
+        self.connection = connection
+        self.prepared = prepared
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+        self.closed = False
+
+    def execute(self, sql, params=()):
+        self.connection.executed.append((sql, tuple(params)))
+        self.rows = list(self.connection.respond(sql, tuple(params)))
+        self.rowcount = len(self.rows)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """Records every statement; respond(sql, params) returns the rows for it"""
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda sql, params: [])
+        self.executed = []
+        self.cursors = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, prepared=False):
+        cursor = FakeCursor(self, prepared)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def is_connected(self):
+        return True
+
+    def __hash__(self):
+        return id(self)
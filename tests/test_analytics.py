@@ -0,0 +1,102 @@
+"""The analytics snapshot written to a real SQLite file from a fake MySQL source"""
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from fakes import FakeConnection
+from analytics import SnapshotBuilder, age_band, query, REPORTS
+from queries import QueryRegistry
+
+
+class Source:
+    """In-memory MySQL tables answering the analytics statements"""
+
+    def __init__(self):
+        self.patients = [(1, 72, "Alzheimer's", "mild"), (2, 91, "Vascular", "moderate")]
+        self.entries = {}
+        self.reminders = {}
+        self.audit = {}
+        self.changes = []
+
+    def add_entry(self, entry_id, patient_id, day, entry_type='meal'):
+        self.entries[entry_id] = (entry_id, patient_id, day, timedelta(hours=9), entry_type, 'patient')
+
+    def respond(self, sql, params):
+        if "FROM patients" in sql:
+            return self.patients
+        if "MAX(id), 0) FROM change_log" in sql:
+            return [(self.changes[-1][0] if self.changes else 0,)]
+        if "FROM change_log" in sql:
+            return [change for change in self.changes if change[0] > params[0]]
+        if "FROM entries" in sql:
+            ids = params if "IN (" in sql else None
+            return [row for entry_id, row in sorted(self.entries.items())
+                    if (entry_id in ids if ids is not None else entry_id > params[0])]
+        if "FROM audit_logs" in sql:
+            return [row for audit_id, row in sorted(self.audit.items()) if audit_id > params[0]]
+        return []
+
+
+class Router:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def reader(self):
+        return self.connection
+
+
+@pytest.fixture
+def source():
+    return Source()
+
+
+def build(source, path, full=False):
+    return SnapshotBuilder(QueryRegistry(), [Router(FakeConnection(source.respond))], str(path)).build(full)
+
+
+def test_age_bands():
+    assert [age_band(age) for age in (None, 45, 60, 79, 95)] == [None, "<60", "60-69", "70-79", "90+"]
+
+
+def test_snapshot_copies_facts_and_answers_the_canned_reports(source, tmp_path):
+    path = tmp_path / "analytics.sqlite3"
+    source.add_entry(1, 1, date(2026, 4, 1))
+    source.add_entry(2, 1, date(2026, 4, 2), 'medication')
+    source.add_entry(3, 2, date(2026, 4, 2))
+    source.audit[1] = (1, datetime(2026, 4, 2, 10), 'doctor', 'LOGIN')
+    copied = build(source, path)
+    assert copied == {'patients': 2, 'entries': 3, 'reminders': 0, 'audit_logs': 1, 'changes': 0}
+
+    columns, rows = query(str(path), REPORTS['activity_by_stage'], {'since': 20260101, 'until': 20261231})
+    assert columns == ['stage', 'entries', 'patients', 'per_patient']
+    assert rows == [('mild', 2, 1, 2.0), ('moderate', 1, 1, 1.0)]
+    _, rows = query(str(path), REPORTS['monthly_entries'], {'since': 20260101, 'until': 20261231})
+    assert rows == [(2026, 4, 3, 2)]
+    # No names or free text leave MySQL
+    _, rows = query(str(path), "SELECT * FROM dim_patient ORDER BY patient_id")
+    assert rows == [(1, 0, 72, "70-79", "Alzheimer's", "mild"), (2, 0, 91, "90+", "Vascular", "moderate")]
+
+
+def test_incremental_run_appends_new_rows_and_replays_changes(source, tmp_path):
+    path = tmp_path / "analytics.sqlite3"
+    source.add_entry(1, 1, date(2026, 4, 1))
+    source.add_entry(2, 1, date(2026, 4, 2))
+    build(source, path)
+
+    source.add_entry(3, 2, date(2026, 4, 3))
+    source.add_entry(1, 1, date(2026, 4, 1), 'social')  # edited
+    del source.entries[2]                               # deleted
+    source.changes = [(1, 'entries', 1, 'update'), (2, 'entries', 2, 'delete')]
+    copied = build(source, path)
+    assert copied['entries'] == 1 and copied['changes'] == 2
+
+    _, rows = query(str(path), "SELECT entry_id, entry_type FROM fact_entry ORDER BY entry_id")
+    assert rows == [(1, 'social'), (3, 'meal')]
+
+
+def test_query_opens_the_snapshot_read_only(source, tmp_path):
+    path = tmp_path / "analytics.sqlite3"
+    build(source, path)
+    with pytest.raises(sqlite3.OperationalError):
+        query(str(path), "DELETE FROM fact_entry")
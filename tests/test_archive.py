@@ -0,0 +1,65 @@
+import threading
+from datetime import date
+
+from fakes import FakeConnection
+from archive import archive_reminders
+from connections import UnitOfWork
+from queries import QueryRegistry
+from services import Services
+
+
+class Router:
+    def __init__(self, connection):
+        self.primary = connection
+
+    def unit_of_work(self):
+        return UnitOfWork(self)
+
+    def commit(self):
+        self.primary.commit()
+
+    def rollback(self):
+        self.primary.rollback()
+
+
+def archivable(batches):
+    def respond(sql, params):
+        if "LIMIT 500" in sql:
+            return [(reminder_id,) for reminder_id in batches.pop(0)] if batches else []
+        if sql.startswith("SELECT patient_id FROM reminders"):
+            return [(7,)]
+        return []
+    return respond
+
+
+def test_archives_in_one_transaction_per_batch_until_none_are_left():
+    connection = FakeConnection(archivable([[1, 2], [3]]))
+    moved = archive_reminders(QueryRegistry(), Router(connection), 90, today=date(2026, 6, 30))
+    assert moved == 3
+    assert connection.commits == 3
+    assert connection.executed[0][1] == (date(2026, 4, 1),)
+    statements = [sql for sql, _ in connection.executed]
+    copy = next(i for i, sql in enumerate(statements) if sql.startswith("INSERT IGNORE INTO reminders_archive"))
+    purge = next(i for i, sql in enumerate(statements) if sql.startswith("DELETE FROM reminders"))
+    assert copy < purge
+
+
+def test_daily_maintenance_runs_on_its_own_connection(monkeypatch):
+    services = Services()
+    own = FakeConnection(archivable([[1]]))
+    ui = FakeConnection()
+    services.home_db.primary = ui
+    done = threading.Event()
+
+    def sleep(seconds):
+        services.running = False
+        done.set()
+
+    monkeypatch.setattr("services.time.sleep", sleep)
+    monkeypatch.setattr("services.config.REMINDER_ARCHIVE_DAYS", 90)
+    monkeypatch.setattr("services.config.CHANGE_LOG_RETENTION_DAYS", 0)
+    monkeypatch.setattr(services, "connect_background", lambda autocommit=False: [Router(own)])
+    services.daily_maintenance()
+    assert done.is_set()
+    assert own.commits == 2
+    assert (ui.executed, ui.commits) == ([], 0)
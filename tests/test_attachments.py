@@ -0,0 +1,49 @@
+import io
+import os
+
+import pytest
+
+from attachments import AttachmentStore, sha256_of
+
+
+def test_staged_file_is_only_in_the_store_once_published(tmp_path):
+    store = AttachmentStore(str(tmp_path / "store"))
+    source = tmp_path / "photo.png"
+    source.write_bytes(b"pixels")
+    sha256, size, mime, staged_path = store.stage(str(source))
+    assert (sha256, size, mime) == (sha256_of(str(source)), 6, "image/png")
+    assert not os.path.exists(store.object_path(sha256))
+    store.publish(sha256, staged_path)
+    with open(store.object_path(sha256), "rb") as f:
+        assert f.read() == b"pixels"
+    # Already stored: nothing is staged the second time
+    assert store.stage(str(source))[3] is None
+
+
+def test_discarded_file_leaves_nothing_behind(tmp_path):
+    store = AttachmentStore(str(tmp_path / "store"))
+    source = tmp_path / "note.ogg"
+    source.write_bytes(b"voice")
+    sha256, _, _, staged_path = store.stage(str(source))
+    store.discard(staged_path)
+    assert os.listdir(os.path.dirname(store.object_path(sha256))) == []
+
+
+def test_stream_yields_the_file_in_chunks(tmp_path):
+    store = AttachmentStore(str(tmp_path / "store"))
+    source = tmp_path / "photo.png"
+    source.write_bytes(bytes(range(256)) * 10)
+    sha256, _, _ = store.put(str(source))
+    chunks = [bytes(chunk) for chunk in store.stream(sha256, chunk_size=1000)]
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 560]
+    assert b"".join(chunks) == source.read_bytes()
+
+
+def test_photo_is_decoded_from_the_stream_and_scaled(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    store = AttachmentStore(str(tmp_path / "store"))
+    source = tmp_path / "photo.png"
+    Image.new("RGB", (400, 200), "red").save(source)
+    sha256, _, _ = store.put(str(source))
+    with Image.open(io.BytesIO(store.photo_png(sha256, (100, 100)))) as image:
+        assert image.size == (100, 50)
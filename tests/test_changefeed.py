@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from fakes import FakeConnection
+from changefeed import ChangeFeed, purge_changes
+from connections import UnitOfWork
+from queries import QueryRegistry
+
+
+class Router:
+    def __init__(self, connection):
+        self.primary = connection
+
+    def unit_of_work(self):
+        return UnitOfWork(self)
+
+    def commit(self):
+        self.primary.commit()
+
+    def rollback(self):
+        self.primary.rollback()
+
+
+def test_purge_deletes_in_committed_batches_until_a_short_one():
+    batches = [5000, 5000, 12]
+
+    def respond(sql, params):
+        return [()] * batches.pop(0) if sql.startswith("DELETE FROM change_log") else []
+
+    connection = FakeConnection(respond)
+    purged = purge_changes(QueryRegistry(), Router(connection), 14, now=datetime(2026, 3, 15, 12, 0))
+    assert purged == 10012
+    assert connection.commits == 3
+    assert connection.executed[0][1] == (datetime(2026, 3, 1, 12, 0),)
+
+
+def test_mark_seen_returns_the_changes_it_skips():
+    versions = {7: 3}
+
+    def respond(sql, params):
+        if "FROM patient_versions WHERE" in sql:
+            return [(versions[params[0]],)]
+        if "FROM change_log" in sql and "version >" in sql:
+            return [(5, 'consent_logs', 11, 'insert')]
+        return []
+
+    feed = ChangeFeed(QueryRegistry(), lambda: FakeConnection(respond))
+    assert feed.mark_seen(7) == []
+    assert feed.mark_seen(7) == []
+    versions[7] = 5
+    assert feed.mark_seen(7) == [(5, 'consent_logs', 11, 'insert')]
+    assert feed.seen_versions[7] == 5
@@ -0,0 +1,113 @@
+import json
+from datetime import date, timedelta
+
+import pytest
+
+import memory_companion_cli as cli
+from fakes import FakeConnection
+from connections import UnitOfWork
+from queries import QueryRegistry
+
+ENTRY = (1, 'patient', 7, 7, 'meal', "Breakfast", None, date(2026, 3, 1), timedelta(hours=8))
+REMINDER = (2, 'caregiver', 3, 7, "Pills", "With water", date(2026, 3, 2), timedelta(hours=9), 'medication', 1, 0)
+
+
+class Router:
+    def __init__(self, connection):
+        self.primary = connection
+
+    def unit_of_work(self):
+        return UnitOfWork(self)
+
+    def commit(self):
+        self.primary.commit()
+
+    def rollback(self):
+        self.primary.rollback()
+
+    def reader(self):
+        return self.primary
+
+
+class Database:
+    """The CLI's Database over one fake connection"""
+
+    def __init__(self, respond=None):
+        self.queries = QueryRegistry()
+        self.connection = FakeConnection(respond)
+        self.routers = [Router(self.connection)]
+
+    def connect(self):
+        pass
+
+    def router_for_patient(self, patient_id):
+        return self.routers[0]
+
+    def close(self):
+        pass
+
+    def inserted(self, table):
+        return [params for sql, params in self.connection.executed if sql.startswith(f"INSERT INTO {table} ")]
+
+
+def run(monkeypatch, database, *argv):
+    monkeypatch.setattr(cli, "Database", lambda: database)
+    return cli.main(list(argv))
+
+
+def test_arguments_are_parsed_into_typed_values():
+    args = cli.build_parser().parse_args(["export", "7", "out.jsonl", "--since", "2026-01-01"])
+    assert (args.patient_id, args.file, args.since, args.until) == (7, "out.jsonl", date(2026, 1, 1), None)
+    assert args.handler is cli.cmd_export
+
+
+def test_bad_arguments_exit_with_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.build_parser().parse_args(["export", "7", "out.jsonl", "--since", "March"])
+    assert exit_info.value.code == 2
+    assert "expected YYYY-MM-DD" in capsys.readouterr().err
+
+
+def test_export_then_import_round_trips_the_rows(monkeypatch, tmp_path):
+    def respond(sql, params):
+        if "FROM entries WHERE patient_id" in sql:
+            return [ENTRY]
+        if "FROM reminders_archive" in sql:
+            return [REMINDER]
+        return []
+
+    path = str(tmp_path / "patient7.jsonl")
+    assert run(monkeypatch, Database(respond), "export", "7", path) == 0
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert [record['table'] for record in records] == ['entries', 'reminders']
+    assert records[0]['entry_date'] == "2026-03-01" and records[0]['entry_time'] == "8:00:00"
+
+    target = Database()
+    assert run(monkeypatch, target, "import", path, "--patient", "9") == 0
+    assert target.inserted("entries") == [('patient', 7, 9, 'meal', "Breakfast", None, "2026-03-01", "8:00:00")]
+    assert target.inserted("reminders") == [('caregiver', 3, 9, "Pills", "With water", "2026-03-02", "9:00:00",
+                                             'medication', 1, 0)]
+    assert target.connection.commits == 2
+
+
+@pytest.mark.parametrize("line", [
+    "not json",
+    json.dumps({'table': 'patients'}),
+    json.dumps({'table': 'entries', 'user_type': 'patient', 'user_id': 7, 'entry_type': 'meal', 'title': "Tea",
+                'entry_date': "2026-03-01", 'entry_time': "16:00"}),  # no patient_id
+    json.dumps({'table': 'reminders', 'patient_id': 7, 'title': "Pills"}),
+    json.dumps(["entries"]),
+])
+def test_import_rejects_rows_that_are_not_exported_rows(monkeypatch, tmp_path, capsys, line):
+    path = tmp_path / "bad.jsonl"
+    path.write_text(line + "\n")
+    database = Database()
+    assert run(monkeypatch, database, "import", str(path)) == 1
+    assert "bad.jsonl:1: not an exported row" in capsys.readouterr().err
+    assert database.connection.executed == []
+
+
+def test_missing_file_exits_with_1(monkeypatch, tmp_path, capsys):
+    assert run(monkeypatch, Database(), "import", str(tmp_path / "missing.jsonl")) == 1
+    assert "Error:" in capsys.readouterr().err
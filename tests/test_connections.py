@@ -0,0 +1,181 @@
+import threading
+
+import pytest
+from mysql.connector import Error, errorcode
+
+from fakes import FakeConnection
+from connections import CircuitBreaker, CircuitOpenError, ConnectionRouter
+from queries import QueryRegistry
+
+
+class UncheckedConnection(FakeConnection):
+    def is_connected(self):
+        raise AssertionError("reader() must not ping the replica")
+
+
+def make_router(caught_up):
+    primary = FakeConnection(lambda sql, params: [("uuid:1-5",)] if "gtid_executed" in sql else [])
+    replica = UncheckedConnection(lambda sql, params: [(0 if caught_up[0] else 1,)] if "WAIT_FOR" in sql else [])
+    router = ConnectionRouter({}, {}, sticky_seconds=60.0)
+    router.primary, router.replica = primary, replica
+    queries = QueryRegistry()
+    queries.attach(router)
+    return router, queries
+
+
+def test_reads_follow_the_replica_once_it_has_applied_the_commit():
+    caught_up = [False]
+    router, queries = make_router(caught_up)
+    assert router.reader() is router.replica
+    router.commit()
+    assert router.reader() is router.primary
+    caught_up[0] = True
+    assert router.reader() is router.replica
+
+
+def test_replication_checks_use_the_registry_prepared_cursors():
+    router, queries = make_router([True])
+    router.commit()
+    router.reader()
+    assert queries.stats()["gtid_executed"]["executions"] == 1
+    assert queries.stats()["wait_for_gtid"]["executions"] == 1
+    assert all(cursor.prepared for cursor in router.primary.cursors + router.replica.cursors)
+
+
+def test_open_replica_breaker_sends_reads_to_the_primary():
+    router, queries = make_router([True])
+    router.replica_breaker.record_failure()
+    assert router.reader() is router.primary
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_the_threshold_and_half_opens_after_the_wait():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=2.0, clock=clock)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    assert breaker.retry_in() == 2.0
+    clock.now = 2.0
+    assert breaker.allow() and breaker.state == 'half-open'
+    # Only one trial call while half-open
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+
+def test_failed_trial_doubles_the_wait_up_to_the_maximum():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=2.0, max_reset_seconds=5.0, clock=clock)
+    breaker.record_failure()
+    waits = []
+    for _ in range(3):
+        clock.now += breaker.retry_in()
+        assert breaker.allow()
+        breaker.record_failure()
+        waits.append(breaker.retry_in())
+    assert waits == [4.0, 5.0, 5.0]
+
+
+def test_open_breaker_fails_fast_without_calling():
+    router = ConnectionRouter({})
+    router.primary = FakeConnection()
+    router.breaker = CircuitBreaker(failure_threshold=1)
+    router.breaker.record_failure()
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        router.call(router.primary, lambda: calls.append(1))
+    assert calls == []
+
+
+def test_clone_keeps_session_setup_and_drops_the_replica():
+    router = ConnectionRouter({"host": "db"}, {"host": "replica"}, sticky_seconds=3.0)
+    setup = lambda connection: None
+    router.add_session_setup(setup)
+    clone = router.clone(autocommit=True)
+    assert clone.primary_config == {"host": "db", "autocommit": True}
+    assert clone.replica_config is None and clone.primary is None
+    assert clone._session_setups == [setup]
+    assert router.clone().primary_config == {"host": "db"}
+
+
+class DroppingConnection(FakeConnection):
+    """Loses the connection at the next statement until reconnected"""
+
+    def __init__(self):
+        super().__init__()
+        self.dropped = False
+        self.reconnects = 0
+
+    def lose(self):
+        self.dropped = True
+
+    def reconnect(self, attempts=1, delay=0):
+        self.reconnects += 1
+        self.dropped = False
+
+    def is_connected(self):
+        return not self.dropped
+
+
+def dropping_router():
+    router = ConnectionRouter({})
+    router.primary = DroppingConnection()
+
+    def statement():
+        if router.primary.dropped:
+            raise Error(errno=errorcode.CR_SERVER_LOST, msg="Lost connection")
+        return "ok"
+
+    return router, statement
+
+
+def test_dropped_primary_is_reconnected_and_reads_retried_outside_a_unit():
+    router, statement = dropping_router()
+    router.primary.lose()
+    assert router.call(router.primary, statement, idempotent=True) == "ok"
+    assert router.primary.reconnects == 1
+
+
+def test_dropped_primary_is_not_reconnected_inside_a_unit():
+    router, statement = dropping_router()
+    with pytest.raises(Error):
+        with router.unit_of_work():
+            router.primary.lose()
+            router.call(router.primary, statement, idempotent=True)
+    assert router.primary.reconnects == 0
+    assert (router.primary.commits, router.primary.rollbacks) == (0, 1)
+    assert not router.in_unit()
+    # The next call after the unit reconnects
+    assert router.call(router.primary, statement, idempotent=True) == "ok"
+
+
+def test_unit_open_on_another_thread_blocks_the_reconnect():
+    router, statement = dropping_router()
+    opened, release = threading.Event(), threading.Event()
+
+    def ui_unit():
+        with router.unit_of_work():
+            opened.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=ui_unit)
+    thread.start()
+    opened.wait(5)
+    router.primary.lose()
+    try:
+        with pytest.raises(Error):
+            router.call(router.primary, statement, idempotent=True)  # e.g. the health monitor's ping
+        assert router.primary.reconnects == 0
+    finally:
+        release.set()
+        thread.join()
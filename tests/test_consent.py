@@ -0,0 +1,79 @@
+from fakes import FakeConnection
+from consent import ConsentIndex
+from queries import QueryRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_index(logs, clock=None):
+    """logs: {patient_id: [(consent_type, given), ...]} in log order"""
+    def respond(sql, params):
+        if "WHERE patient_id" in sql:
+            return list(logs.get(params[0], []))
+        if "consent_logs" in sql:
+            return [(patient_id, consent_type, given) for patient_id, rows in logs.items()
+                    for consent_type, given in rows]
+        return []
+
+    connection = FakeConnection(respond)
+    index = ConsentIndex(QueryRegistry(), default=True, max_age=300.0, clock=clock or Clock())
+    return index, connection
+
+
+def test_state_is_cached_until_invalidated():
+    logs = {1: [("caregiver_access", 1)]}
+    index, connection = make_index(logs)
+    assert index.allows(connection, 1, 'caregiver')
+    logs[1].append(("caregiver_access", 0))
+    assert index.allows(connection, 1, 'caregiver')
+    index.invalidate(1)
+    assert not index.allows(connection, 1, 'caregiver')
+
+
+def test_cached_state_is_read_again_after_max_age():
+    clock = Clock()
+    logs = {1: [("doctor_access", 1)]}
+    index, connection = make_index(logs, clock)
+    assert index.allows(connection, 1, 'doctor')
+    logs[1].append(("doctor_access", 0))
+    clock.now = 301.0
+    assert not index.allows(connection, 1, 'doctor')
+
+
+def test_invalidating_one_patient_keeps_the_others_complete():
+    logs = {1: [("doctor_access", 1)], 2: [("doctor_access", 1)]}
+    index, connection = make_index(logs)
+    assert index.allowed_patients([connection], 'doctor', [1, 2, 3]) == {1, 2, 3}
+    full_loads = len(connection.executed)
+    logs[2].append(("doctor_access", 0))
+    index.invalidate(2)
+    assert index.allowed_patients([connection], 'doctor', [1, 2, 3]) == {1, 3}
+    # Only patient 2 was read again, with the per-patient query
+    assert len(connection.executed) == full_loads + 1
+    assert "WHERE patient_id" in connection.executed[-1][0]
+    # Patients without a recorded choice are still answered from the complete cache
+    assert index.allows(connection, 3, 'doctor')
+    assert len(connection.executed) == full_loads + 1
+
+
+def test_read_overtaken_by_an_invalidate_is_not_cached():
+    logs = {1: [("caregiver_access", 1)]}
+    index, connection = make_index(logs)
+    respond = connection.respond
+
+    def racing(sql, params):
+        rows = respond(sql, params)
+        logs[1].append(("caregiver_access", 0))
+        index.invalidate(1)
+        return rows
+
+    connection.respond = racing
+    assert index.allows(connection, 1, 'caregiver')
+    connection.respond = respond
+    assert not index.allows(connection, 1, 'caregiver')
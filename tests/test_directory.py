@@ -0,0 +1,51 @@
+import sqlite3
+
+from fakes import FakeConnection
+from directory import PatientDirectory
+from queries import QueryRegistry
+
+
+def shard(patients, consents):
+    """A fake shard connection answering the page queries from SQLite (same SQL, ? placeholders)"""
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY, full_name TEXT, username TEXT, age INTEGER, "
+               "diagnosis TEXT, stage TEXT, emergency_contact TEXT)")
+    db.execute("CREATE TABLE consent_logs (id INTEGER PRIMARY KEY, patient_id INTEGER, consent_type TEXT, "
+               "consent_given BOOLEAN, consent_date TEXT)")
+    db.executemany("INSERT INTO patients VALUES (?, ?, ?, 70, 'Alzheimer', 'Early', '')",
+                   [(patient_id, name, name.lower()) for patient_id, name in patients])
+    db.executemany("INSERT INTO consent_logs (patient_id, consent_type, consent_given, consent_date) "
+                   "VALUES (?, 'doctor_access', ?, ?)", consents)
+    return FakeConnection(lambda sql, params: db.execute(sql.replace("%s", "?"), params).fetchall())
+
+
+def test_pages_stay_full_when_patients_withheld_consent():
+    patients = [(i, f"Patient {i:02d}") for i in range(1, 21)]
+    # Every other patient revoked; patient 2 later granted again
+    consents = [(i, False, "2026-01-01") for i in range(2, 21, 2)] + [(2, True, "2026-02-01")]
+    directory = PatientDirectory(QueryRegistry(), lambda: [shard(patients, consents)], page_size=4)
+    names, after, has_more = [], None, True
+    while has_more:
+        rows, has_more = directory.page(after=after, consent_type="doctor_access")
+        assert len(rows) == 4 or not has_more
+        names += [row[1] for row in rows]
+        after = rows[-1][:2]
+    assert names == [f"Patient {i:02d}" for i in [1, 2, 3, 5, 7, 9, 11, 13, 15, 17, 19]]
+
+
+def test_patients_who_never_chose_follow_the_default():
+    patients = [(1, "Ann"), (2, "Ben")]
+    connections = lambda: [shard(patients, [(2, True, "2026-01-01")])]
+    granted_by_default = PatientDirectory(QueryRegistry(), connections)
+    revoked_by_default = PatientDirectory(QueryRegistry(), connections, consent_default=False)
+    assert [row[1] for row in granted_by_default.page(consent_type="doctor_access")[0]] == ["Ann", "Ben"]
+    assert [row[1] for row in revoked_by_default.page(consent_type="doctor_access")[0]] == ["Ben"]
+    assert [row[1] for row in revoked_by_default.page()[0]] == ["Ann", "Ben"]
+
+
+def test_shard_pages_are_merged_by_name_with_search():
+    first = shard([(1, "Alice"), (2, "Bob"), (3, "Alan")], [(3, False, "2026-01-01")])
+    second = shard([(4, "Albert"), (5, "Carol")], [])
+    directory = PatientDirectory(QueryRegistry(), lambda: [first, second], page_size=5)
+    rows, has_more = directory.page(search="al", consent_type="doctor_access")
+    assert [row[1] for row in rows] == ["Albert", "Alice"] and not has_more
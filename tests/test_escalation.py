@@ -0,0 +1,144 @@
+from datetime import date, datetime, timedelta
+
+from fakes import FakeConnection
+from escalation import DeliveryQueue, EscalationEngine, TimerQueue
+from queries import QueryRegistry
+
+DAY = date(2026, 5, 1)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now.timestamp()
+
+    def __call__(self):
+        return self.now
+
+    def set(self, when):
+        self.now = when.timestamp()
+
+
+class Channel:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    def send_batch(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("SMTP unavailable")
+        self.batches.append([message['recipient'] for message in messages])
+
+    def recipients(self):
+        return [recipient for batch in self.batches for recipient in batch]
+
+
+def test_timers_run_in_deadline_order_and_cancelled_ones_never_run():
+    clock = Clock(datetime(2026, 5, 1, 8, 0))
+    timers = TimerQueue(clock)
+    ran = []
+    for key, minutes in (("c", 30), ("a", 10), ("b", 20), ("gone", 15)):
+        timers.arm(key, clock() + minutes * 60, lambda key=key: ran.append(key))
+    timers.arm("b", clock() + 5 * 60, lambda: ran.append("b moved"))
+    assert timers.cancel("gone") and not timers.cancel("gone")
+    timers.run_due()
+    assert ran == []
+    clock.set(datetime(2026, 5, 1, 8, 20))
+    timers.run_due()
+    assert ran == ["b moved", "a"]
+    assert timers.pending() == 1
+
+
+def test_delivery_batches_and_retries_a_failed_batch():
+    channel = Channel(failures=2)
+    queue = DeliveryQueue(channel, batch_size=2, base_delay=0)
+    for recipient in "abcde":
+        queue.put({'recipient': recipient})
+    queue._run()  # not started: delivers what is queued and returns
+    assert channel.batches == [["a", "b"], ["c", "d"], ["e"]]
+    assert (queue.sent, queue.failed) == (5, 0)
+
+
+def test_batch_is_dropped_after_max_attempts():
+    queue = DeliveryQueue(Channel(failures=3), max_attempts=3, base_delay=0)
+    queue.put({'recipient': "a"})
+    queue._run()
+    assert (queue.sent, queue.failed) == (0, 1)
+
+
+class Database:
+    def __init__(self):
+        self.reminders = {}  # id -> reminder_time
+        self.completed = set()
+
+    def respond(self, sql, params):
+        if "reminder_type = 'medication'" in sql:
+            return [(rid, 7, "Morning pills", DAY, at) for rid, at in self.reminders.items()
+                    if rid not in self.completed]
+        if "FROM reminders WHERE id" in sql:
+            return [(params[0] in self.reminders and params[0] not in self.completed,)]
+        if "FROM caregivers" in sql:
+            return [("Cara", "cara@example.org")]
+        if "emergency_contact FROM patients" in sql:
+            return [("Ann", "555-0100")]
+        return []
+
+
+def make_engine(database, clock, channel):
+    connection = FakeConnection(database.respond)
+    engine = EscalationEngine(QueryRegistry(), lambda patient_id=None: connection, channel=channel,
+                              grace_minutes=15, emergency_minutes=30, clock=clock)
+    engine.delivery.base_delay = 0
+    return engine
+
+
+def advance(engine, clock, when):
+    clock.set(when)
+    engine.timers.run_due()
+    engine.delivery._run()
+
+
+def test_missed_dose_escalates_to_caregivers_then_the_emergency_contact():
+    database = Database()
+    database.reminders[1] = timedelta(hours=8)
+    clock = Clock(datetime(2026, 5, 1, 7, 0))
+    channel = Channel()
+    engine = make_engine(database, clock, channel)
+    assert engine.arm_day(DAY) == 1
+    advance(engine, clock, datetime(2026, 5, 1, 8, 14))
+    assert channel.recipients() == []
+    advance(engine, clock, datetime(2026, 5, 1, 8, 15))
+    assert channel.recipients() == ["cara@example.org"]
+    engine.sync(DAY)  # re-reading the still open reminder does not notify the caregivers again
+    advance(engine, clock, datetime(2026, 5, 1, 8, 45))
+    assert channel.recipients() == ["cara@example.org", "555-0100"]
+
+
+def test_taken_dose_is_not_escalated():
+    database = Database()
+    database.reminders[1] = timedelta(hours=8)
+    clock = Clock(datetime(2026, 5, 1, 7, 0))
+    channel = Channel()
+    engine = make_engine(database, clock, channel)
+    engine.arm_day(DAY)
+    database.completed.add(1)
+    advance(engine, clock, datetime(2026, 5, 1, 9, 0))
+    assert channel.recipients() == []
+
+
+def test_sync_arms_reminders_saved_or_moved_by_other_instances():
+    database = Database()
+    clock = Clock(datetime(2026, 5, 1, 7, 0))
+    channel = Channel()
+    engine = make_engine(database, clock, channel)
+    engine.arm_day(DAY)
+    database.reminders[1] = timedelta(hours=8)
+    database.reminders[2] = timedelta(hours=9)
+    engine.sync(DAY)
+    database.reminders[1] = timedelta(hours=10)  # rescheduled
+    del database.reminders[2]  # moved to another day
+    engine.sync(DAY)
+    advance(engine, clock, datetime(2026, 5, 1, 9, 30))
+    assert channel.recipients() == []
+    advance(engine, clock, datetime(2026, 5, 1, 10, 15))
+    assert channel.recipients() == ["cara@example.org"]
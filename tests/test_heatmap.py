@@ -0,0 +1,52 @@
+from datetime import date, datetime, timedelta
+
+from fakes import FakeConnection
+from heatmap import YearBuckets, level, load_buckets, rollup_trusted
+from queries import QueryRegistry
+
+END = date(2026, 3, 31)
+
+
+def test_buckets_count_per_day_and_type_inside_the_window():
+    buckets = YearBuckets(END, days=10)
+    buckets.add_rows([(END, 'meal', 2), (END, 'note', 1), (END - timedelta(days=9), 'meal', 4),
+                      (END - timedelta(days=10), 'meal', 7), (END, 'unknown', 5)])
+    assert buckets.start_date == date(2026, 3, 22)
+    assert buckets.value(9) == 3
+    assert buckets.value(9, 'meal') == 2
+    assert buckets.breakdown(9) == {'meal': 2, 'note': 1}
+    assert buckets.totals() == [4] + [0] * 8 + [3]
+
+
+def test_level_scales_to_the_busiest_day():
+    assert [level(value, 8) for value in (0, 1, 2, 4, 8)] == [0, 1, 1, 2, 4]
+
+
+def test_only_days_rebuilt_after_they_ended_and_before_the_last_are_trusted():
+    rebuilt = [(date(2026, 3, 1), datetime(2026, 3, 2, 1)),   # rebuilt the next night
+               (date(2026, 3, 2), datetime(2026, 3, 2, 9)),   # rebuilt while the day was running
+               (date(2026, 3, 5), datetime(2026, 3, 9, 1))]   # the last day rebuilt
+    assert rollup_trusted(rebuilt) == {date(2026, 3, 1)}
+    assert rollup_trusted([]) == set()
+
+
+def test_untrusted_days_and_holes_are_counted_live():
+    trusted_day = END - timedelta(days=5)
+
+    def respond(sql, params):
+        if "FROM rollup_days" in sql:
+            # A hole between two rebuilt days, and the last rebuilt day three days ago
+            return [(trusted_day, datetime(2026, 3, 30)), (END - timedelta(days=3), datetime(2026, 3, 30))]
+        if "FROM daily_rollups" in sql:
+            return [(trusted_day, 'meal', 5), (END - timedelta(days=3), 'meal', 99)]
+        if "FROM entries" in sql:
+            first, last = params[1], params[2]
+            return [(day, 'meal', 1) for day in (END - timedelta(days=3), END - timedelta(days=1))
+                    if first <= day <= last]
+        return []
+
+    connection = FakeConnection(respond)
+    buckets = load_buckets(QueryRegistry(), connection, 1, END, days=10)
+    assert buckets.totals('meal') == [0, 0, 0, 0, 5, 0, 1, 0, 1, 0]
+    live = [params for sql, params in connection.executed if "FROM entries" in sql]
+    assert live == [(1, END - timedelta(days=9), END - timedelta(days=6)), (1, END - timedelta(days=4), END)]
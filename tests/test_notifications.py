@@ -0,0 +1,93 @@
+from notifications import NotificationTray
+
+
+class Root:
+    """Stand-in for the Tk root: after() jobs run when the test says so"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.next_job = 0
+
+    def after(self, ms, callback):
+        self.next_job += 1
+        self.jobs[self.next_job] = (ms, callback)
+        return self.next_job
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run(self, up_to_ms):
+        for job, (ms, callback) in list(self.jobs.items()):
+            if ms <= up_to_ms:
+                del self.jobs[job]
+                callback()
+
+
+class Widget:
+    def __init__(self):
+        self.alive = True
+
+    def winfo_exists(self):
+        return self.alive
+
+    def destroy(self):
+        self.alive = False
+
+
+def make_tray(done_ok=True):
+    root = Root()
+    completed = []
+    tray = NotificationTray(root, lambda ids: completed.extend(ids) or done_ok, coalesce_ms=1500,
+                            snooze_minutes=10)
+    shown = []
+    tray._show_notice = lambda items: shown.append(dict(items))
+    return root, tray, shown, completed
+
+
+def test_reminders_due_together_share_one_notice_and_are_shown_once():
+    root, tray, shown, _ = make_tray()
+    tray.post((1, "2026-05-01", "08:00"), 1, "Pills", "08:00")
+    tray.post((2, "2026-05-01", "08:00"), 2, "Breakfast", "08:00")
+    tray.post((1, "2026-05-01", "08:00"), 1, "Pills", "08:00")
+    root.run(1500)
+    assert shown == [{1: ("Pills", "08:00"), 2: ("Breakfast", "08:00")}]
+    tray.post((1, "2026-05-01", "08:00"), 1, "Pills", "08:00")
+    root.run(1500)
+    assert len(shown) == 1
+
+
+def test_snoozed_notice_comes_back_after_the_snooze():
+    root, tray, shown, _ = make_tray()
+    notice = Widget()
+    tray._snooze(notice, {1: ("Pills", "08:00")})
+    assert not notice.alive
+    root.run(1500)
+    assert shown == []
+    root.run(10 * 60000)  # the snooze ends and queues the reminder again
+    root.run(1500)
+    assert shown == [{1: ("Pills", "08:00")}]
+
+
+def test_done_removes_the_row_and_closes_the_emptied_notice():
+    root, tray, shown, completed = make_tray()
+    notice, rows = Widget(), {1: Widget(), 2: Widget()}
+    items = {1: ("Pills", "08:00"), 2: ("Breakfast", "08:00")}
+    tray._done(notice, items, rows, [1])
+    assert completed == [1] and list(items) == [2] and notice.alive
+    tray._done(notice, items, rows, [2])
+    assert not notice.alive
+
+
+def test_failed_done_keeps_the_notice():
+    root, tray, shown, completed = make_tray(done_ok=False)
+    notice, rows = Widget(), {1: Widget()}
+    items = {1: ("Pills", "08:00")}
+    tray._done(notice, items, rows, [1])
+    assert notice.alive and rows[1].alive and list(items) == [1]
+
+
+def test_only_the_current_and_previous_day_are_remembered():
+    root, tray, shown, _ = make_tray()
+    for day in ("2026-05-01", "2026-05-02", "2026-05-03"):
+        tray.post((1, day, "08:00"), 1, "Pills", "08:00")
+    assert {key[1] for key in tray.delivered} == {"2026-05-02", "2026-05-03"}
@@ -0,0 +1,33 @@
+import pytest
+
+from fakes import FakeConnection
+from queries import QueryRegistry, id_bucket
+
+
+def test_id_bucket_is_next_power_of_two():
+    assert [id_bucket(n) for n in (1, 2, 3, 4, 5, 500, 512, 513)] == [1, 2, 4, 4, 8, 512, 512, 1024]
+
+
+def test_in_lists_share_one_prepared_statement_per_bucket():
+    registry = QueryRegistry({"by_ids": "SELECT id FROM t WHERE kind = %s AND id IN ({ids})"})
+    connection = FakeConnection()
+    for count in range(1, 65):
+        registry.fetchall_in(connection, "by_ids", range(count), ("a",))
+    # Lengths 1..64 fall into the buckets 1, 2, 4, ..., 64
+    assert len(connection.cursors) == 7
+    assert all(cursor.prepared for cursor in connection.cursors)
+
+
+def test_in_list_is_padded_with_the_last_id():
+    registry = QueryRegistry({"by_ids": "SELECT id FROM t WHERE kind = %s AND id IN ({ids}) AND x = %s"})
+    connection = FakeConnection()
+    registry.fetchall_in(connection, "by_ids", [7, 8, 9], ("a", "b"))
+    sql, params = connection.executed[-1]
+    assert sql.count("%s") == 6
+    assert params == ("a", 7, 8, 9, 9, "b")
+
+
+def test_empty_in_list_is_rejected():
+    registry = QueryRegistry({"by_ids": "SELECT id FROM t WHERE id IN ({ids})"})
+    with pytest.raises(ValueError):
+        registry.fetchall_in(FakeConnection(), "by_ids", [])
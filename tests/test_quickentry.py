@@ -0,0 +1,51 @@
+from datetime import date, datetime, timedelta
+
+from fakes import FakeConnection
+from queries import QueryRegistry
+from quickentry import PatientTemplates, QuickEntryIndex
+
+NINE = 9 * 3600
+
+
+def test_prefix_matches_any_word_of_a_title():
+    patient = PatientTemplates()
+    patient.add('medication', "Morning  pills", 8, 3, 3 * 8 * 3600)
+    patient.add('meal', "Breakfast", 8, 2, 2 * 8 * 3600)
+    assert [t.title for t in patient.complete("mor")] == ["Morning pills"]
+    assert [t.title for t in patient.complete("PIL")] == ["Morning pills"]
+    assert patient.complete("lunch") == []
+    assert len(patient.complete("")) == 2
+
+
+def test_suggestions_prefer_entries_usually_logged_near_now():
+    rows = [('meal', "Breakfast", 8, 5, 5 * 8 * 3600), ('meal', "Dinner", 19, 6, 6 * 19 * 3600)]
+    index = QuickEntryIndex(QueryRegistry())
+    connection = FakeConnection(lambda sql, params: rows)
+    morning = index.suggest(connection, 1, k=2, now=datetime(2026, 3, 1, 8, 15))
+    evening = index.suggest(connection, 1, k=2, now=datetime(2026, 3, 1, 19, 0))
+    assert [t.title for t in morning] == ["Breakfast", "Dinner"]
+    assert [t.title for t in evening] == ["Dinner", "Breakfast"]
+    assert len(connection.executed) == 1
+
+
+def test_recorded_entry_is_counted_and_a_forgotten_one_uncounted():
+    index = QuickEntryIndex(QueryRegistry())
+    connection = FakeConnection(lambda sql, params: [('activity', "Walk", 9, 1, NINE)])
+    index.templates(connection, 1)
+    index.record(1, 'note', "Called  Anna", "10:30")
+    assert [t.title for t in index.suggest(connection, 1, prefix="ann")] == ["Called Anna"]
+
+    index.forget(1, 'note', "Called Anna", date.today(), "10:30")
+    index.forget(1, 'activity', "Walk", date.today(), timedelta(hours=9))
+    assert index.suggest(connection, 1, prefix="ann") == []
+    assert index.suggest(connection, 1, prefix="wal") == []
+    assert index.templates(connection, 1).root.children == {}
+
+
+def test_forgetting_an_entry_older_than_the_loaded_history_changes_nothing():
+    index = QuickEntryIndex(QueryRegistry(), history_days=30)
+    connection = FakeConnection(lambda sql, params: [('activity', "Walk", 9, 2, 2 * NINE)])
+    index.forget(1, 'activity', "Walk", date.today(), "09:00")  # not loaded yet
+    index.templates(connection, 1)
+    index.forget(1, 'activity', "Walk", date.today() - timedelta(days=60), "09:00")
+    assert index.suggest(connection, 1, prefix="walk")[0].count == 2
@@ -0,0 +1,73 @@
+import os
+import threading
+from datetime import date
+
+from fakes import FakeConnection
+from queries import QueryRegistry
+from reports import ReportGenerator
+
+
+def make_reports(tmp_path, fingerprints):
+    """fingerprints: {(patient_id, start, end): (count, max id, last change)} of the live tables"""
+    def respond(sql, params):
+        if "window_entries" in sql and "GROUP BY" not in sql:
+            return [fingerprints.get(params, (0, 0, 0))]
+        return []
+
+    connection = FakeConnection(respond)
+    return ReportGenerator(lambda patient_id=None: connection, QueryRegistry(), output_dir=str(tmp_path))
+
+
+def cache(reports, patient_id, value, end_date=date(2026, 1, 31)):
+    path = reports.report_path(patient_id, 'weekly', end_date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("<html></html>")
+    reports._manifest[reports._key(patient_id, 'weekly', end_date, 'html')] = value
+    return path
+
+
+WEEK = (1, date(2026, 1, 24), date(2026, 1, 31))
+
+
+def test_cached_report_is_served_while_its_window_is_unchanged(tmp_path):
+    reports = make_reports(tmp_path, {WEEK: (3, 40, 95)})
+    path = cache(reports, 1, [3, 40, 95])
+    assert reports.get(1, 'weekly', date(2026, 1, 31)) == path
+
+
+def test_writes_outside_the_window_keep_the_report(tmp_path):
+    fingerprints = {WEEK: (3, 40, 95)}
+    reports = make_reports(tmp_path, fingerprints)
+    path = cache(reports, 1, [3, 40, 95])
+    # An entry dated last month and a reminder completion for the same patient
+    fingerprints[(1, date(2025, 12, 1), date(2025, 12, 31))] = (1, 41, 96)
+    assert reports.get(1, 'weekly', date(2026, 1, 31)) == path
+
+
+def test_edited_entry_in_the_window_makes_the_report_stale(tmp_path):
+    fingerprints = {WEEK: (3, 40, 95)}
+    reports = make_reports(tmp_path, fingerprints)
+    cache(reports, 1, [3, 40, 95])
+    fingerprints[WEEK] = (3, 40, 97)
+    assert reports.get(1, 'weekly', date(2026, 1, 31)) is None
+
+
+def test_concurrent_callers_share_one_pool(tmp_path):
+    reports = make_reports(tmp_path, {})
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def worker():
+        barrier.wait()
+        pools.append(reports._pool_executor())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert len({id(pool) for pool in pools}) == 1
+    finally:
+        reports.shutdown()
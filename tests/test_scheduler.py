@@ -0,0 +1,67 @@
+from datetime import date, datetime, timedelta
+
+from scheduler import ReminderScheduler, SimulatedClock, time_label, time_of_day
+
+REMINDERS = [
+    (1, date(2026, 5, 1), timedelta(hours=8)),
+    (2, date(2026, 5, 1), timedelta(hours=23, minutes=59, seconds=50)),
+    (3, date(2026, 5, 2), timedelta(0)),
+    (4, date(2026, 5, 2), timedelta(hours=8, seconds=15)),
+]
+
+
+def fetch_due(day, after, until):
+    return [(rid, 'patient', 1, day, f"Reminder {rid}", None, at)
+            for rid, reminder_date, at in REMINDERS if reminder_date == day and after < at <= until]
+
+
+def test_time_helpers():
+    assert time_of_day("08:05") == timedelta(hours=8, minutes=5)
+    assert time_of_day(timedelta(hours=1)) == timedelta(hours=1)
+    assert time_label("7:30:15") == "07:30"
+
+
+def test_every_reminder_is_delivered_once_across_midnight():
+    clock = SimulatedClock(datetime(2026, 5, 1, 7, 59, 10))
+    delivered = []
+    scheduler = ReminderScheduler(fetch_due, lambda due, day: delivered.extend((rid, day) for rid, *_ in due),
+                                  clock=clock)
+    while clock.now() < datetime(2026, 5, 2, 9, 0):
+        scheduler.check()
+        clock.advance(30)
+    assert delivered == [(1, "2026-05-01"), (2, "2026-05-01"), (3, "2026-05-02"), (4, "2026-05-02")]
+
+
+def test_late_check_catches_up_and_failed_check_is_retried():
+    clock = SimulatedClock(datetime(2026, 5, 1, 7, 0))
+    delivered = []
+    failing = [True]
+
+    def flaky_fetch(day, after, until):
+        if failing[0] and day == date(2026, 5, 2):
+            raise RuntimeError("database unavailable")
+        return fetch_due(day, after, until)
+
+    scheduler = ReminderScheduler(flaky_fetch, lambda due, day: delivered.extend(rid for rid, *_ in due),
+                                  clock=clock)
+    scheduler.check()
+    # The thread stalls for a day: one check covers both dates, the second one fails
+    clock.advance(26 * 3600)
+    try:
+        scheduler.check()
+    except RuntimeError:
+        pass
+    assert delivered == [1, 2]
+    failing[0] = False
+    clock.advance(30)
+    scheduler.check()
+    assert delivered == [1, 2, 3, 4]
+
+
+def test_run_sleeps_the_interval_between_checks():
+    clock = SimulatedClock(datetime(2026, 5, 1, 7, 59))
+    checks = []
+    scheduler = ReminderScheduler(lambda day, after, until: checks.append(clock.now()) or [],
+                                  lambda due, day: None, clock=clock, interval=30.0)
+    scheduler.run(lambda: len(checks) < 3)
+    assert checks == [datetime(2026, 5, 1, 7, 59), datetime(2026, 5, 1, 7, 59, 30), datetime(2026, 5, 1, 8, 0)]
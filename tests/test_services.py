@@ -0,0 +1,66 @@
+import importlib.util
+import os
+from datetime import timedelta
+
+from fakes import FakeConnection
+from services import Services
+
+_spec = importlib.util.spec_from_file_location(
+    "memory_companion_app", os.path.join(os.path.dirname(__file__), "..", "MEMORY-COMPANION.py"))
+app = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(app)
+
+
+class Root:
+    def after(self, ms, callback):
+        callback()
+
+
+class Tray:
+    def __init__(self):
+        self.posted = []
+
+    def post(self, key, reminder_id, title, due_label):
+        self.posted.append(reminder_id)
+
+
+class Router:
+    def __init__(self, connection):
+        self.primary = connection
+
+
+def session(role, user_id):
+    # Only what route_reminders touches; building the whole window needs a display
+    window = object.__new__(app.MemoryCompanionApp)
+    window.root, window.tray = Root(), Tray()
+    window.current_role, window.current_user = role, user_id
+    return window
+
+
+def test_due_reminders_reach_only_the_owning_session():
+    services = Services()
+    patient, caregiver, other_patient = session('patient', 1), session('caregiver', 1), session('patient', 2)
+    for window in (patient, caregiver, other_patient):
+        services.add_session(window)
+    due = [(10, 'patient', 1, "Pills", "08:00"), (11, 'caregiver', 1, "Call the pharmacy", "08:00")]
+    services.notify("route_reminders", due, "2026-05-01")
+    assert (patient.tray.posted, caregiver.tray.posted, other_patient.tray.posted) == ([10], [11], [])
+
+
+def test_scheduler_reads_on_its_own_autocommit_connection(monkeypatch):
+    services = Services()
+    ui = FakeConnection()
+    services.home_db.primary = ui
+    own = FakeConnection(lambda sql, params: [(10, 'patient', 1, "Pills", "08:00")])
+    requested = []
+
+    def connect_background(autocommit=False):
+        requested.append(autocommit)
+        return [Router(own)]
+
+    monkeypatch.setattr(services, "connect_background", connect_background)
+    for _ in range(2):
+        due = services.fetch_due("2026-05-01", timedelta(hours=7), timedelta(hours=8))
+    assert due == [(10, 'patient', 1, "Pills", "08:00")]
+    assert requested == [True]
+    assert len(own.executed) == 2 and ui.executed == []
@@ -0,0 +1,82 @@
+"""Shard routing against fake connections.
+
+The shard statements are MySQL dialect (ON DUPLICATE KEY UPDATE, INSERT IGNORE,
+%s placeholders through prepared cursors), so they cannot run on SQLite; these
+tests check which connection each statement is sent to instead.
+"""
+from datetime import date
+
+from fakes import FakeConnection
+from connections import ConnectionRouter
+from escalation import EscalationEngine
+from queries import QueryRegistry
+from reports import ReportGenerator
+from shards import ShardSet
+
+
+def make_shards(shard_map, patients=None):
+    patients = patients or {}
+
+    def responder(index):
+        def respond(sql, params):
+            if "FROM shard_map WHERE" in sql:
+                return [(shard_map[params[0]],)] if params[0] in shard_map else []
+            if sql == "SELECT id FROM patients":
+                return [(patient_id,) for patient_id in patients.get(index, ())]
+            if sql == "SELECT username, id FROM patients":
+                return [(f"p{patient_id}", patient_id) for patient_id in patients.get(index, ())]
+            return []
+        return respond
+
+    shard_set = ShardSet(ConnectionRouter({}), [{}, {}])
+    for index, router in enumerate(shard_set.routers):
+        router.primary = FakeConnection(responder(index))
+    return shard_set, [router.primary for router in shard_set.routers]
+
+
+def test_patient_is_routed_to_its_mapped_shard_and_cached():
+    shard_set, connections = make_shards({7: 2})
+    queries = QueryRegistry()
+    assert shard_set.router_for_patient(queries, 7) is shard_set.routers[2]
+    assert shard_set.router_for_patient(queries, 7) is shard_set.routers[2]
+    assert len(connections[0].executed) == 1
+    # Patients missing from the map stay on the home database
+    assert shard_set.router_for_patient(queries, 8) is shard_set.routers[0]
+
+
+def test_backfill_upserts_a_shards_users_into_the_home_directory():
+    shard_set, connections = make_shards({}, {1: [4, 5]})
+    queries = QueryRegistry()
+    shard_set.backfill_directory(queries, 1)
+    shard_set.backfill_directory(queries, 1)
+    writes = [params for sql, params in connections[0].executed if sql.startswith("INSERT")]
+    assert writes.count(("p4", "patient", 4, 1)) == 2
+    assert writes.count((4, 1)) == 2
+    assert connections[0].commits == 2
+    assert not [sql for sql, _ in connections[1].executed if sql.startswith("INSERT")]
+
+
+def test_report_refresh_reads_every_shard_for_its_own_patients(tmp_path):
+    shard_set, connections = make_shards({4: 1, 9: 2}, {1: [4], 2: [9]})
+    queries = QueryRegistry()
+    generator = ReportGenerator(lambda patient_id=None: shard_set.router_for_patient(queries, patient_id).primary,
+                                queries, output_dir=str(tmp_path),
+                                get_connections=lambda: [router.primary for router in shard_set.routers])
+    submitted = []
+    generator._submit = lambda patient_id, period, end_date, fmt, fingerprint: submitted.append(
+        (patient_id, period)) or None
+    generator.refresh(periods=('daily',), end_date=date(2026, 1, 31))
+    assert sorted(submitted) == [(4, 'daily'), (9, 'daily')]
+    for connection in connections[1:]:
+        assert any("GROUP BY patient_id" in sql for sql, _ in connection.executed)
+
+
+def test_escalation_arms_reminders_from_every_shard():
+    shard_set, connections = make_shards({})
+    for index, connection in enumerate(connections):
+        connection.respond = lambda sql, params, index=index: (
+            [(100 + index, index + 1, "Pills", date(2026, 1, 31), "08:00")] if "medication" in sql else [])
+    engine = EscalationEngine(QueryRegistry(), lambda patient_id=None: connections[0],
+                              lambda: connections, channel=object())
+    assert engine.arm_day(date(2026, 1, 31)) == 3
+    assert engine.timers.pending() == 4  # three reminders plus the rollover to the next day
@@ -0,0 +1,41 @@
+from statcache import StatCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_values_are_cached_until_the_ttl_expires():
+    clock = Clock()
+    cache = StatCache(ttl=60.0, clock=clock)
+    loads = []
+    assert cache.get_or_load(1, "today_entries", "d", lambda: loads.append(1) or 5) == 5
+    assert cache.get_or_load(1, "today_entries", "d", lambda: loads.append(1) or 6) == 5
+    clock.now = 61.0
+    assert cache.get_or_load(1, "today_entries", "d", lambda: loads.append(1) or 7) == 7
+    assert len(loads) == 2
+
+
+def test_least_recently_used_value_is_evicted():
+    cache = StatCache(maxsize=2)
+    for patient_id in (1, 2, 3):
+        cache.get_or_load(patient_id, "today_entries", "d", lambda: patient_id)
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_load(1, "today_entries", "d", lambda: "reloaded") == "reloaded"
+
+
+def test_load_overtaken_by_an_invalidate_is_not_cached():
+    cache = StatCache()
+
+    def stale_loader():
+        # A write commits and invalidates while this (older) count is being read
+        cache.invalidate_table('entries', [1], "d")
+        return 5
+
+    assert cache.get_or_load(1, "today_entries", "d", stale_loader) == 5
+    assert cache.get_or_load(1, "today_entries", "d", lambda: 6) == 6
+    assert cache.get_or_load(1, "today_entries", "d", lambda: 7) == 6
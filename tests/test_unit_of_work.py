@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+from mysql.connector import Error
+
+from fakes import FakeConnection
+from connections import UnitOfWork
+
+
+def test_commits_once_when_the_block_ends():
+    connection = FakeConnection()
+    with UnitOfWork(connection) as yielded:
+        assert yielded is connection
+    assert (connection.commits, connection.rollbacks) == (1, 0)
+
+
+def test_rolls_back_and_reraises_when_the_block_raises():
+    connection = FakeConnection()
+    with pytest.raises(ValueError):
+        with UnitOfWork(connection):
+            raise ValueError("boom")
+    assert (connection.commits, connection.rollbacks) == (0, 1)
+
+
+def test_inner_units_join_the_outer_one():
+    connection = FakeConnection()
+    with UnitOfWork(connection):
+        with UnitOfWork(connection):
+            with UnitOfWork(connection):
+                pass
+        assert connection.commits == 0
+    assert connection.commits == 1
+
+
+def test_failure_in_an_inner_unit_rolls_back_the_whole_unit():
+    connection = FakeConnection()
+    with pytest.raises(ValueError):
+        with UnitOfWork(connection):
+            with UnitOfWork(connection):
+                raise ValueError("boom")
+    assert (connection.commits, connection.rollbacks) == (0, 1)
+
+
+def test_failed_commit_rolls_back():
+    connection = FakeConnection()
+
+    def commit():
+        raise Error(msg="lost")
+
+    connection.commit = commit
+    with pytest.raises(Error):
+        with UnitOfWork(connection):
+            pass
+    assert connection.rollbacks == 1
+
+
+def test_nesting_is_tracked_per_thread():
+    connection = FakeConnection()
+    inside = threading.Event()
+    done = threading.Event()
+
+    def other_thread():
+        with UnitOfWork(connection):
+            inside.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    inside.wait(5)
+    # Not nested in the other thread's unit: this one commits on its own
+    with UnitOfWork(connection):
+        pass
+    assert connection.commits == 1
+    done.set()
+    thread.join()
+    assert connection.commits == 2